@@ -0,0 +1,2 @@
+# locust monkey-patches gevent on import, which has to happen before any test imports requests or ssl
+import locust  # noqa: F401
@@ -1,17 +1,40 @@
+import argparse
+import base64
+import bisect
+import gzip
+import io
+import itertools
 import json
 import logging
 import os
 import random
+import re
+import shutil
+import socket
+import sys
 import threading
 import time
+import uuid
+from array import array
 from collections import deque
 from datetime import datetime
-from statistics import mean, median, stdev
-from typing import Dict, Optional
+from statistics import mean
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlparse
 
+import gevent
+import gevent.local
+import gevent.pool
+import greenlet
 import psutil
 from colorama import Fore, Style, init
-from locust import HttpUser, TaskSet, between, events, task
+from gevent import monkey
+from locust import HttpUser, LoadTestShape, TaskSet, User, between, constant, events, task
+from locust.contrib.fasthttp import FastHttpUser
+from locust.env import Environment
+from locust.runners import WORKER_REPORT_INTERVAL, MasterRunner, WorkerRunner
+from requests import Session
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 from tabulate import tabulate
 
@@ -26,9 +49,567 @@ logger = logging.getLogger("skills-base-loadtest")
 # Initialize colorama for cross-platform colored output
 init()
 
+# Target services
+USER_SERVICE_HOST = os.getenv("USER_SERVICE_HOST", "http://localhost:3001")
+EMAIL_SERVICE_HOST = os.getenv("EMAIL_SERVICE_HOST", "http://localhost:3005")
+SKILLS_SERVICE_HOST = os.getenv("SKILLS_SERVICE_HOST", "http://localhost:3002")
+LEARNING_SERVICE_HOST = os.getenv("LEARNING_SERVICE_HOST", "http://localhost:3003")
+INTEGRATION_SERVICE_HOST = os.getenv("INTEGRATION_SERVICE_HOST", "http://localhost:3004")
+EVENT_PROCESSES_SERVICE_HOST = os.getenv("EVENT_PROCESSES_SERVICE_HOST", "http://localhost:3006")
+
+# Read-path scenarios for skills-service and learning-service (opt-in; a weight of 0 disables them)
+SKILLS_SCENARIO_WEIGHT = int(os.getenv("LOADTEST_SKILLS_WEIGHT", "0"))
+LEARNING_SCENARIO_WEIGHT = int(os.getenv("LOADTEST_LEARNING_WEIGHT", "0"))
+
+# Seeded catalog of request parameters. LOADTEST_CATALOG_FILE may hold a JSON object
+# overriding any of the generated lists (business_units, employee_emails,
+# taxonomy_doc_ids, capabilities) with real values.
+CATALOG_FILE = os.getenv("LOADTEST_CATALOG_FILE", "")
+CATALOG_SEED = int(os.getenv("LOADTEST_CATALOG_SEED", "42"))
+CATALOG_EMPLOYEES = int(os.getenv("LOADTEST_CATALOG_EMPLOYEES", "1000"))
+CATALOG_TAXONOMY_DOCS = int(os.getenv("LOADTEST_CATALOG_TAXONOMY_DOCS", "500"))
+CATALOG_SKEW = float(os.getenv("LOADTEST_CATALOG_SKEW", "1.1"))
+
+# Test accounts shared by all virtual users through one token pool per role; each task set
+# declares the role its routes need. The admin pool always holds LOADTEST_ADMIN_EMAIL.
+# Other accounts come from a JSON file of [{"email": ..., "password": ..., "role": ...}]
+# or a generated range, with LOADTEST_ACCOUNT_ROLE where no role is given. A role with no
+# accounts at all gets LOADTEST_PROVISION_ACCOUNTS accounts registered on first use.
+ACCOUNTS_FILE = os.getenv("LOADTEST_ACCOUNTS_FILE", "")
+ACCOUNT_COUNT = int(os.getenv("LOADTEST_ACCOUNT_COUNT", "0"))
+ACCOUNT_EMAIL_PATTERN = os.getenv("LOADTEST_ACCOUNT_EMAIL_PATTERN", "loadtest{n}@example.com")
+ACCOUNT_PASSWORD = os.getenv("LOADTEST_ACCOUNT_PASSWORD", "password123")
+ACCOUNT_ROLE = os.getenv("LOADTEST_ACCOUNT_ROLE", "staff").lower()
+PROVISION_ACCOUNTS = int(os.getenv("LOADTEST_PROVISION_ACCOUNTS", "10"))
+PROVISION_EMAIL_PATTERN = os.getenv("LOADTEST_PROVISION_EMAIL_PATTERN", "loadtest-{role}-{n}@example.com")
+TOKEN_LOGIN_CONCURRENCY = int(os.getenv("LOADTEST_TOKEN_LOGIN_CONCURRENCY", "10"))
+TOKEN_REFRESH_MARGIN = float(os.getenv("LOADTEST_TOKEN_REFRESH_MARGIN", "60"))
+
+# Seeding stage run on test_start (opt-in, it writes to the services' databases): test
+# accounts are registered, employees synced and taxonomy and assessments bulk-upserted
+# concurrently, checkpointing after every wave so an interrupted seed resumes where it
+# stopped. Seeded accounts become the token pool; seeded IDs become the catalog.
+SEED_ENABLED = os.getenv("LOADTEST_SEED", "false").lower() == "true"
+SEED_USERS = int(os.getenv("LOADTEST_SEED_USERS", "1000"))
+SEED_EMPLOYEES = int(os.getenv("LOADTEST_SEED_EMPLOYEES", str(CATALOG_EMPLOYEES)))
+SEED_TAXONOMY_DOCS = int(os.getenv("LOADTEST_SEED_TAXONOMY_DOCS", str(CATALOG_TAXONOMY_DOCS)))
+SEED_ASSESSMENTS = int(os.getenv("LOADTEST_SEED_ASSESSMENTS", str(CATALOG_EMPLOYEES)))
+SEED_CONCURRENCY = int(os.getenv("LOADTEST_SEED_CONCURRENCY", "20"))
+SEED_BATCH_SIZE = int(os.getenv("LOADTEST_SEED_BATCH_SIZE", "500"))
+SEED_CHECKPOINT_FILE = os.getenv("LOADTEST_SEED_CHECKPOINT", "loadtest-seed-checkpoint.json")
+ADMIN_EMAIL = os.getenv("LOADTEST_ADMIN_EMAIL", "admin@example.com")
+ADMIN_PASSWORD = os.getenv("LOADTEST_ADMIN_PASSWORD", "AdminPassword123!")
+
+# HTTP client behind the service users: "requests" (HttpUser) or "fast" (FastHttpUser,
+# geventhttpclient with pooled keep-alive connections)
+HTTP_CLIENT = os.getenv("LOADTEST_HTTP_CLIENT", "requests").lower()
+FAST_HTTP_CONCURRENCY = int(os.getenv("LOADTEST_FAST_HTTP_CONCURRENCY", "10"))
+
+# Load model: "closed" (users loop with think time), "open" (requests scheduled at a
+# target arrival rate by OpenModelShape, latency measured from the intended send time),
+# "capacity" (CapacitySearchShape grows the user count until an SLO breaks)
+# or "replay" (ReplayUser reissues the requests of a recorded traffic log)
+LOAD_MODEL = os.getenv("LOADTEST_LOAD_MODEL", "closed").lower()
+OPEN_PROFILE = os.getenv("LOADTEST_OPEN_PROFILE", "steady").lower()  # steady | step | ramp | spike
+OPEN_RATE = float(os.getenv("LOADTEST_OPEN_RATE", "50"))  # arrivals/s (start rate for step/ramp, base for spike)
+OPEN_RATE_END = float(os.getenv("LOADTEST_OPEN_RATE_END", "200"))  # final rate for step/ramp
+OPEN_STEP_RATE = float(os.getenv("LOADTEST_OPEN_STEP_RATE", "25"))
+OPEN_STEP_SECONDS = float(os.getenv("LOADTEST_OPEN_STEP_SECONDS", "60"))
+OPEN_SPIKE_RATE = float(os.getenv("LOADTEST_OPEN_SPIKE_RATE", "500"))
+OPEN_SPIKE_AT = float(os.getenv("LOADTEST_OPEN_SPIKE_AT", "120"))
+OPEN_SPIKE_SECONDS = float(os.getenv("LOADTEST_OPEN_SPIKE_SECONDS", "30"))
+OPEN_DURATION = float(os.getenv("LOADTEST_OPEN_DURATION", "600"))
+OPEN_DISPATCHERS = int(os.getenv("LOADTEST_OPEN_DISPATCHERS", "10"))  # across all workers
+OPEN_MAX_IN_FLIGHT = int(os.getenv("LOADTEST_OPEN_MAX_IN_FLIGHT", "1000"))  # per dispatcher
+OPEN_POISSON_ARRIVALS = os.getenv("LOADTEST_OPEN_ARRIVALS", "poisson").lower() == "poisson"
+
+# Capacity search (LOADTEST_LOAD_MODEL=capacity). "step" adds LOADTEST_CAPACITY_STEP_USERS
+# per step; "bisect" doubles the user count until the SLO breaks, then bisects down to
+# that resolution. Each step is held until throughput settles, within the min/max hold.
+CAPACITY_STRATEGY = os.getenv("LOADTEST_CAPACITY_STRATEGY", "step").lower()
+CAPACITY_START_USERS = int(os.getenv("LOADTEST_CAPACITY_START_USERS", "10"))
+CAPACITY_STEP_USERS = int(os.getenv("LOADTEST_CAPACITY_STEP_USERS", "10"))
+CAPACITY_MAX_USERS = int(os.getenv("LOADTEST_CAPACITY_MAX_USERS", "1000"))
+CAPACITY_SPAWN_RATE = float(os.getenv("LOADTEST_CAPACITY_SPAWN_RATE", "10"))
+CAPACITY_WARMUP_SECONDS = float(os.getenv("LOADTEST_CAPACITY_WARMUP_SECONDS", "10"))
+CAPACITY_MIN_HOLD_SECONDS = float(os.getenv("LOADTEST_CAPACITY_MIN_HOLD_SECONDS", "30"))
+CAPACITY_MAX_HOLD_SECONDS = float(os.getenv("LOADTEST_CAPACITY_MAX_HOLD_SECONDS", "120"))
+CAPACITY_SETTLE_TOLERANCE = float(os.getenv("LOADTEST_CAPACITY_SETTLE_TOLERANCE", "0.05"))
+CAPACITY_SLO_P99_MS = float(os.getenv("LOADTEST_CAPACITY_SLO_P99_MS", "500"))
+CAPACITY_SLO_ERROR_RATE = float(os.getenv("LOADTEST_CAPACITY_SLO_ERROR_RATE", "0.01"))
+CAPACITY_REPORT_FILE = os.getenv("LOADTEST_CAPACITY_REPORT", "capacity-report.json")
+
+# Replay of recorded traffic (LOADTEST_LOAD_MODEL=replay). LOADTEST_REPLAY_FILE is streamed
+# from disk one entry at a time (gzip if it ends in .gz): the services' JSON log lines, a
+# logcli export of their Loki streams (logcli query --forward --output=jsonl), or access
+# log JSONL with method, path or url, service and timestamp fields. Requests go out at
+# their original relative times divided by LOADTEST_REPLAY_SPEED, with idle gaps in the
+# log capped at LOADTEST_REPLAY_MAX_GAP seconds (0 keeps them). Service logs carry no
+# bodies, so only LOADTEST_REPLAY_METHODS are replayed unless entries include a body.
+# learning- and integration-service log as "skills-service" unless SERVICE_NAME is set.
+REPLAY_FILE = os.getenv("LOADTEST_REPLAY_FILE", "")
+REPLAY_SPEED = float(os.getenv("LOADTEST_REPLAY_SPEED", "1"))
+REPLAY_MAX_GAP = float(os.getenv("LOADTEST_REPLAY_MAX_GAP", "0"))
+REPLAY_METHODS = {method.strip().upper() for method in os.getenv("LOADTEST_REPLAY_METHODS", "GET,HEAD").split(",") if method.strip()}
+REPLAY_MAX_IN_FLIGHT = int(os.getenv("LOADTEST_REPLAY_MAX_IN_FLIGHT", "1000"))  # per process
+REPLAY_START_DELAY = float(os.getenv("LOADTEST_REPLAY_START_DELAY", "2"))  # lets every worker start on the same clock
+REPLAY_SERVICES = dict(
+    service.strip().split("=", 1) for service in os.getenv("LOADTEST_REPLAY_SERVICES", "").split(",") if "=" in service
+) or {
+    "user-service": USER_SERVICE_HOST,
+    "email-service": EMAIL_SERVICE_HOST,
+    "skills-service": SKILLS_SERVICE_HOST,
+    "learning-service": LEARNING_SERVICE_HOST,
+    "integration-service": INTEGRATION_SERVICE_HOST,
+    "event-processes-service": EVENT_PROCESSES_SERVICE_HOST,
+}
+# Routes the services serve without a JWT (auth, integration-service workflows, health, /metrics);
+# replayed requests to them go out without an Authorization header, as the originals did
+REPLAY_PUBLIC_ROUTES = re.compile(os.getenv("LOADTEST_REPLAY_PUBLIC_ROUTES", r"^/(auth/|workflows/|metrics(\?|$)|(\?|$))"))
+
+# Retry layer shared by all task sets
+RETRY_BUDGET_RATIO = float(os.getenv("LOADTEST_RETRY_BUDGET_RATIO", "0.1"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LOADTEST_BREAKER_THRESHOLD", "20"))
+BREAKER_COOLDOWN = float(os.getenv("LOADTEST_BREAKER_COOLDOWN", "5"))
+
+# Bulk-write scenario against the skills-service sync endpoints. Opt-in because it
+# writes to Mongo. Batch sizes are swept in order, each held for LOADTEST_BULK_STEP_SECONDS
+# (0 cycles through them round-robin instead).
+BULK_SCENARIO_WEIGHT = int(os.getenv("LOADTEST_BULK_WEIGHT", "0"))
+BULK_TARGETS = [target.strip() for target in os.getenv("LOADTEST_BULK_TARGETS", "technical,soft,assessments").split(",") if target.strip()]
+BULK_BATCH_SIZES = [int(size) for size in os.getenv("LOADTEST_BULK_BATCH_SIZES", "100,500,1000,5000,10000,50000").split(",")]
+BULK_STEP_SECONDS = float(os.getenv("LOADTEST_BULK_STEP_SECONDS", "60"))
+BULK_ID_SPACE = int(os.getenv("LOADTEST_BULK_ID_SPACE", "100000"))
+
+# Request names of bulk writes encode their target and batch size, e.g. "bulk_technical[1000]"
+BULK_WRITE_NAME = re.compile(r"^bulk_(\w+)\[(\d+)\]$")
+
+# Email-service workflow notifications. The burst scenario (weight 0 disables it) fires
+# LOADTEST_EMAIL_BURST_SIZE notifications at once every LOADTEST_EMAIL_BURST_INTERVAL
+# seconds, the way n8n reports a batch of finished workflows. Both routes need an admin token.
+EMAIL_BURST_WEIGHT = int(os.getenv("LOADTEST_EMAIL_BURST_WEIGHT", "0"))
+EMAIL_BURST_SIZE = int(os.getenv("LOADTEST_EMAIL_BURST_SIZE", "50"))
+EMAIL_BURST_INTERVAL = float(os.getenv("LOADTEST_EMAIL_BURST_INTERVAL", "10"))
+EMAIL_ERROR_RATIO = float(os.getenv("LOADTEST_EMAIL_ERROR_RATIO", "0.33"))
+
+# SMTP sink standing in for MailHog (stop it first: email-service always delivers to
+# localhost:1025, so the sink must run on the email-service host). Workflow names carry
+# their send time, and every delivered mail is reported as an "SMTP" request whose
+# response time is the end-to-end delivery latency. A port of 0 disables the sink.
+EMAIL_SINK_PORT = int(os.getenv("LOADTEST_EMAIL_SINK_PORT", "0"))
+EMAIL_SINK_BIND = os.getenv("LOADTEST_EMAIL_SINK_BIND", "127.0.0.1")
+
+# Integration-service n8n fan-in (opt-in, it writes to Mongo). Webhook users post bursts of
+# LOADTEST_INTEGRATION_FANIN concurrent webhooks, replayed in order from the recorded bodies
+# in LOADTEST_WEBHOOK_PAYLOADS (one JSON object per line) or generated. A share of each
+# burst can go to email-service's Grafana alert route instead. Reader users poll the unread
+# count, list notifications and mark the ingested ones read.
+INTEGRATION_WEBHOOK_WEIGHT = int(os.getenv("LOADTEST_INTEGRATION_WEBHOOK_WEIGHT", "0"))
+INTEGRATION_READER_WEIGHT = int(os.getenv("LOADTEST_INTEGRATION_READER_WEIGHT", "0"))
+INTEGRATION_FANIN = int(os.getenv("LOADTEST_INTEGRATION_FANIN", "20"))
+INTEGRATION_BURST_INTERVAL = float(os.getenv("LOADTEST_INTEGRATION_BURST_INTERVAL", "10"))
+INTEGRATION_GRAFANA_RATIO = float(os.getenv("LOADTEST_INTEGRATION_GRAFANA_RATIO", "0"))
+WEBHOOK_PAYLOADS_FILE = os.getenv("LOADTEST_WEBHOOK_PAYLOADS", "")
+
+# Weight of the dedicated login scenario; 0 keeps login load out of the run
+LOGIN_SCENARIO_WEIGHT = int(os.getenv("LOADTEST_LOGIN_WEIGHT", "0"))
+
+# Resource sampler. The adaptive mode samples between the min and max interval, faster
+# while throughput or CPU is moving. Besides this process and local workers it tracks
+# "label=pid" / "label=port" processes and, unless disabled, services on localhost ports.
+SAMPLE_INTERVAL = float(os.getenv("LOADTEST_SAMPLE_INTERVAL", "1"))
+SAMPLE_ADAPTIVE = os.getenv("LOADTEST_SAMPLE_ADAPTIVE", "false").lower() == "true"
+SAMPLE_MIN_INTERVAL = float(os.getenv("LOADTEST_SAMPLE_MIN_INTERVAL", "0.25"))
+SAMPLE_MAX_INTERVAL = float(os.getenv("LOADTEST_SAMPLE_MAX_INTERVAL", "5"))
+TRACK_PIDS = dict(item.strip().split("=", 1) for item in os.getenv("LOADTEST_TRACK_PIDS", "").split(",") if "=" in item)
+TRACK_PORTS = dict(item.strip().split("=", 1) for item in os.getenv("LOADTEST_TRACK_PORTS", "").split(",") if "=" in item)
+TRACK_LOCAL_SERVICES = os.getenv("LOADTEST_TRACK_LOCAL_SERVICES", "true").lower() == "true"
+
+# Live dashboard redraws per second; the dashboard never renders on the request path
+DASHBOARD_REFRESH_HZ = float(os.getenv("LOADTEST_DASHBOARD_HZ", "1"))
+
+# Per-endpoint rows shown on the dashboard (busiest first)
+DASHBOARD_ENDPOINT_ROWS = int(os.getenv("LOADTEST_DASHBOARD_ENDPOINTS", "20"))
+
+# Failures are grouped by endpoint, status and message fingerprint. Each process logs the
+# first failure of a group, then at most LOADTEST_ERROR_LOG_RATE lines per second.
+ERROR_LOG_RATE = float(os.getenv("LOADTEST_ERROR_LOG_RATE", "1"))
+ERROR_LOG_BURST = int(os.getenv("LOADTEST_ERROR_LOG_BURST", "10"))
+ERROR_MAX_GROUPS = int(os.getenv("LOADTEST_ERROR_MAX_GROUPS", "500"))
+
+# Latency bins (ms) behind the per-endpoint sparkline; the last bin is open-ended
+SPARKLINE_EDGES_MS = (2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+SPARKLINE_CHARS = " ▁▂▃▄▅▆▇█"
+
+# Opt-in profiling of the generator itself. Every process samples its own main thread at
+# LOADTEST_PROFILE_HZ for a window and writes a folded-stack profile (flamegraph.pl,
+# speedscope), and request listeners and task methods are timed for the whole run.
+PROFILE_ENABLED = os.getenv("LOADTEST_PROFILE", "false").lower() == "true"
+PROFILE_HZ = float(os.getenv("LOADTEST_PROFILE_HZ", "97"))  # Off a round number to avoid lockstep with timers
+PROFILE_DELAY = float(os.getenv("LOADTEST_PROFILE_DELAY", "10"))
+PROFILE_SECONDS = float(os.getenv("LOADTEST_PROFILE_SECONDS", "30"))
+PROFILE_DIR = os.getenv("LOADTEST_PROFILE_DIR", ".")
+
+# Time series export of every collection tick; disabled unless a directory is given
+TIMESERIES_DIR = os.getenv("LOADTEST_TIMESERIES_DIR", "")
+TIMESERIES_MAX_FILE_MB = int(os.getenv("LOADTEST_TIMESERIES_MAX_FILE_MB", "64"))
+TIMESERIES_COMPRESS = os.getenv("LOADTEST_TIMESERIES_COMPRESS", "false").lower() == "true"
+
+# Server-side metrics scraped from each service's Prometheus /metrics endpoint. Targets
+# default to every service host; LOADTEST_SCRAPE_TARGETS takes "name=url" pairs.
+# An interval of 0 disables scraping.
+SCRAPE_INTERVAL = float(os.getenv("LOADTEST_SCRAPE_INTERVAL", "5"))
+SCRAPE_TIMEOUT = float(os.getenv("LOADTEST_SCRAPE_TIMEOUT", "2"))
+SCRAPE_TARGETS = dict(
+    target.strip().split("=", 1) for target in os.getenv("LOADTEST_SCRAPE_TARGETS", "").split(",") if "=" in target
+) or {
+    "user-service": USER_SERVICE_HOST,
+    "email-service": EMAIL_SERVICE_HOST,
+    "skills-service": SKILLS_SERVICE_HOST,
+    "learning-service": LEARNING_SERVICE_HOST,
+}
+
+# Structured run summary written when the run ends (empty disables it). With a baseline
+# summary, the run exits non-zero when it regresses beyond the tolerances below.
+SUMMARY_FILE = os.getenv("LOADTEST_SUMMARY_FILE", "loadtest-summary.json")
+BASELINE_FILE = os.getenv("LOADTEST_BASELINE_FILE", "")
+REGRESSION_TOLERANCE = float(os.getenv("LOADTEST_REGRESSION_TOLERANCE", "0.10"))  # Relative slowdown/drop allowed
+REGRESSION_ABS_MS = float(os.getenv("LOADTEST_REGRESSION_ABS_MS", "5"))  # Latency slack below which changes are noise
+REGRESSION_PERCENTILES = [p.strip() for p in os.getenv("LOADTEST_REGRESSION_PERCENTILES", "p95,p99").split(",") if p.strip()]
+REGRESSION_MIN_SAMPLES = int(os.getenv("LOADTEST_REGRESSION_MIN_SAMPLES", "100"))
+
+# Key under which workers attach their custom metrics to Locust's worker reports
+METRICS_REPORT_KEY = "skills_base_metrics"
+
+# Custom message the master uses to hand seeded accounts and catalog lists to workers
+SEED_MESSAGE = "skills_base_seed"
+
+# Custom messages assigning each worker its share of the replay log, and reporting it done
+REPLAY_MESSAGE = "skills_base_replay"
+REPLAY_DONE_MESSAGE = "skills_base_replay_done"
+
+# Request lines as logged by the shared LoggerMiddleware, e.g. "Incoming GET /api/skills/:id"
+INCOMING_REQUEST = re.compile(r"^Incoming ([A-Z]+) (\S+)")
+
+# Quantiles reported for every latency histogram
+REPORTED_PERCENTILES = (0.50, 0.90, 0.95, 0.99, 0.999)
+
+class LatencyHistogram:
+    """HDR-style log-linear latency histogram.
+
+    Values are recorded in microseconds into buckets whose width doubles every
+    power of two, so the relative error of any reported value stays below
+    1 / 2**(sub_bucket_bits - 1) while memory is fixed by ``max_value_ms``
+    rather than by the number of samples. Histograms with the same layout can
+    be merged by adding their bucket counts, and quantiles are answered with a
+    single cumulative walk over the buckets instead of a sort.
+    """
+
+    def __init__(self, sub_bucket_bits=8, max_value_ms=3_600_000):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value_ms = max_value_ms
+        self._sub_bucket_count = 1 << sub_bucket_bits
+        self._half_count = self._sub_bucket_count >> 1
+        self._max_value_us = int(max_value_ms * 1000)
+        self.counts = array('Q', [0]) * (self._index(self._max_value_us) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _index(self, value_us):
+        if value_us < self._sub_bucket_count:
+            return value_us
+        shift = value_us.bit_length() - self.sub_bucket_bits
+        return (shift << (self.sub_bucket_bits - 1)) + (value_us >> shift)
+
+    def _value_at(self, index):
+        """Midpoint (in microseconds) of the values that map to ``index``"""
+        if index < self._sub_bucket_count:
+            return index
+        shift = (index >> (self.sub_bucket_bits - 1)) - 1
+        top = index - (shift << (self.sub_bucket_bits - 1))
+        return (top << shift) + ((1 << shift) >> 1)
+
+    def record(self, value_ms):
+        """Record a single latency sample given in milliseconds"""
+        value_us = min(max(int(value_ms * 1000), 0), self._max_value_us)
+        self.counts[self._index(value_us)] += 1
+        self.count += 1
+        self.total += value_ms
+        if self.min is None or value_ms < self.min:
+            self.min = value_ms
+        if self.max is None or value_ms > self.max:
+            self.max = value_ms
+
+    def merge(self, other):
+        """Add the samples of another histogram with the same layout"""
+        if other.sub_bucket_bits != self.sub_bucket_bits or len(other.counts) != len(self.counts):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        counts = self.counts
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def to_sparse(self):
+        """Encode the histogram compactly as its non-empty buckets (for worker reports)"""
+        buckets = []
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count:
+                buckets.extend((index, bucket_count))
+        return {
+            'bits': self.sub_bucket_bits,
+            'size': len(self.counts),
+            'buckets': buckets,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+        }
+
+    def merge_sparse(self, data):
+        """Merge a histogram encoded with ``to_sparse``"""
+        if data['bits'] != self.sub_bucket_bits or data['size'] != len(self.counts):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        counts = self.counts
+        buckets = data['buckets']
+        for i in range(0, len(buckets), 2):
+            counts[buckets[i]] += buckets[i + 1]
+        self.count += data['count']
+        self.total += data['total']
+        if data['min'] is not None and (self.min is None or data['min'] < self.min):
+            self.min = data['min']
+        if data['max'] is not None and (self.max is None or data['max'] > self.max):
+            self.max = data['max']
+        return self
+
+    def since(self, previous=None):
+        """Return a new histogram holding only the samples recorded after ``previous`` (a copy of self)"""
+        interval = LatencyHistogram(self.sub_bucket_bits, self.max_value_ms)
+        if previous is None:
+            interval.counts = array('Q', self.counts)
+            interval.count = self.count
+            interval.total = self.total
+        else:
+            interval.counts = array('Q', (now - before for now, before in zip(self.counts, previous.counts)))
+            interval.count = self.count - previous.count
+            interval.total = self.total - previous.total
+        return interval
+
+    def copy(self):
+        duplicate = self.since()
+        duplicate.min = self.min
+        duplicate.max = self.max
+        return duplicate
+
+    def reset(self):
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentiles(self, quantiles: Iterable[float] = REPORTED_PERCENTILES) -> Dict[float, float]:
+        """Return ``{quantile: latency_ms}`` using one pass over the buckets"""
+        quantiles = sorted(quantiles)
+        results = {q: 0.0 for q in quantiles}
+        if not self.count:
+            return results
+
+        targets = [(q, max(1, int(q * self.count + 0.5))) for q in quantiles]
+        position = 0
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            while position < len(targets) and seen >= targets[position][1]:
+                value_ms = self._value_at(index) / 1000
+                if self.min is not None:
+                    value_ms = min(max(value_ms, self.min), self.max)
+                results[targets[position][0]] = value_ms
+                position += 1
+            if position == len(targets):
+                break
+        return results
+
+    def percentile(self, quantile):
+        return self.percentiles((quantile,))[quantile]
+
+    def bin_counts(self, edges_ms):
+        """Sample counts per latency bin; ``edges_ms`` are the upper bounds of all but the last bin"""
+        bins = [0] * (len(edges_ms) + 1)
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count:
+                bins[bisect.bisect_right(edges_ms, self._value_at(index) / 1000)] += bucket_count
+        return bins
+
+    def percentile_interval(self, quantile, z=1.96):
+        """Distribution-free confidence interval ``(low, high)`` for a quantile.
+
+        The rank of the sample quantile is approximately normal with variance
+        n*q*(1-q), so the values at ranks q*n -/+ z*sqrt(n*q*(1-q)) bound it.
+        """
+        if not self.count:
+            return 0.0, 0.0
+        spread = z * (quantile * (1 - quantile) / self.count) ** 0.5
+        bounds = self.percentiles((max(quantile - spread, 0.0), min(quantile + spread, 1.0)))
+        return bounds[max(quantile - spread, 0.0)], bounds[min(quantile + spread, 1.0)]
+
+class RequestCounterRing:
+    """Per-second request, error and byte counters per endpoint.
+
+    The request path only increments counters in the live bucket. The collector
+    thread retires that bucket on its own tick by swapping in a fresh one, folds
+    it into the run totals and keeps the last ``seconds`` buckets for rates.
+
+    No lock is taken, which is only safe under gevent monkey-patching (applied
+    when locust is imported, before this module creates any thread). The
+    collector's ``threading.Thread`` is then a greenlet on the same OS thread
+    as the request path, none of these methods yield, and the swap is a single
+    reference assignment, so no increment is lost. Do not call into this from a
+    native thread (e.g. ``monkey.get_original`` or the hub's threadpool).
+    """
+
+    REQUESTS, ERRORS, BYTES = 0, 1, 2
+
+    def __init__(self, seconds=60):
+        self.buckets = deque(maxlen=seconds)  # (elapsed_seconds, {name: [requests, errors, bytes]})
+        self.totals: Dict[str, List[int]] = {}
+        self._current: Dict[str, List[int]] = {}
+        self._bucket_started = time.monotonic()
+        self._spreading: List[list] = []  # [started, seconds, name, counters, released]
+
+    def increment(self, name, failed=False, response_length=0):
+        """Count one request against the live bucket (request hot path)"""
+        counters = self._current.get(name)
+        if counters is None:
+            counters = self._current[name] = [0, 0, 0]
+        counters[0] += 1
+        if failed:
+            counters[1] += 1
+        counters[2] += response_length
+
+    def add(self, name, requests, errors, response_bytes, spread=0.0, now=None):
+        """Add pre-aggregated counts, e.g. from a worker report.
+
+        With ``spread`` the counts are released into the live bucket evenly
+        over that many seconds as the ring rolls, instead of all landing in
+        one bucket. Worker reports arrive every few seconds, so this keeps the
+        master's per-second rates from spiking on report ticks and reading
+        zero in between, at the cost of lagging by one report interval.
+        Totals include the unreleased part straight away.
+        """
+        if spread > 0:
+            started = now if now is not None else time.monotonic()
+            self._spreading.append([started, spread, name, (requests, errors, response_bytes), [0, 0, 0]])
+            return
+        counters = self._current.get(name)
+        if counters is None:
+            counters = self._current[name] = [0, 0, 0]
+        counters[0] += requests
+        counters[1] += errors
+        counters[2] += response_bytes
+
+    def _release(self, now):
+        """Move the share of every spread addition that is due by ``now`` into the live bucket"""
+        pending = []
+        for entry in self._spreading:
+            started, seconds, name, counts, released = entry
+            fraction = min(max((now - started) / seconds, 0.0), 1.0)
+            due = [int(count * fraction) if fraction < 1.0 else count for count in counts]
+            if due != released:
+                self.add(name, due[0] - released[0], due[1] - released[1], due[2] - released[2])
+                entry[4] = due
+            if fraction < 1.0:
+                pending.append(entry)
+        self._spreading = pending
+
+    def roll(self, now=None):
+        """Retire the live bucket; returns ``(elapsed_seconds, {name: counters})``"""
+        now = now if now is not None else time.monotonic()
+        if self._spreading:
+            self._release(now)
+        retired, self._current = self._current, {}
+        elapsed = max(now - self._bucket_started, 1e-6)
+        self._bucket_started = now
+        for name, counters in retired.items():
+            total = self.totals.get(name)
+            if total is None:
+                self.totals[name] = list(counters)
+            else:
+                total[0] += counters[0]
+                total[1] += counters[1]
+                total[2] += counters[2]
+        self.buckets.append((elapsed, retired))
+        return elapsed, retired
+
+    def cumulative(self) -> Dict[str, List[int]]:
+        """Whole-run counters per endpoint, including the live bucket"""
+        result = {name: list(counters) for name, counters in self.totals.items()}
+        for name, counters in list(self._current.items()):
+            total = result.setdefault(name, [0, 0, 0])
+            total[0] += counters[0]
+            total[1] += counters[1]
+            total[2] += counters[2]
+        for _, _, name, counts, released in self._spreading:
+            total = result.setdefault(name, [0, 0, 0])
+            total[0] += counts[0] - released[0]
+            total[1] += counts[1] - released[1]
+            total[2] += counts[2] - released[2]
+        return result
+
+    def total(self, field=REQUESTS):
+        value = sum(counters[field] for counters in self.totals.values())
+        value += sum(counts[field] - released[field] for _, _, _, counts, released in self._spreading)
+        return value + sum(counters[field] for counters in list(self._current.values()))
+
+    def rates(self, window=5) -> Dict[str, List[float]]:
+        """Per-endpoint ``[requests/s, errors/s, bytes/s]`` over the last ``window`` buckets"""
+        recent = list(self.buckets)[-window:]
+        elapsed = sum(bucket_elapsed for bucket_elapsed, _ in recent)
+        rates: Dict[str, List[float]] = {}
+        if not elapsed:
+            return rates
+        for _, bucket in recent:
+            for name, counters in bucket.items():
+                rate = rates.setdefault(name, [0.0, 0.0, 0.0])
+                rate[0] += counters[0] / elapsed
+                rate[1] += counters[1] / elapsed
+                rate[2] += counters[2] / elapsed
+        return rates
+
 class SystemMetrics:
-    def __init__(self, interval=1.0):
+    """Background sampler of host and per-process resource usage.
+
+    One psutil call per resource per tick: total CPU is the mean of the
+    per-core values rather than a second system-wide read. Rates use the
+    measured time between samples from a monotonic clock, so a late tick
+    doesn't inflate them. Besides the host, it tracks chosen processes (this
+    one, local Locust workers, local services found by listening port). With
+    ``adaptive`` the interval shortens while the load is changing and
+    stretches while it is steady. The sampler's own cost is reported as the
+    share of wall time spent sampling.
+    """
+
+    def __init__(self, interval=1.0, request_counters=None, adaptive=False, min_interval=0.25, max_interval=5.0):
         self.interval = interval
+        self.base_interval = interval
+        self.adaptive = adaptive
+        self.min_interval = min(min_interval, interval)
+        self.max_interval = max(max_interval, interval)
         self.running = False
         self.metrics_history = {
             'cpu_total': deque(maxlen=60),
@@ -42,22 +623,71 @@ class SystemMetrics:
             'disk_io_read': deque(maxlen=60),
             'disk_io_write': deque(maxlen=60),
             'tps': deque(maxlen=60),  # Transactions per second
+            'errors_per_sec': deque(maxlen=60),
+            'bytes_per_sec': deque(maxlen=60),
         }
+        self.request_counters = request_counters if request_counters is not None else RequestCounterRing()
         self.last_network_io = None
         self.last_disk_io = None
-        self.last_request_count = 0
-        self.last_request_time = time.time()
+        self.last_sample_at = None
+        self.peaks: Dict[str, float] = {}  # Whole-run maximum of each resource
+        self.processes: Dict[str, psutil.Process] = {}  # label -> tracked process
+        self.process_metrics: Dict[str, Dict] = {}
+        self.sample_count = 0
+        self.sample_seconds = 0.0  # Wall time spent inside sampling
+        self.sample_seconds_max = 0.0
+        self._started_at = None
+        self.on_sample = None  # Optional callback receiving every raw collection tick
         self._lock = threading.Lock()
+        self._wake = threading.Event()
         self.collection_thread = None
-        
+
         # Initialize CPU per core tracking
         cpu_count = psutil.cpu_count()
         for i in range(cpu_count):
             self.metrics_history['cpu_per_core'][i] = deque(maxlen=60)
+        self.track_pid("locust", os.getpid())
+
+    def track_pid(self, label, pid):
+        """Add a process to the per-process table; unknown PIDs are ignored"""
+        try:
+            process = psutil.Process(pid)
+            process.cpu_percent(interval=None)  # Prime the CPU delta
+        except psutil.Error:
+            return False
+        with self._lock:
+            self.processes[label] = process
+        return True
+
+    def track_port(self, label, port):
+        """Track whichever local process listens on ``port`` (e.g. a service under test)"""
+        return self.track_ports({label: port})
+
+    def track_ports(self, ports):
+        """Track the local processes listening on ``{label: port}``.
+
+        ``psutil.net_connections`` scans the whole socket table and blocks, so
+        it runs once for all ports on the hub's native threadpool; only this
+        greenlet waits for it, not the users. Returns whether every port was found.
+        """
+        wanted = {port: label for label, port in ports.items()}
+        try:
+            connections = gevent.get_hub().threadpool.apply(psutil.net_connections, kwds={"kind": "tcp"})
+        except psutil.AccessDenied:
+            logging.warning(f"Not allowed to look up the processes listening on ports {sorted(wanted)}")
+            return False
+        found = 0
+        for connection in connections:
+            if connection.status == psutil.CONN_LISTEN and connection.laddr and connection.pid:
+                label = wanted.pop(connection.laddr.port, None)
+                if label is not None:
+                    found += self.track_pid(label, connection.pid)
+        return found == len(ports)
 
     def start(self):
         """Start the metrics collection thread"""
         self.running = True
+        self._started_at = time.monotonic()
         self.collection_thread = threading.Thread(target=self._collect_metrics)
         self.collection_thread.daemon = True
         self.collection_thread.start()
@@ -66,26 +696,74 @@ class SystemMetrics:
     def stop(self):
         """Stop the metrics collection thread"""
         self.running = False
+        self._wake.set()
         if self.collection_thread and self.collection_thread.is_alive():
             self.collection_thread.join(timeout=5)
         logging.info("System metrics collection stopped")
 
+    def _sample_processes(self):
+        samples = {}
+        for label, process in list(self.processes.items()):
+            try:
+                with process.oneshot():
+                    samples[label] = {
+                        'pid': process.pid,
+                        'cpu_percent': process.cpu_percent(interval=None),
+                        'rss_mb': process.memory_info().rss / (1024 * 1024),
+                        'threads': process.num_threads(),
+                    }
+            except psutil.Error:
+                # The process exited (e.g. a worker that stopped); stop tracking it
+                with self._lock:
+                    self.processes.pop(label, None)
+        return samples
+
+    def _next_interval(self, cpu_percent, tps):
+        """Shorten the interval while load moves, stretch it while steady"""
+        history = self.metrics_history
+        if len(history['tps']) < 2:
+            return self.interval
+        previous_tps = history['tps'][-2]
+        previous_cpu = history['cpu_total'][-2]
+        changing = abs(tps - previous_tps) > 0.2 * max(previous_tps, 1.0) or abs(cpu_percent - previous_cpu) > 10
+        if changing:
+            return max(self.min_interval, self.interval / 2)
+        return min(self.max_interval, self.interval * 1.5)
+
     def _collect_metrics(self):
         while self.running:
+            sample_started = time.perf_counter()
             try:
-                # CPU metrics
-                cpu_percent = psutil.cpu_percent(interval=None)
+                now = time.monotonic()
+                elapsed = now - self.last_sample_at if self.last_sample_at else None
+                self.last_sample_at = now
+
+                # CPU metrics; the host total is the mean of the cores
                 cpu_per_core = psutil.cpu_percent(interval=None, percpu=True)
-                
+                cpu_percent = sum(cpu_per_core) / len(cpu_per_core) if cpu_per_core else 0.0
+
                 # Memory metrics
                 memory = psutil.virtual_memory()
                 swap = psutil.swap_memory()
-                
+
                 # I/O metrics
                 network_io = psutil.net_io_counters()
                 disk_io = psutil.disk_io_counters()
+                processes = self._sample_processes()
+
+                # Retire this second's request counters on the collector's tick
+                roll_elapsed, retired = self.request_counters.roll()
+                tps = sum(c[0] for c in retired.values()) / roll_elapsed
+                errors_per_sec = sum(c[1] for c in retired.values()) / roll_elapsed
+                bytes_per_sec = sum(c[2] for c in retired.values()) / roll_elapsed
+                network_in = network_out = disk_read = disk_write = None
 
                 with self._lock:
+                    # Request rates
+                    self.metrics_history['tps'].append(tps)
+                    self.metrics_history['errors_per_sec'].append(errors_per_sec)
+                    self.metrics_history['bytes_per_sec'].append(bytes_per_sec)
+
                     # CPU metrics
                     self.metrics_history['cpu_total'].append(cpu_percent)
                     for i, core_percent in enumerate(cpu_per_core):
@@ -97,42 +775,79 @@ class SystemMetrics:
                     self.metrics_history['memory_available'].append(memory.available / (1024 * 1024 * 1024))  # Convert to GB
                     self.metrics_history['swap_percent'].append(swap.percent)
 
-                    # Network I/O
-                    if self.last_network_io:
+                    # Network I/O, over the measured time since the previous sample
+                    if self.last_network_io and elapsed:
                         bytes_sent = network_io.bytes_sent - self.last_network_io.bytes_sent
                         bytes_recv = network_io.bytes_recv - self.last_network_io.bytes_recv
-                        self.metrics_history['network_out'].append(bytes_sent / self.interval)
-                        self.metrics_history['network_in'].append(bytes_recv / self.interval)
+                        network_out = bytes_sent / elapsed
+                        network_in = bytes_recv / elapsed
+                        self.metrics_history['network_out'].append(network_out)
+                        self.metrics_history['network_in'].append(network_in)
 
-                    # Disk I/O
-                    if self.last_disk_io:
+                    # Disk I/O (None on hosts without disk counters, e.g. some containers)
+                    if self.last_disk_io and disk_io and elapsed:
                         bytes_read = disk_io.read_bytes - self.last_disk_io.read_bytes
                         bytes_written = disk_io.write_bytes - self.last_disk_io.write_bytes
-                        self.metrics_history['disk_io_read'].append(bytes_read / self.interval)
-                        self.metrics_history['disk_io_write'].append(bytes_written / self.interval)
+                        disk_read = bytes_read / elapsed
+                        disk_write = bytes_written / elapsed
+                        self.metrics_history['disk_io_read'].append(disk_read)
+                        self.metrics_history['disk_io_write'].append(disk_write)
+
+                    for key, value in (('cpu_total', cpu_percent), ('memory_percent', memory.percent),
+                                       ('memory_used_gb', memory.used / (1024 * 1024 * 1024)),
+                                       ('swap_percent', swap.percent), ('network_in', network_in),
+                                       ('network_out', network_out), ('disk_io_read', disk_read),
+                                       ('disk_io_write', disk_write), ('tps', tps)):
+                        if value is not None and value > self.peaks.get(key, float('-inf')):
+                            self.peaks[key] = value
 
                     self.last_network_io = network_io
                     self.last_disk_io = disk_io
+                    self.process_metrics = processes
+
+                if self.on_sample:
+                    self.on_sample({
+                        'ts': time.time(),
+                        'interval': roll_elapsed,
+                        'cpu_total': cpu_percent,
+                        'cpu_per_core': cpu_per_core,
+                        'memory_percent': memory.percent,
+                        'memory_used_gb': memory.used / (1024 * 1024 * 1024),
+                        'memory_available_gb': memory.available / (1024 * 1024 * 1024),
+                        'swap_percent': swap.percent,
+                        'network_in': network_in,
+                        'network_out': network_out,
+                        'disk_io_read': disk_read,
+                        'disk_io_write': disk_write,
+                        'tps': tps,
+                        'errors_per_sec': errors_per_sec,
+                        'bytes_per_sec': bytes_per_sec,
+                        'processes': processes,
+                        'endpoint_counters': retired,
+                    })
+
+                if self.adaptive:
+                    self.interval = self._next_interval(cpu_percent, tps)
 
             except Exception as e:
                 logging.error(f"Error collecting system metrics: {str(e)}")
 
-            time.sleep(self.interval)
+            spent = time.perf_counter() - sample_started
+            self.sample_count += 1
+            self.sample_seconds += spent
+            self.sample_seconds_max = max(self.sample_seconds_max, spent)
+            self._wake.wait(max(0.0, self.interval - spent))
 
-    def update_tps(self, current_requests):
-        """Update the transactions per second metric"""
-        try:
-            current_time = time.time()
-            time_diff = current_time - self.last_request_time
-            if time_diff >= 1.0:  # Calculate TPS over 1-second intervals
-                requests_diff = current_requests - self.last_request_count
-                tps = requests_diff / time_diff
-                with self._lock:
-                    self.metrics_history['tps'].append(tps)
-                self.last_request_count = current_requests
-                self.last_request_time = current_time
-        except Exception as e:
-            logging.error(f"Error updating TPS: {str(e)}")
+    def overhead(self):
+        """Cost of the sampler itself: mean and max time per sample, share of wall time"""
+        running_for = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            'samples': self.sample_count,
+            'interval': self.interval,
+            'sample_ms_mean': self.sample_seconds / self.sample_count * 1000 if self.sample_count else 0.0,
+            'sample_ms_max': self.sample_seconds_max * 1000,
+            'percent': self.sample_seconds / running_for * 100 if running_for else 0.0,
+        }
 
     def get_current_metrics(self):
         """Get the current metrics with proper error handling"""
@@ -155,24 +870,782 @@ class SystemMetrics:
                     'disk_io_write_avg': mean(self.metrics_history['disk_io_write']) if self.metrics_history['disk_io_write'] else 0,
                     'tps_current': mean(list(self.metrics_history['tps'])[-5:]) if self.metrics_history['tps'] else 0,
                     'tps_avg': mean(self.metrics_history['tps']) if self.metrics_history['tps'] else 0,
+                    'errors_per_sec_current': mean(list(self.metrics_history['errors_per_sec'])[-5:]) if self.metrics_history['errors_per_sec'] else 0,
+                    'bytes_per_sec_current': mean(list(self.metrics_history['bytes_per_sec'])[-5:]) if self.metrics_history['bytes_per_sec'] else 0,
+                    'endpoint_rates': self.request_counters.rates(window=5),
+                    'processes': dict(self.process_metrics),
+                    'sampler': self.overhead(),
                 }
         except Exception as e:
             logging.error(f"Error getting current metrics: {str(e)}")
             return {}
 
+class TimeSeriesWriter:
+    """Appends one JSON line per collection tick to rotating files on disk.
+
+    The collector only appends records to an in-memory deque; a writer drains
+    it every ``flush_interval`` seconds and writes the batch in one call. Under
+    gevent monkey-patching the writer ``threading.Thread`` is a greenlet on the
+    hub, so encoding and writing a batch does pause request greenlets; batching
+    keeps that to one short pause per interval. Files rotate once
+    ``max_file_bytes`` have been written to disk, counted after compression.
+    """
+
+    def __init__(self, directory, max_file_bytes=64 * 1024 * 1024, flush_interval=5.0, compress=False):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.pending = deque()
+        self.running = False
+        self.writer_thread = None
+        self.records_written = 0
+        self._file = None
+        self._raw_file = None  # The file on disk, under the gzip stream when compressing
+        self._file_bytes = 0
+        self._sequence = 0
+
+    def start(self):
+        """Start the background writer thread"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.running = True
+        self.writer_thread = threading.Thread(target=self._write_loop)
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+        logging.info(f"Writing metrics time series to {self.directory}")
+
+    def stop(self):
+        """Flush pending records and close the current file"""
+        self.running = False
+        if self.writer_thread and self.writer_thread.is_alive():
+            self.writer_thread.join(timeout=5)
+        self._flush()
+        self._close()
+        logging.info(f"Wrote {self.records_written:,} time series records")
+
+    def write(self, record):
+        """Queue a record for the next batch (safe to call from any thread)"""
+        self.pending.append(record)
+
+    def _write_loop(self):
+        while self.running:
+            time.sleep(self.flush_interval)
+            try:
+                self._flush()
+            except Exception as e:
+                logging.error(f"Error writing metrics time series: {str(e)}")
+
+    def _flush(self):
+        lines = []
+        while self.pending:
+            lines.append(json.dumps(self.pending.popleft(), separators=(',', ':')))
+        if not lines:
+            return
+        if self._file is None or self._file_bytes >= self.max_file_bytes:
+            self._rotate()
+        batch = ("\n".join(lines) + "\n").encode()
+        self._file.write(batch)
+        self._file.flush()  # For gzip, a sync flush: the compressed bytes reach the raw file
+        self._file_bytes = self._raw_file.tell()
+        self.records_written += len(lines)
+
+    def _close(self):
+        if self._file:
+            self._file.close()
+            if self._raw_file is not self._file:
+                self._raw_file.close()  # GzipFile leaves a passed-in file open
+        self._file = self._raw_file = None
+
+    def _rotate(self):
+        self._close()
+        self._sequence += 1
+        path = os.path.join(self.directory, f"timeseries-{self.run_id}-{self._sequence:03d}.jsonl")
+        if self.compress:
+            self._raw_file = open(path + ".gz", "wb")
+            self._file = gzip.GzipFile(fileobj=self._raw_file, mode="wb")
+        else:
+            self._file = self._raw_file = open(path, "wb", buffering=1024 * 1024)
+        self._file_bytes = 0
+
+def read_timeseries(paths):
+    """Lazily yield time series records from files and/or directories written by TimeSeriesWriter"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.startswith("timeseries-") and (name.endswith(".jsonl") or name.endswith(".jsonl.gz"))
+            ))
+        else:
+            files.append(path)
+
+    for file_path in files:
+        opener = gzip.open if file_path.endswith(".gz") else open
+        with opener(file_path, "rt", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+class ServerMetricsScraper:
+    """Polls each service's Prometheus /metrics endpoint and keeps derived per-service samples.
+
+    The exposition text is streamed and parsed line by line, keeping only the
+    families used here, so a large /metrics page never has to be held in
+    memory. Counters and histograms become rates and window percentiles from
+    the difference between consecutive scrapes. Every sample is stamped with
+    the wall-clock time of its scrape, so it lines up with the client-side
+    time series.
+    """
+
+    GAUGES = {
+        'nodejs_eventloop_lag_seconds': 'event_loop_lag',
+        'nodejs_eventloop_lag_p99_seconds': 'event_loop_lag_p99',
+        'nodejs_heap_size_used_bytes': 'heap_used',
+        'nodejs_heap_size_total_bytes': 'heap_total',
+        'process_resident_memory_bytes': 'rss',
+        'http_requests_in_progress': 'in_progress',
+    }
+    COUNTERS = {
+        'process_cpu_seconds_total': 'cpu_seconds',
+        'http_requests_total': 'http_requests',
+        'http_request_duration_seconds_count': 'http_duration_count',
+        'http_request_duration_seconds_sum': 'http_duration_sum',
+    }
+    HISTOGRAM_BUCKETS = 'http_request_duration_seconds_bucket'
+    _LE_LABEL = re.compile(r'le="([^"]+)"')
+
+    def __init__(self, targets: Dict[str, str], interval=5.0, timeout=2.0):
+        self.targets = targets
+        self.interval = interval
+        self.timeout = timeout
+        self.session = Session()
+        self.latest: Dict[str, Dict] = {}
+        self.peaks: Dict[str, Dict[str, float]] = {}
+        self._previous: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    @classmethod
+    def parse(cls, lines):
+        """Fold exposition lines into {'gauges', 'counters', 'buckets'}, summing across label sets"""
+        gauges: Dict[str, float] = {}
+        counters: Dict[str, float] = {}
+        buckets: Dict[float, float] = {}
+        for line in lines:
+            if not line or line[0] == '#':
+                continue
+            brace = line.find('{')
+            space = line.find(' ')
+            name = line[:brace] if 0 <= brace < space else line[:space]
+            key = cls.GAUGES.get(name)
+            if key is None and name not in cls.COUNTERS and name != cls.HISTOGRAM_BUCKETS:
+                continue
+            # The value follows the label set; a trailing timestamp is optional
+            fields = line[line.rfind('}') + 1:].split() if brace >= 0 else line[space:].split()
+            try:
+                value = float(fields[0])
+            except (IndexError, ValueError):
+                continue
+            if key is not None:
+                gauges[key] = gauges.get(key, 0.0) + value
+            elif name == cls.HISTOGRAM_BUCKETS:
+                match = cls._LE_LABEL.search(line)
+                if match:
+                    bound = float(match.group(1))
+                    buckets[bound] = buckets.get(bound, 0.0) + value
+            else:
+                counter = cls.COUNTERS[name]
+                counters[counter] = counters.get(counter, 0.0) + value
+        return {'gauges': gauges, 'counters': counters, 'buckets': buckets}
+
+    @staticmethod
+    def bucket_quantile(quantile, buckets: Dict[float, float]):
+        """Estimate a quantile from cumulative ``le`` buckets, like PromQL's histogram_quantile"""
+        bounds = sorted(buckets)
+        if not bounds or buckets[bounds[-1]] <= 0:
+            return None
+        rank = quantile * buckets[bounds[-1]]
+        lower_bound = lower_count = 0.0
+        for bound in bounds:
+            count = buckets[bound]
+            if count >= rank:
+                if bound == float('inf'):
+                    return lower_bound
+                if count == lower_count:
+                    return bound
+                return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+            lower_bound, lower_count = bound, count
+        return lower_bound
+
+    def scrape(self, service, base_url):
+        """Scrape one target and derive a sample from the change since its previous scrape"""
+        started = time.monotonic()
+        with self.session.get(f"{base_url.rstrip('/')}/metrics", stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            parsed = self.parse(response.iter_lines(decode_unicode=True))
+        now = time.monotonic()
+        gauges, counters = parsed['gauges'], parsed['counters']
+        sample = {
+            'ts': time.time(),
+            'scrape_ms': (now - started) * 1000,
+            # Prefer the p99 lag from prom-client's monitorEventLoopDelay when present
+            'event_loop_lag_ms': gauges.get('event_loop_lag_p99', gauges.get('event_loop_lag')),
+            'heap_used_mb': gauges['heap_used'] / 1024 / 1024 if 'heap_used' in gauges else None,
+            'rss_mb': gauges['rss'] / 1024 / 1024 if 'rss' in gauges else None,
+            'in_progress': gauges.get('in_progress'),
+            'cpu_percent': None,
+            'rps': None,
+            'mean_ms': None,
+            'p50_ms': None,
+            'p99_ms': None,
+        }
+        if sample['event_loop_lag_ms'] is not None:
+            sample['event_loop_lag_ms'] *= 1000
+
+        previous = self._previous.get(service)
+        if previous is not None and now > previous['at']:
+            elapsed = now - previous['at']
+
+            def delta(key):
+                if key not in counters or key not in previous['counters']:
+                    return None
+                # A counter that went backwards means the service restarted
+                return max(counters[key] - previous['counters'][key], 0.0)
+
+            cpu_seconds = delta('cpu_seconds')
+            if cpu_seconds is not None:
+                sample['cpu_percent'] = cpu_seconds / elapsed * 100
+            requests_served = delta('http_requests')
+            if requests_served is None:
+                requests_served = delta('http_duration_count')
+            if requests_served is not None:
+                sample['rps'] = requests_served / elapsed
+            duration_count, duration_sum = delta('http_duration_count'), delta('http_duration_sum')
+            if duration_count:
+                sample['mean_ms'] = duration_sum / duration_count * 1000
+            window = {bound: max(count - previous['buckets'].get(bound, 0.0), 0.0)
+                      for bound, count in parsed['buckets'].items()}
+            p50 = self.bucket_quantile(0.50, window)
+            p99 = self.bucket_quantile(0.99, window)
+            sample['p50_ms'] = p50 * 1000 if p50 is not None else None
+            sample['p99_ms'] = p99 * 1000 if p99 is not None else None
+
+        self._previous[service] = {'at': now, 'counters': counters, 'buckets': parsed['buckets']}
+        return sample
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._scrape_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        logging.info(f"Scraping /metrics from {', '.join(self.targets)} every {self.interval:g}s")
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=self.timeout + 1)
+
+    def _scrape_loop(self):
+        while self.running:
+            started = time.monotonic()
+            for service, base_url in self.targets.items():
+                try:
+                    sample = self.scrape(service, base_url)
+                except (RequestException, ValueError) as e:
+                    sample = {'ts': time.time(), 'error': str(e)}
+                with self._lock:
+                    self.latest[service] = sample
+                    peaks = self.peaks.setdefault(service, {})
+                    for key in ('event_loop_lag_ms', 'heap_used_mb', 'rss_mb', 'cpu_percent', 'rps', 'p99_ms'):
+                        value = sample.get(key)
+                        if value is not None and value > peaks.get(key, float('-inf')):
+                            peaks[key] = value
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return dict(self.latest)
+
+class DashboardRenderer:
+    """Redraws the live dashboard at a fixed frame rate from metric snapshots.
+
+    Rendering (tabulate grids, terminal size lookups, screen clears) happens
+    only here, so the request listener just bumps counters. Under gevent
+    monkey-patching the render ``threading.Thread`` is a greenlet on the hub:
+    each frame still blocks request greenlets while it draws, and what is
+    bounded is the frame rate, not the cost of a frame.
+    """
+
+    def __init__(self, test_metrics, refresh_hz=1.0):
+        self.test_metrics = test_metrics
+        self.interval = 1.0 / refresh_hz if refresh_hz > 0 else 0
+        self.running = False
+        self.render_thread = None
+        self.frames_rendered = 0
+        self.last_render_duration = 0.0
+
+    def start(self):
+        """Start the dashboard render thread"""
+        if not self.interval:
+            logging.info("Live dashboard disabled")
+            return
+        self.running = True
+        self.render_thread = threading.Thread(target=self._render_loop)
+        self.render_thread.daemon = True
+        self.render_thread.start()
+        logging.info(f"Live dashboard started at {1.0 / self.interval:.1f} Hz")
+
+    def stop(self):
+        """Stop the dashboard render thread"""
+        self.running = False
+        if self.render_thread and self.render_thread.is_alive():
+            self.render_thread.join(timeout=5)
+
+    def _render_loop(self):
+        next_frame = time.monotonic()
+        while self.running:
+            try:
+                started = time.perf_counter()
+                self.test_metrics.print_live_metrics(self.test_metrics.snapshot())
+                self.last_render_duration = time.perf_counter() - started
+                self.frames_rendered += 1
+            except Exception as e:
+                logging.error(f"Error rendering dashboard: {str(e)}")
+
+            # Sleep to the next frame boundary so slow frames don't accumulate drift
+            next_frame += self.interval
+            time.sleep(max(0.0, next_frame - time.monotonic()))
+
+class ErrorTaxonomy:
+    """Failures grouped by endpoint, status code and message fingerprint.
+
+    The fingerprint masks the variable parts of a message (IDs, numbers,
+    emails), so one failure mode is one group however many users hit it.
+    Logging is sampled: the first failure of every group is logged, and any
+    more go through a token bucket of ``log_rate`` lines per second. Whatever
+    the bucket drops is counted and reported with the next line, so a failure
+    storm costs a dict update per request rather than a log write.
+    """
+
+    _MASKS = (
+        (re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"), "<uuid>"),
+        (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+        (re.compile(r"\b[0-9a-fA-F]{16,}\b"), "<hex>"),
+        (re.compile(r"\d+(\.\d+)?"), "<n>"),
+        (re.compile(r"\s+"), " "),
+    )
+
+    def __init__(self, max_groups=500, log_rate=1.0, log_burst=10):
+        self.max_groups = max_groups
+        self.log_rate = log_rate
+        self.log_burst = log_burst
+        self.groups: Dict[tuple, Dict] = {}
+        self._pending: Dict[tuple, int] = {}  # Counts not yet sent to the master
+        self._fingerprints: Dict[str, str] = {}
+        self._tokens = float(log_burst)
+        self._refilled_at = time.monotonic()
+        self.suppressed = 0
+
+    def fingerprint(self, message):
+        fingerprint = self._fingerprints.get(message)
+        if fingerprint is None:
+            fingerprint = message
+            for pattern, replacement in self._MASKS:
+                fingerprint = pattern.sub(replacement, fingerprint)
+            fingerprint = fingerprint.strip()[:160]
+            if len(self._fingerprints) >= 4096:
+                self._fingerprints.clear()
+            self._fingerprints[message] = fingerprint
+        return fingerprint
+
+    def record(self, name, status_code, message, count=1, log=True):
+        """Count ``count`` failures of one kind; returns the group they were added to"""
+        key = (name, status_code, self.fingerprint(message))
+        group = self.groups.get(key)
+        now = time.time()
+        first = group is None
+        if first:
+            if len(self.groups) >= self.max_groups:
+                key = (name, status_code, "(other messages)")
+                group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = {'count': 0, 'first_seen': now, 'sample': message[:300]}
+        group['count'] += count
+        group['last_seen'] = now
+        self._pending[key] = self._pending.get(key, 0) + count
+        if log:
+            self._log(name, status_code, message, first)
+        return group
+
+    def _log(self, name, status_code, message, first):
+        now = time.monotonic()
+        self._tokens = min(self.log_burst, self._tokens + (now - self._refilled_at) * self.log_rate)
+        self._refilled_at = now
+        if not first:
+            if self._tokens < 1:
+                self.suppressed += 1
+                return
+            self._tokens -= 1
+        suppressed, self.suppressed = self.suppressed, 0
+        note = f" ({suppressed:,} similar failures not logged)" if suppressed else ""
+        logger.error(f"{'New failure' if first else 'Failure'}: {name} - status {status_code} - {message[:300]}{note}")
+
+    def drain(self):
+        """Counts since the previous call, as ``[name, status, fingerprint, count, sample]`` (for worker reports)"""
+        entries = [[name, status_code, fingerprint, count, self.groups[(name, status_code, fingerprint)]['sample']]
+                   for (name, status_code, fingerprint), count in self._pending.items()]
+        self._pending.clear()
+        return entries
+
+    def merge(self, entries):
+        """Fold a worker's drained counts into the cluster-wide groups"""
+        for name, status_code, fingerprint, count, sample in entries:
+            key = (name, status_code, fingerprint)
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = {'count': 0, 'first_seen': time.time(), 'sample': sample}
+                logger.error(f"New failure: {name} - status {status_code} - {sample}")
+            group['count'] += count
+            group['last_seen'] = time.time()
+
+    def rows(self, limit=None):
+        rows = [{'endpoint': name, 'status': status_code, 'fingerprint': fingerprint, **group}
+                for (name, status_code, fingerprint), group in self.groups.items()]
+        rows.sort(key=lambda row: row['count'], reverse=True)
+        return rows[:limit] if limit else rows
+
 class TestMetrics:
     def __init__(self):
         self.start_time = None
-        self.total_requests = 0
-        self.failed_requests = 0
-        self.response_times = deque(maxlen=1000)  # Increased history
-        self.system_metrics = SystemMetrics()
+        self.request_counters = RequestCounterRing()
+        self.response_times = LatencyHistogram()  # Whole-run latency across all endpoints
+        self.endpoint_response_times: Dict[str, LatencyHistogram] = {}
+        self.system_metrics = SystemMetrics(
+            interval=SAMPLE_INTERVAL,
+            request_counters=self.request_counters,
+            adaptive=SAMPLE_ADAPTIVE,
+            min_interval=SAMPLE_MIN_INTERVAL,
+            max_interval=SAMPLE_MAX_INTERVAL,
+        )
+        self.renderer = DashboardRenderer(self, refresh_hz=DASHBOARD_REFRESH_HZ)
+        self.worker_metrics: Dict[str, Dict] = {}  # Per-worker breakdown, populated on the master
+        self.timeseries = TimeSeriesWriter(
+            TIMESERIES_DIR,
+            max_file_bytes=TIMESERIES_MAX_FILE_MB * 1024 * 1024,
+            compress=TIMESERIES_COMPRESS,
+        ) if TIMESERIES_DIR else None
+        self.server_metrics = ServerMetricsScraper(
+            SCRAPE_TARGETS, interval=SCRAPE_INTERVAL, timeout=SCRAPE_TIMEOUT,
+        ) if SCRAPE_INTERVAL > 0 and SCRAPE_TARGETS else None
+        self.errors = ErrorTaxonomy(max_groups=ERROR_MAX_GROUPS, log_rate=ERROR_LOG_RATE, log_burst=ERROR_LOG_BURST)
+        self._exported_histograms: Dict[str, LatencyHistogram] = {}
+        self.render = True
 
-    def start(self):
+    @property
+    def total_requests(self):
+        return self.request_counters.total(RequestCounterRing.REQUESTS)
+
+    @property
+    def failed_requests(self):
+        return self.request_counters.total(RequestCounterRing.ERRORS)
+
+    def record_response_time(self, name, response_time):
+        """Record a latency sample both globally and for the Locust endpoint name"""
+        histogram = self.endpoint_response_times.get(name)
+        if histogram is None:
+            histogram = self.endpoint_response_times[name] = LatencyHistogram()
+        histogram.record(response_time)
+        self.response_times.record(response_time)
+
+    def snapshot(self):
+        """Capture a consistent, render-ready copy of the current metrics"""
+        latency = self.response_times
+        return {
+            'start_time': self.start_time,
+            'total_requests': self.total_requests,
+            'failed_requests': self.failed_requests,
+            'latency_count': latency.count,
+            'latency_mean': latency.mean,
+            'latency_percentiles': latency.percentiles() if latency.count else {},
+            'system': self.system_metrics.get_current_metrics(),
+            'workers': self.worker_rows(),
+            'retries': retry_policy.stats(),
+            'bulk_writes': self.bulk_write_rows(),
+            'server': self.server_metrics.snapshot() if self.server_metrics else {},
+            'endpoints': self.endpoint_rows(DASHBOARD_ENDPOINT_ROWS),
+            'errors': self.errors.rows(limit=10),
+        }
+
+    def summary(self, environment=None):
+        """Whole-run summary: per-endpoint latency, throughput, errors and resource peaks.
+
+        Endpoint histograms are included in sparse form so a later comparison
+        can put confidence intervals on every percentile.
+        """
+        ended = time.time()
+        duration = max(ended - self.start_time, 1e-9) if self.start_time else 0.0
+        counters = self.request_counters.cumulative()
+
+        def latency(histogram):
+            percentiles = histogram.percentiles()
+            return {
+                'count': histogram.count,
+                'mean': histogram.mean,
+                'min': histogram.min,
+                'max': histogram.max,
+                'p50': percentiles[0.50],
+                'p90': percentiles[0.90],
+                'p95': percentiles[0.95],
+                'p99': percentiles[0.99],
+                'p999': percentiles[0.999],
+            }
+
+        endpoints = {}
+        for name, histogram in sorted(self.endpoint_response_times.items()):
+            requests_sent, failures, response_bytes = counters.get(name, (0, 0, 0))
+            endpoints[name] = {
+                'requests': requests_sent,
+                'failures': failures,
+                'error_rate': failures / requests_sent if requests_sent else 0.0,
+                'rps': requests_sent / duration if duration else 0.0,
+                'bytes': response_bytes,
+                'latency': latency(histogram),
+                'histogram': histogram.to_sparse(),
+            }
+        total_requests, failed_requests = self.total_requests, self.failed_requests
+        return {
+            'version': 1,
+            'started': self.start_time,
+            'ended': ended,
+            'duration': duration,
+            'hostname': socket.gethostname(),
+            'load_model': LOAD_MODEL,
+            'http_client': HTTP_CLIENT,
+            'user_count': environment.runner.user_count if environment and environment.runner else None,
+            'totals': {
+                'requests': total_requests,
+                'failures': failed_requests,
+                'error_rate': failed_requests / total_requests if total_requests else 0.0,
+                'rps': total_requests / duration if duration else 0.0,
+                'latency': latency(self.response_times),
+                'histogram': self.response_times.to_sparse(),
+            },
+            'endpoints': endpoints,
+            'resource_peaks': dict(self.system_metrics.peaks),
+            'worker_resource_peaks': {f"{worker['hostname']}:{worker['pid']}": dict(worker.get('peaks', {}))
+                                      for _, worker in sorted(self.worker_metrics.items())},
+            'server_peaks': dict(self.server_metrics.peaks) if self.server_metrics else {},
+            'errors': self.errors.rows(),
+            'email_delivery': email_sink.summary(counters) if email_sink else None,
+        }
+
+    def drain_report(self):
+        """Build a compact worker report and reset the histograms it covers.
+
+        Histograms are sent as deltas since the previous report and request
+        counters as whole-run totals, so the master can merge them without
+        double counting and the worker keeps no latency history.
+        """
+        report = {
+            'hostname': socket.gethostname(),
+            'pid': os.getpid(),
+            'counters': self.request_counters.cumulative(),
+            'endpoints': {name: histogram.to_sparse()
+                          for name, histogram in self.endpoint_response_times.items() if histogram.count},
+            'system': self.system_metrics.get_current_metrics(),
+            'peaks': dict(self.system_metrics.peaks),
+            'errors': self.errors.drain(),
+        }
+        for histogram in self.endpoint_response_times.values():
+            histogram.reset()
+        self.response_times.reset()
+        return report
+
+    def merge_report(self, client_id, report):
+        """Fold a worker report into the cluster-wide and per-worker metrics"""
+        worker = self.worker_metrics.get(client_id)
+        if worker is None:
+            worker = self.worker_metrics[client_id] = {
+                'total_requests': 0,
+                'failed_requests': 0,
+                'response_times': LatencyHistogram(),
+                'counters': {},
+                'rps': 0.0,
+                'last_report': None,
+            }
+
+        # Workers send cumulative counters; only the growth since their last report is new.
+        # It was made over the report interval, so the master's ring releases it over one too.
+        now = time.monotonic()
+        interval = now - worker['last_report'] if worker['last_report'] is not None else WORKER_REPORT_INTERVAL
+        new_requests = 0
+        for name, counters in report['counters'].items():
+            previous = worker['counters'].get(name, (0, 0, 0))
+            delta = [counters[i] - previous[i] for i in range(3)]
+            if delta[0] or delta[1] or delta[2]:
+                self.request_counters.add(name, *delta, spread=min(max(interval, 1.0), 2 * WORKER_REPORT_INTERVAL), now=now)
+            new_requests += delta[0]
+            worker['total_requests'] += delta[0]
+            worker['failed_requests'] += delta[1]
+        worker['counters'] = report['counters']
+
+        if worker['last_report'] is not None and now > worker['last_report']:
+            worker['rps'] = new_requests / (now - worker['last_report'])
+        worker['last_report'] = now
+        worker['hostname'] = report['hostname']
+        worker['pid'] = report['pid']
+        if report['hostname'] == socket.gethostname() and f"worker-{report['pid']}" not in self.system_metrics.processes:
+            self.system_metrics.track_pid(f"worker-{report['pid']}", report['pid'])
+        worker['system'] = report['system']
+        worker['peaks'] = report.get('peaks', {})  # Whole-run maxima on the worker, not window averages
+
+        self.errors.merge(report.get('errors', []))
+
+        for name, encoded in report['endpoints'].items():
+            histogram = self.endpoint_response_times.get(name)
+            if histogram is None:
+                histogram = self.endpoint_response_times[name] = LatencyHistogram()
+            histogram.merge_sparse(encoded)
+            self.response_times.merge_sparse(encoded)
+            worker['response_times'].merge_sparse(encoded)
+
+    def export_sample(self, sample):
+        """Add per-endpoint interval stats to a collector sample and queue it for disk"""
+        endpoint_counters = sample.pop('endpoint_counters')
+        interval = sample['interval']
+        endpoints = {}
+        for name, histogram in list(self.endpoint_response_times.items()):
+            previous = self._exported_histograms.get(name)
+            if previous is not None and previous.count == histogram.count:
+                continue
+            window = histogram.since(previous)
+            percentiles = window.percentiles()
+            counters = endpoint_counters.get(name, (0, 0, 0))
+            endpoints[name] = {
+                'rps': counters[0] / interval,
+                'eps': counters[1] / interval,
+                'count': window.count,
+                'mean': window.mean,
+                'p50': percentiles[0.50],
+                'p90': percentiles[0.90],
+                'p95': percentiles[0.95],
+                'p99': percentiles[0.99],
+                'p999': percentiles[0.999],
+            }
+            self._exported_histograms[name] = histogram.copy()
+        sample['endpoints'] = endpoints
+        if self.worker_metrics:
+            sample['workers'] = self.worker_rows()
+        if self.server_metrics:
+            sample['server'] = self.server_metrics.snapshot()
+        self.timeseries.write(sample)
+
+    def endpoint_rows(self, limit=None):
+        """Per-endpoint throughput, whole-run p50/p99 and a latency sparkline, busiest first"""
+        counters = self.request_counters.cumulative()
+        rates = self.request_counters.rates(window=5)
+        rows = []
+        for name, histogram in list(self.endpoint_response_times.items()):
+            requests_sent, failures, _ = counters.get(name, (0, 0, 0))
+            current = rates.get(name, (0.0, 0.0, 0.0))
+            rows.append({'name': name, 'requests': requests_sent, 'failures': failures,
+                         'rps': current[0], 'eps': current[1], 'histogram': histogram})
+        rows.sort(key=lambda row: row['requests'], reverse=True)
+        rows = rows[:limit] if limit else rows
+        for row in rows:
+            histogram = row.pop('histogram')
+            percentiles = histogram.percentiles((0.50, 0.99))
+            row['p50'] = percentiles[0.50]
+            row['p99'] = percentiles[0.99]
+            bins = histogram.bin_counts(SPARKLINE_EDGES_MS) if histogram.count else []
+            peak = max(bins, default=0)
+            row['sparkline'] = "".join(
+                SPARKLINE_CHARS[0 if not count else max(1, round(count / peak * (len(SPARKLINE_CHARS) - 1)))]
+                for count in bins
+            ) if peak else ""
+        return rows
+
+    def bulk_write_rows(self):
+        """Throughput and latency per bulk-write target and batch size"""
+        rows = []
+        counters = None
+        rates = None
+        for name, histogram in sorted(self.endpoint_response_times.items()):
+            match = BULK_WRITE_NAME.match(name)
+            if not match or not histogram.count:
+                continue
+            if counters is None:
+                counters = self.request_counters.cumulative()
+                rates = self.request_counters.rates(window=5)
+            batch_size = int(match.group(2))
+            requests_sent, failures, _ = counters.get(name, (0, 0, 0))
+            current = rates.get(name, (0.0, 0.0, 0.0))
+            percentiles = histogram.percentiles((0.50, 0.99))
+            rows.append({
+                'target': match.group(1),
+                'batch_size': batch_size,
+                'requests': requests_sent,
+                'failures': failures,
+                'docs_written': (requests_sent - failures) * batch_size,
+                'docs_per_sec': (current[0] - current[1]) * batch_size,
+                'docs_per_sec_per_request': batch_size * 1000 / histogram.mean if histogram.mean else 0.0,
+                'p50': percentiles[0.50],
+                'p99': percentiles[0.99],
+            })
+        rows.sort(key=lambda row: (row['target'], row['batch_size']))
+        return rows
+
+    def worker_rows(self):
+        """Per-worker breakdown rows for the dashboard"""
+        rows = []
+        for client_id, worker in sorted(self.worker_metrics.items()):
+            percentiles = worker['response_times'].percentiles((0.50, 0.95, 0.99))
+            system = worker.get('system') or {}
+            rows.append({
+                'worker': f"{worker['hostname']}:{worker['pid']}",
+                'total_requests': worker['total_requests'],
+                'failed_requests': worker['failed_requests'],
+                'rps': worker['rps'],
+                'p50': percentiles[0.50],
+                'p95': percentiles[0.95],
+                'p99': percentiles[0.99],
+                'cpu': system.get('cpu_total_avg', 0),
+                'memory': system.get('memory_percent_avg', 0),
+            })
+        return rows
+
+    def track_processes(self):
+        """Add the configured PIDs/ports and any locally running services to the process table"""
+        for label, pid in TRACK_PIDS.items():
+            self.system_metrics.track_pid(label, int(pid))
+        ports = {label: int(port) for label, port in TRACK_PORTS.items()}
+        if TRACK_LOCAL_SERVICES:
+            for service, base_url in SCRAPE_TARGETS.items():
+                url = urlparse(base_url)
+                if url.hostname in ("localhost", "127.0.0.1", "::1") and url.port:
+                    ports.setdefault(service, url.port)
+        if ports:
+            # Port lookups scan the socket table; resolve them in the background, once
+            threading.Thread(target=self.system_metrics.track_ports, args=(ports,), daemon=True).start()
+
+    def start(self, render=True):
         """Start metrics collection"""
         try:
             self.start_time = time.time()
+            self.render = render
             self.system_metrics.start()
+            if render:
+                self.track_processes()
+                # Only the aggregating process scrapes, so the services see one scraper per run
+                if self.server_metrics:
+                    self.server_metrics.start()
+                self.renderer.start()
+                # Workers reset their histograms on every report, so only the aggregating process exports
+                if self.timeseries:
+                    self.system_metrics.on_sample = self.export_sample
+                    self.timeseries.start()
             logging.info("Test metrics collection started")
         except Exception as e:
             logging.error(f"Error starting metrics collection: {str(e)}")
@@ -180,39 +1653,59 @@ class TestMetrics:
     def stop(self):
         """Stop metrics collection"""
         try:
+            self.renderer.stop()
             self.system_metrics.stop()
-            self.print_live_metrics()  # Final metrics display
+            if self.server_metrics and self.render:
+                self.server_metrics.stop()
+            if self.timeseries and self.render:
+                self.timeseries.stop()
+            if self.render:
+                self.print_live_metrics()  # Final metrics display
             logging.info("Test metrics collection stopped")
         except Exception as e:
             logging.error(f"Error stopping metrics collection: {str(e)}")
 
-    def print_live_metrics(self):
+    def print_live_metrics(self, snapshot=None):
         """Print formatted metrics with horizontal layout"""
         try:
-            current_metrics = self.system_metrics.get_current_metrics()
+            snapshot = snapshot or self.snapshot()
+            current_metrics = snapshot['system']
             if not current_metrics:
                 logging.error("Failed to get current metrics")
                 return
 
-            print("\033[2J\033[H")  # Clear screen and move cursor to top
-            
+            total_requests = snapshot['total_requests']
+            failed_requests = snapshot['failed_requests']
+
             # Performance Metrics Table
             perf_headers = ["Metric", "Value"]
             perf_data = [
-                ["Total Requests", f"{self.total_requests:,}"],
-                ["Failed Requests", f"{Fore.RED if self.failed_requests > 0 else Fore.GREEN}{self.failed_requests:,}{Style.RESET_ALL}"],
-                ["Success Rate", f"{Fore.GREEN}{((self.total_requests - self.failed_requests) / max(self.total_requests, 1)) * 100:.1f}%{Style.RESET_ALL}"],
+                ["Total Requests", f"{total_requests:,}"],
+                ["Failed Requests", f"{Fore.RED if failed_requests > 0 else Fore.GREEN}{failed_requests:,}{Style.RESET_ALL}"],
+                ["Success Rate", f"{Fore.GREEN}{((total_requests - failed_requests) / max(total_requests, 1)) * 100:.1f}%{Style.RESET_ALL}"],
                 ["Current TPS", f"{Fore.CYAN}{current_metrics.get('tps_current', 0):.1f}{Style.RESET_ALL}"],
                 ["Average TPS", f"{current_metrics.get('tps_avg', 0):.1f}"],
+                ["Current Errors/s", f"{Fore.RED if current_metrics.get('errors_per_sec_current', 0) > 0 else Fore.GREEN}{current_metrics.get('errors_per_sec_current', 0):.1f}{Style.RESET_ALL}"],
+                ["Response Throughput", f"{current_metrics.get('bytes_per_sec_current', 0)/1024/1024:.2f} MB/s"],
             ]
             
-            if self.response_times:
+            retries = snapshot.get('retries')
+            if retries:
                 perf_data.extend([
-                    ["Avg Response Time", f"{mean(self.response_times):.1f}ms"],
-                    ["Median Response Time", f"{median(self.response_times):.1f}ms"],
+                    ["Retries", f"{retries['retries']:,} ({retries['budget_exhausted']:,} over budget)"],
+                    ["Open Circuits", f"{Fore.RED if retries['open_circuits'] else Fore.GREEN}{', '.join(retries['open_circuits']) or 'none'}{Style.RESET_ALL}"],
+                ])
+
+            if snapshot['latency_count']:
+                percentiles = snapshot['latency_percentiles']
+                perf_data.extend([
+                    ["Avg Response Time", f"{snapshot['latency_mean']:.1f}ms"],
+                    ["Median Response Time", f"{percentiles[0.50]:.1f}ms"],
+                    ["90th Percentile", f"{percentiles[0.90]:.1f}ms"],
+                    ["95th Percentile", f"{percentiles[0.95]:.1f}ms"],
+                    ["99th Percentile", f"{percentiles[0.99]:.1f}ms"],
+                    ["99.9th Percentile", f"{percentiles[0.999]:.1f}ms"],
                 ])
-                if len(self.response_times) > 20:
-                    perf_data.append(["95th Percentile", f"{sorted(self.response_times)[int(len(self.response_times)*0.95)]:.1f}ms"])
             
             # System Metrics Table
             sys_headers = ["Resource", "Usage"]
@@ -227,6 +1720,9 @@ class TestMetrics:
                 ["Disk Read", f"{current_metrics.get('disk_io_read_avg', 0)/1024/1024:.2f} MB/s"],
                 ["Disk Write", f"{current_metrics.get('disk_io_write_avg', 0)/1024/1024:.2f} MB/s"],
             ]
+            sampler = current_metrics.get('sampler')
+            if sampler:
+                sys_data.append(["Sampler", f"{sampler['interval']:.2f}s, {sampler['sample_ms_mean']:.1f}ms ({sampler['percent']:.2f}%)"])
 
             # CPU Per Core Table
             cpu_headers = ["Core", "Usage"]
@@ -253,321 +1749,2499 @@ class TestMetrics:
             while len(cpu_lines) < max_height:
                 cpu_lines.append(' ' * len(cpu_lines[0]))
 
-            # Print title
-            terminal_width = os.get_terminal_size().columns
-            print("\n" + "="*terminal_width)
+            # Build the whole frame first so the terminal is written once per refresh
+            frame = ["\033[2J\033[H"]  # Clear screen and move cursor to top
+
+            # Title
+            terminal_width = shutil.get_terminal_size().columns
+            frame.append("\n" + "="*terminal_width)
             title = "Load Test Metrics Dashboard"
-            print(f"{title:^{terminal_width}}")
-            print("="*terminal_width + "\n")
+            frame.append(f"{title:^{terminal_width}}")
+            frame.append("="*terminal_width + "\n")
 
-            # Print tables side by side with titles
+            # Tables side by side with titles
             table_width = max(len(perf_lines[0]), len(sys_lines[0]), len(cpu_lines[0]))
             spacing = "   "  # Space between tables
 
-            print(f"{Fore.CYAN}Performance Metrics{' '*(table_width-18)}{spacing}System Resources{' '*(table_width-16)}{spacing}CPU Core Usage{Style.RESET_ALL}")
+            frame.append(f"{Fore.CYAN}Performance Metrics{' '*(table_width-18)}{spacing}System Resources{' '*(table_width-16)}{spacing}CPU Core Usage{Style.RESET_ALL}")
             
             for i in range(max_height):
-                print(f"{perf_lines[i]}{spacing}{sys_lines[i]}{spacing}{cpu_lines[i]}")
+                frame.append(f"{perf_lines[i]}{spacing}{sys_lines[i]}{spacing}{cpu_lines[i]}")
 
-            # Print test duration at the bottom
-            if self.start_time:
-                duration = time.time() - self.start_time
-                print(f"\n{Fore.CYAN}Test Duration: {duration:.0f} seconds{Style.RESET_ALL}")
+            # Per-endpoint throughput and latency distribution
+            if snapshot.get('endpoints'):
+                endpoint_data = [[
+                    row['name'],
+                    f"{row['requests']:,}",
+                    f"{Fore.RED if row['failures'] > 0 else Fore.GREEN}{row['failures']:,}{Style.RESET_ALL}",
+                    f"{row['rps']:.1f}",
+                    f"{Fore.RED if row['eps'] > 0 else ''}{row['eps']:.1f}{Style.RESET_ALL}",
+                    f"{row['p50']:.1f}ms",
+                    f"{row['p99']:.1f}ms",
+                    f"|{row['sparkline']}|",
+                ] for row in snapshot['endpoints']]
+                frame.append(f"\n{Fore.CYAN}Endpoints{Style.RESET_ALL}")
+                frame.append(tabulate(endpoint_data, headers=["Endpoint", "Requests", "Failed", "RPS", "Err/s", "p50", "p99",
+                                                              f"<{SPARKLINE_EDGES_MS[0]}ms .. >{SPARKLINE_EDGES_MS[-1] // 1000}s"], tablefmt="grid"))
 
-            # Print current time
+            # Failures grouped by endpoint, status and message fingerprint
+            if snapshot.get('errors'):
+                total_failed = max(snapshot['failed_requests'], 1)
+                error_data = [[
+                    row['endpoint'],
+                    row['status'],
+                    f"{Fore.RED}{row['count']:,}{Style.RESET_ALL}",
+                    f"{row['count'] / total_failed * 100:.0f}%",
+                    f"{time.time() - row['last_seen']:.0f}s ago",
+                    row['fingerprint'][:80],
+                ] for row in snapshot['errors']]
+                frame.append(f"\n{Fore.CYAN}Errors{Style.RESET_ALL}")
+                frame.append(tabulate(error_data, headers=["Endpoint", "Status", "Count", "Share", "Last", "Message"], tablefmt="grid"))
+
+            # Bulk-write throughput per batch size
+            if snapshot.get('bulk_writes'):
+                bulk_data = [[
+                    row['target'],
+                    f"{row['batch_size']:,}",
+                    f"{row['requests']:,}",
+                    f"{Fore.RED if row['failures'] > 0 else Fore.GREEN}{row['failures']:,}{Style.RESET_ALL}",
+                    f"{row['docs_written']:,}",
+                    f"{row['docs_per_sec']:,.0f}",
+                    f"{row['docs_per_sec_per_request']:,.0f}",
+                    f"{row['p50']:.0f}ms",
+                    f"{row['p99']:.0f}ms",
+                ] for row in snapshot['bulk_writes']]
+                frame.append(f"\n{Fore.CYAN}Bulk Writes{Style.RESET_ALL}")
+                frame.append(tabulate(bulk_data, headers=["Target", "Batch", "Requests", "Failed", "Docs Written", "Docs/s", "Docs/s per Request", "p50", "p99"], tablefmt="grid"))
+
+            # Tracked processes: this process, local workers and local services
+            if current_metrics.get('processes'):
+                process_data = [[
+                    label,
+                    process['pid'],
+                    f"{Fore.YELLOW if process['cpu_percent'] > 90 else ''}{process['cpu_percent']:.1f}%{Style.RESET_ALL}",
+                    f"{process['rss_mb']:.0f} MB",
+                    process['threads'],
+                ] for label, process in sorted(current_metrics['processes'].items())]
+                frame.append(f"\n{Fore.CYAN}Processes{Style.RESET_ALL}")
+                frame.append(tabulate(process_data, headers=["Process", "PID", "CPU", "RSS", "Threads"], tablefmt="grid"))
+
+            # Server-side view of the same window, from each service's /metrics
+            if snapshot.get('server'):
+                def fmt(value, spec, unit=""):
+                    return "-" if value is None else f"{value:{spec}}{unit}"
+
+                server_data = []
+                for service, sample in sorted(snapshot['server'].items()):
+                    if 'error' in sample:
+                        server_data.append([service, f"{Fore.RED}unreachable{Style.RESET_ALL}"] + ["-"] * 7)
+                        continue
+                    lag = sample['event_loop_lag_ms']
+                    server_data.append([
+                        service,
+                        f"{time.time() - sample['ts']:.0f}s ago",
+                        f"{Fore.YELLOW if lag is not None and lag > 100 else ''}{fmt(lag, '.1f', 'ms')}{Style.RESET_ALL}",
+                        fmt(sample['heap_used_mb'], '.0f', ' MB'),
+                        fmt(sample['cpu_percent'], '.1f', '%'),
+                        fmt(sample['rps'], '.1f'),
+                        fmt(sample['in_progress'], '.0f'),
+                        fmt(sample['p50_ms'], '.1f', 'ms'),
+                        fmt(sample['p99_ms'], '.1f', 'ms'),
+                    ])
+                frame.append(f"\n{Fore.CYAN}Server Metrics (/metrics){Style.RESET_ALL}")
+                frame.append(tabulate(server_data, headers=["Service", "Scraped", "Event Loop Lag", "Heap", "CPU", "RPS", "In Flight", "Server p50", "Server p99"], tablefmt="grid"))
+
+            # Per-worker breakdown when running as a distributed master
+            if snapshot.get('workers'):
+                worker_data = [[
+                    row['worker'],
+                    f"{row['total_requests']:,}",
+                    f"{Fore.RED if row['failed_requests'] > 0 else Fore.GREEN}{row['failed_requests']:,}{Style.RESET_ALL}",
+                    f"{row['rps']:.1f}",
+                    f"{row['p50']:.1f}ms",
+                    f"{row['p95']:.1f}ms",
+                    f"{row['p99']:.1f}ms",
+                    f"{row['cpu']:.1f}%",
+                    f"{row['memory']:.1f}%",
+                ] for row in snapshot['workers']]
+                frame.append(f"\n{Fore.CYAN}Workers ({len(worker_data)}){Style.RESET_ALL}")
+                frame.append(tabulate(worker_data, headers=["Worker", "Requests", "Failed", "RPS", "p50", "p95", "p99", "CPU", "Memory"], tablefmt="grid"))
+
+            # Test duration at the bottom
+            if snapshot['start_time']:
+                duration = time.time() - snapshot['start_time']
+                frame.append(f"\n{Fore.CYAN}Test Duration: {duration:.0f} seconds{Style.RESET_ALL}")
+
+            # Current time
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"{Fore.CYAN}Last Updated: {current_time}{Style.RESET_ALL}")
+            frame.append(f"{Fore.CYAN}Last Updated: {current_time}{Style.RESET_ALL}")
+
+            sys.stdout.write("\n".join(frame) + "\n")
+            sys.stdout.flush()
 
         except Exception as e:
             logging.error(f"Error printing live metrics: {str(e)}")
             
 metrics = TestMetrics()
 
-class BaseTaskSet(TaskSet):
-    def get_auth_headers(self) -> Dict[str, str]:
-        """Get headers with authentication token"""
-        if not hasattr(self.user, 'token') or not self.user.token:
-            logger.warning("No authentication token available")
-            return {}
-        return {
-            "Authorization": f"Bearer {self.user.token}",
-            "Content-Type": "application/json",
-            "X-Request-ID": f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{random.randint(1000, 9999)}"
-        }
+class CircuitOpenError(Exception):
+    """Raised (as a reported failure) when a request is short-circuited by an open breaker"""
 
-    def handle_response(self, response, name: str) -> None:
-        """Centralized response handling"""
-        try:
-            if response.status_code in [200, 201]:
-                response.success()
-                logger.debug(f"Success: {name} - {response.status_code}")
-            else:
-                error_msg = f"Failed: {name} - Status {response.status_code}"
-                try:
-                    error_detail = response.json().get('message', 'No detail provided')
-                    error_msg += f" - {error_detail}"
-                except json.JSONDecodeError:
-                    error_msg += f" - Raw response: {response.text[:200]}"
-                response.failure(error_msg)
-                logger.error(error_msg)
-        except Exception as e:
-            logger.error(f"Error handling response for {name}: {str(e)}")
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
 
-class UserServiceTasks(BaseTaskSet):
-    # Class level configuration
-    min_wait = 1000  # minimum wait time in ms
-    max_wait = 3000  # maximum wait time in ms
-    max_retries = 3  # maximum number of retry attempts
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.retry_count = 0
+    def __init__(self, failure_threshold=20, cooldown=5.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
 
-    def on_start(self):
-        """Initialize user session"""
-        self.login()
+    def available(self):
+        """Whether ``allow`` would let a request through now, without taking the probe slot"""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.monotonic() - self.opened_at >= self.cooldown
+        return not self._probing
 
-    def login(self) -> None:
-        """Authenticate user with retry mechanism"""
-        credentials = {
-            "email": "admin@example.com",
-            "password": "AdminPassword123!"
-        }
-        
-        for attempt in range(self.max_retries):
-            try:
-                with self.client.post(
-                    "/auth/login",
-                    json=credentials,
-                    catch_response=True,
-                    name="login"
-                ) as response:
-                    if response.status_code == 200:
-                        try:
-                            data = response.json()
-                            self.user.token = data.get("access_token")
-                            if self.user.token:
-                                response.success()
-                                logger.info(f"Successfully logged in on attempt {attempt + 1}")
-                                return
-                            else:
-                                response.failure("No access token in response")
-                        except json.JSONDecodeError as e:
-                            response.failure(f"Invalid JSON response: {str(e)}")
-                    else:
-                        response.failure(f"Login failed with status {response.status_code}")
-                        
-                if attempt < self.max_retries - 1:
-                    wait_time = min(2 ** attempt, 10)  # Exponential backoff
-                    time.sleep(wait_time)
-                    
-            except RequestException as e:
-                logger.error(f"Login request failed (attempt {attempt + 1}): {str(e)}")
-                
-        logger.error("All login attempts failed")
+    def allow(self):
+        """Admit a request that is about to be sent; in half-open state only the first becomes the probe"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half-open"
+            self._probing = False
+        if self.state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
 
-    @task(3)
-    def get_user_profile(self):
-        headers = self.get_auth_headers()
-        if not headers:
+    def record(self, success):
+        if success:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
             return
-            
-        try:
-            with self.client.get(
-                "/users/profile",
-                headers=headers,
-                catch_response=True,
-                name="get_profile"
-            ) as response:
-                self.handle_response(response, "get_profile")
-        except RequestException as e:
-            logger.error(f"Profile request failed: {str(e)}")
-            events.request_failure.fire(
-                request_type="GET",
-                name="get_profile",
-                response_time=0,
-                exception=e
-            )
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._probing = False
 
-    @task(1)
-    def register_user(self):
-        random_id = random.randint(1, 10000)
-        user_data = {
-            "email": f"newuser{random_id}@example.com",
-            "password": "password123",
-            "firstName": "Test",
-            "lastName": "User",
-            "roles": ["staff"]
+class RetryPolicy:
+    """Jittered exponential backoff with a shared retry budget and per-host circuit breakers.
+
+    Every first attempt deposits ``budget_ratio`` tokens into the budget and
+    every retry spends one, so retries can never add more than that fraction
+    of extra load on a struggling service. Backoff sleeps go through gevent
+    and only park the retrying user's greenlet.
+    """
+
+    RETRYABLE_STATUS_CODES = {0, 429, 502, 503, 504}
+
+    def __init__(self, base_delay=0.25, max_delay=10.0, budget_ratio=0.1, min_budget=10,
+                 breaker_threshold=20, breaker_cooldown=5.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.max_budget = max(min_budget, 100)
+        self.retry_tokens = float(min_budget)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retries = 0
+        self.budget_exhausted = 0
+        self.short_circuited = 0
+
+    def breaker(self, key) -> CircuitBreaker:
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+        return breaker
+
+    def is_retryable(self, status_code):
+        return status_code in self.RETRYABLE_STATUS_CODES
+
+    def is_host_failure(self, status_code):
+        """Whether a response counts against the host's circuit breaker.
+
+        Kept apart from retryability: every 5xx (a plain 500 is not worth
+        retrying but still means the host is failing), connection errors and
+        429s trip the breaker; other 4xx are the request's fault, not the host's.
+        """
+        return status_code == 0 or status_code == 429 or status_code >= 500
+
+    def record_attempt(self):
+        """Credit the retry budget for a first attempt"""
+        self.retry_tokens = min(self.max_budget, self.retry_tokens + self.budget_ratio)
+
+    def try_spend(self):
+        """Take one retry from the budget; False once it is exhausted"""
+        if self.retry_tokens >= 1:
+            self.retry_tokens -= 1
+            self.retries += 1
+            return True
+        self.budget_exhausted += 1
+        return False
+
+    def backoff(self, attempt):
+        """Full-jitter exponential delay before retry number ``attempt`` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def wait(self, attempt):
+        gevent.sleep(self.backoff(attempt))
+
+    def stats(self):
+        return {
+            'retries': self.retries,
+            'budget_exhausted': self.budget_exhausted,
+            'short_circuited': self.short_circuited,
+            'open_circuits': sorted(key for key, breaker in self.breakers.items() if breaker.state != "closed"),
         }
-        
+
+retry_policy = RetryPolicy(
+    budget_ratio=RETRY_BUDGET_RATIO,
+    breaker_threshold=BREAKER_FAILURE_THRESHOLD,
+    breaker_cooldown=BREAKER_COOLDOWN,
+)
+
+def load_test_accounts() -> List[Dict[str, str]]:
+    """Resolve the test accounts the token pools log in with, each tagged with its role"""
+    accounts = [{"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD, "role": "admin"}]
+    if ACCOUNTS_FILE:
+        with open(ACCOUNTS_FILE, encoding="utf-8") as handle:
+            accounts += [{"email": account["email"], "password": account["password"],
+                          "role": account.get("role", ACCOUNT_ROLE).lower()} for account in json.load(handle)]
+    elif ACCOUNT_COUNT > 0:
+        accounts += [{"email": ACCOUNT_EMAIL_PATTERN.format(n=n), "password": ACCOUNT_PASSWORD, "role": ACCOUNT_ROLE}
+                     for n in range(1, ACCOUNT_COUNT + 1)]
+    unique = {(account["email"], account["role"]): account for account in reversed(accounts)}
+    return list(reversed(unique.values()))
+
+class PooledToken:
+    """A test account and its current access token, refreshed in place by the pool.
+
+    A failed refresh keeps the current token while it is still valid; once
+    it has expired ``token`` is None, so callers never keep sending it.
+    """
+
+    def __init__(self, email, password):
+        self.email = email
+        self.password = password
+        self.token = None
+        self.issued_at = 0.0
+        self.expires_at = 0.0
+        self.registered = False
+
+class TokenPool:
+    """Process-wide cache of access tokens for a set of test accounts.
+
+    Every account logs in once, the first time a virtual user asks for a
+    token. Tokens are kept until their JWT ``exp`` and re-issued in the
+    background shortly before that, and users are handed accounts
+    round-robin, so spawning thousands of users doesn't hit /auth/login.
+    With a ``register_url``, accounts are registered with ``role`` before
+    their first login (409 meaning they already exist).
+    """
+
+    def __init__(self, login_url, accounts, role="admin", register_url=None, login_concurrency=10,
+                 refresh_margin=60.0, default_ttl=900.0, check_interval=5.0, max_attempts=3):
+        self.login_url = login_url
+        self.role = role
+        self.register_url = register_url
+        self.slots = [PooledToken(account["email"], account["password"]) for account in accounts]
+        self.login_concurrency = login_concurrency
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self.check_interval = check_interval
+        self.max_attempts = max_attempts
+        self.session = Session()
+        self.logins = 0
+        self.login_failures = 0
+        self.running = False
+        self.refresh_thread = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self._next_slot = itertools.count()
+
+    @staticmethod
+    def token_expiry(token, default_ttl=900.0):
+        """Read ``exp`` from an (unverified) JWT; falls back to ``default_ttl`` from now"""
         try:
-            with self.client.post(
-                "/auth/register",
-                json=user_data,
-                catch_response=True,
-                name="register"
-            ) as response:
-                self.handle_response(response, "register")
-        except RequestException as e:
-            logger.error(f"Registration request failed: {str(e)}")
-            events.request_failure.fire(
-                request_type="POST",
-                name="register",
+            payload = token.split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            return float(claims["exp"])
+        except (IndexError, KeyError, TypeError, ValueError):
+            return time.time() + default_ttl
+
+    def acquire(self) -> Optional[PooledToken]:
+        """Hand out the next logged-in account, logging the pool in on first use"""
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._login_all(self.slots)
+                    self._ready = True
+                    self.start()
+        now = time.time()
+        live_slots = [slot for slot in self.slots if slot.token and slot.expires_at > now]
+        if not live_slots:
+            return None
+        return live_slots[next(self._next_slot) % len(live_slots)]
+
+    def set_accounts(self, accounts):
+        """Swap in a new account list; the pool logs in again on the next acquire"""
+        with self._lock:
+            self.slots = [PooledToken(account["email"], account["password"]) for account in accounts]
+            self._ready = False
+
+    def next_account(self) -> Dict[str, str]:
+        """Credentials for the next account in rotation (for the login scenario)"""
+        slot = self.slots[next(self._next_slot) % len(self.slots)]
+        return {"email": slot.email, "password": slot.password}
+
+    def start(self):
+        """Start the background refresh thread"""
+        if self.running:
+            return
+        self.running = True
+        self.refresh_thread = threading.Thread(target=self._refresh_loop)
+        self.refresh_thread.daemon = True
+        self.refresh_thread.start()
+        live = sum(1 for slot in self.slots if slot.token)
+        logger.info(f"Token pool ready: {live}/{len(self.slots)} {self.role} accounts logged in")
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self.running = False
+        if self.refresh_thread and self.refresh_thread.is_alive():
+            self.refresh_thread.join(timeout=5)
+
+    def _login_all(self, slots):
+        gevent.pool.Pool(self.login_concurrency).map(self._login, slots)
+
+    def _register(self, slot):
+        response = self.session.post(self.register_url, json={
+            "email": slot.email,
+            "password": slot.password,
+            "firstName": "Load",
+            "lastName": f"Test {self.role}",
+            "roles": [self.role],
+        }, timeout=30)
+        if response.status_code not in [201, 409]:  # 409: registered by an earlier run
+            raise RequestException(f"registration returned status {response.status_code}")
+        slot.registered = True
+
+    def _login(self, slot):
+        for attempt in range(self.max_attempts):
+            if attempt:
+                retry_policy.wait(attempt)
+            try:
+                if self.register_url and not slot.registered:
+                    self._register(slot)
+                self.logins += 1
+                response = self.session.post(
+                    self.login_url,
+                    json={"email": slot.email, "password": slot.password},
+                    timeout=30,
+                )
+                if response.status_code in [200, 201]:
+                    token = response.json().get("access_token")
+                    if token:
+                        slot.token = token
+                        slot.issued_at = time.time()
+                        slot.expires_at = self.token_expiry(token, self.default_ttl)
+                        return
+                self.login_failures += 1
+                logger.error(f"Token pool login failed for {slot.email} (attempt {attempt + 1}): status {response.status_code}")
+                if not retry_policy.is_retryable(response.status_code):
+                    break
+            except (RequestException, ValueError) as e:
+                self.login_failures += 1
+                logger.error(f"Token pool login failed for {slot.email} (attempt {attempt + 1}): {str(e)}")
+        # Out of attempts: the refresh loop retries on its next pass. Every account refreshes
+        # in the same window, so a short outage must not drop tokens that are still valid;
+        # only an expired one is dropped, which moves users to a live account.
+        if slot.expires_at <= time.time():
+            slot.token = None
+            slot.expires_at = 0.0
+
+    def _refresh_loop(self):
+        while self.running:
+            time.sleep(self.check_interval)
+            try:
+                now = time.time()
+                due = [slot for slot in self.slots if slot.expires_at - now <= self._margin(slot)]
+                if due:
+                    self._login_all(due)
+            except Exception as e:
+                logger.error(f"Error refreshing pooled tokens: {str(e)}")
+
+    def _margin(self, slot):
+        # Never refresh more often than every half lifetime, even for short-lived tokens
+        return min(self.refresh_margin, (slot.expires_at - slot.issued_at) / 2)
+
+class TokenPools:
+    """One TokenPool per role, so every scenario authenticates as the role its routes require.
+
+    A role without configured accounts gets ``provision`` accounts, registered
+    with that role on first use. Admin accounts are never self-registered.
+    """
+
+    def __init__(self, base_url, accounts, provision=10, **pool_options):
+        self.base_url = base_url
+        self.provision = provision
+        self.pool_options = pool_options
+        self.pools: Dict[str, TokenPool] = {}
+        self._next_account = itertools.count()
+        self.set_accounts(accounts)
+
+    def set_accounts(self, accounts):
+        """Replace the accounts of every role present in ``accounts``; other roles keep theirs"""
+        by_role: Dict[str, List[Dict[str, str]]] = {}
+        for account in accounts:
+            by_role.setdefault(account.get("role", ACCOUNT_ROLE), []).append(account)
+        for role, role_accounts in by_role.items():
+            if role in self.pools:
+                self.pools[role].set_accounts(role_accounts)
+            else:
+                self.pools[role] = TokenPool(f"{self.base_url}/auth/login", role_accounts, role=role, **self.pool_options)
+
+    def pool(self, role) -> Optional[TokenPool]:
+        pool = self.pools.get(role)
+        if pool is None and role != "admin" and self.provision > 0:
+            logger.info(f"No {role} accounts configured; provisioning {self.provision} for the token pool")
+            accounts = [{"email": PROVISION_EMAIL_PATTERN.format(role=role, n=n), "password": ACCOUNT_PASSWORD}
+                        for n in range(1, self.provision + 1)]
+            pool = self.pools[role] = TokenPool(f"{self.base_url}/auth/login", accounts, role=role,
+                                                register_url=f"{self.base_url}/auth/register", **self.pool_options)
+        return pool
+
+    def acquire(self, role) -> Optional[PooledToken]:
+        """A logged-in account of ``role``, or None if the role has no live account"""
+        pool = self.pool(role)
+        return pool.acquire() if pool else None
+
+    def next_account(self) -> Dict[str, str]:
+        """Credentials for the next configured account across every role (for the login scenario)"""
+        slots = [slot for pool in self.pools.values() for slot in pool.slots]
+        slot = slots[next(self._next_account) % len(slots)]
+        return {"email": slot.email, "password": slot.password}
+
+    def stop(self):
+        for pool in list(self.pools.values()):
+            pool.stop()
+
+class DataCatalog:
+    """Seeded catalog of valid request parameters for the task sets.
+
+    Values are drawn with a Zipf-like skew, so a few employees and business
+    units get most of the traffic as they do in production, from a seeded
+    generator so a run's parameter sequence is repeatable.
+    """
+
+    def __init__(self, seed, values: Dict[str, List[str]], skew=1.1):
+        self.random = random.Random(seed)
+        self.skew = skew
+        self.values: Dict[str, List[str]] = {}
+        self._cumulative_weights: Dict[str, List[float]] = {}
+        for kind, items in values.items():
+            self.set(kind, items)
+
+    def set(self, kind, items):
+        """Replace the values of ``kind``; earlier items are drawn more often"""
+        items = list(items)
+        if not items:
+            raise ValueError(f"Catalog list '{kind}' is empty")
+        self.values[kind] = items
+        self._cumulative_weights[kind] = list(itertools.accumulate(
+            1.0 / (rank ** self.skew) for rank in range(1, len(items) + 1)
+        ))
+
+    def pick(self, kind):
+        weights = self._cumulative_weights[kind]
+        index = bisect.bisect_left(weights, self.random.random() * weights[-1])
+        return self.values[kind][min(index, len(weights) - 1)]
+
+def load_data_catalog() -> DataCatalog:
+    """Build the catalog from generated defaults, overridden by LOADTEST_CATALOG_FILE"""
+    values = {
+        # Business unit keys as used by the frontend (packages/frontend Dashboard constants)
+        'business_units': ["SW", "QA", "CLD", "DATA", "AI", "IT", "PMO", "VS", "HR", "FIN", "MKT", "SLS", "ADM"],
+        'employee_emails': [f"employee{n}@example.com" for n in range(1, CATALOG_EMPLOYEES + 1)],
+        'taxonomy_doc_ids': [f"loadtest-doc-{n}" for n in range(1, CATALOG_TAXONOMY_DOCS + 1)],
+        'capabilities': ["Software Engineering", "Quality Assurance", "Cloud Engineering",
+                         "Data Engineering", "Project Management"],
+    }
+    if CATALOG_FILE:
+        with open(CATALOG_FILE, encoding="utf-8") as handle:
+            values.update(json.load(handle))
+    return DataCatalog(CATALOG_SEED, values, skew=CATALOG_SKEW)
+
+catalog = load_data_catalog()
+
+token_pools = TokenPools(
+    USER_SERVICE_HOST,
+    load_test_accounts(),
+    provision=PROVISION_ACCOUNTS,
+    login_concurrency=TOKEN_LOGIN_CONCURRENCY,
+    refresh_margin=TOKEN_REFRESH_MARGIN,
+)
+
+class PayloadTemplate:
+    """A JSON body serialized once, with only its variable fields encoded per request.
+
+    Fields whose value is a ``PayloadTemplate.Slot`` are cut out of the
+    pre-encoded bytes; ``render`` encodes just those values and joins the
+    pieces, so the constant part of the body is never rebuilt or re-encoded.
+    """
+
+    class Slot:
+        def __init__(self, name):
+            self.name = name
+
+    def __init__(self, document):
+        markers = {}
+
+        def mark(value):
+            if isinstance(value, PayloadTemplate.Slot):
+                marker = f"\u0000slot{len(markers)}\u0000"
+                markers[marker] = value.name
+                return marker
+            if isinstance(value, dict):
+                return {key: mark(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [mark(item) for item in value]
+            return value
+
+        encoded = json.dumps(mark(document), separators=(',', ':'))
+        self.parts: List[bytes] = []
+        self.slots: List[str] = []
+        for marker, name in markers.items():
+            quoted = json.dumps(marker)
+            head, encoded = encoded.split(quoted, 1)
+            self.parts.append(head.encode())
+            self.slots.append(name)
+        self.parts.append(encoded.encode())
+
+    def render(self, **values) -> bytes:
+        """Encode the slot values (already-encoded ``bytes`` pass through) into the body"""
+        pieces = [self.parts[0]]
+        for name, part in zip(self.slots, self.parts[1:]):
+            value = values[name]
+            pieces.append(value if isinstance(value, bytes) else json.dumps(value).encode())
+            pieces.append(part)
+        return b"".join(pieces)
+
+class CoarseClock:
+    """ISO timestamps as pre-encoded JSON strings, formatted at most once per second"""
+
+    def __init__(self):
+        self._second = None
+        self._encoded = b'""'
+
+    def isoformat_json(self) -> bytes:
+        now = time.time()
+        second = int(now)
+        if second != self._second:
+            self._second = second
+            self._encoded = json.dumps(datetime.fromtimestamp(second).isoformat()).encode()
+        return self._encoded
+
+# Counter-based request IDs, unique per run and process: "<start><pid>-<n in hex>"
+REQUEST_ID_PREFIX = f"{int(time.time()):x}{os.getpid():x}-"
+request_sequence = itertools.count(1)
+
+def next_request_id() -> str:
+    return REQUEST_ID_PREFIX + format(next(request_sequence), "x")
+
+# Email addresses for the register scenario
+REGISTRATION_PREFIX = REQUEST_ID_PREFIX[:-1]
+registration_sequence = itertools.count(1)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+coarse_clock = CoarseClock()
+# workflow-1 .. workflow-100, encoded once
+WORKFLOW_NAMES = [json.dumps(f"workflow-{n}").encode() for n in range(1, 101)]
+# Send-time tag appended to workflow names for the SMTP sink: "workflow-7 #lt<epoch ms in hex>"
+DELIVERY_TAG = re.compile(rb"#lt([0-9a-f]+)")
+
+def workflow_name() -> bytes:
+    """A random encoded workflow name, tagged with its send time when the SMTP sink is on"""
+    name = WORKFLOW_NAMES[random.randrange(100)]
+    if not EMAIL_SINK_PORT:
+        return name
+    return name[:-1] + f' #lt{int(time.time() * 1000):x}"'.encode()
+
+class EmailSink:
+    """Minimal SMTP server that accepts every mail and reports its delivery latency.
+
+    Each mail whose headers carry a ``DELIVERY_TAG`` fires a request event
+    named ``email_delivery[success|error]``, timed from when the notification
+    was sent, so delivery shows up next to HTTP acceptance in every report.
+    """
+
+    def __init__(self, port: int, bind: str = "127.0.0.1"):
+        self.port = port
+        self.bind = bind
+        self.environment = None
+        self.server = None
+        self.delivered = 0
+        self.untracked = 0
+        self.first_delivery = None
+        self.last_delivery = None
+
+    def start(self, environment) -> None:
+        from gevent.server import StreamServer
+        self.environment = environment
+        self.server = StreamServer((self.bind, self.port), self._handle)
+        self.server.start()
+        logger.info(f"SMTP sink listening on {self.bind}:{self.port}")
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.stop(timeout=1)
+            self.server = None
+
+    def _handle(self, connection, address) -> None:
+        stream = connection.makefile('rb')
+        try:
+            connection.sendall(b"220 loadtest-sink ESMTP\r\n")
+            for line in stream:
+                command = line[:4].upper()
+                if command == b"EHLO":
+                    connection.sendall(b"250-loadtest-sink\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+                elif command == b"DATA":
+                    connection.sendall(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    headers = []
+                    in_headers = True
+                    for data_line in stream:
+                        if data_line in (b".\r\n", b".\n"):
+                            break
+                        if in_headers:
+                            if data_line.strip():
+                                headers.append(data_line.rstrip(b"\r\n"))
+                            else:
+                                in_headers = False
+                    self._delivered(b"".join(headers))  # Joining the lines unfolds long subjects
+                    connection.sendall(b"250 OK queued\r\n")
+                elif command == b"QUIT":
+                    connection.sendall(b"221 Bye\r\n")
+                    break
+                elif command in (b"HELO", b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                    connection.sendall(b"250 OK\r\n")
+                else:
+                    connection.sendall(b"502 Command not implemented\r\n")
+        except OSError:
+            pass  # Client went away mid-session
+        finally:
+            stream.close()
+            connection.close()
+
+    def _delivered(self, headers: bytes) -> None:
+        now = time.time()
+        self.first_delivery = self.first_delivery or now
+        self.last_delivery = now
+        match = DELIVERY_TAG.search(headers)
+        if not match:
+            self.untracked += 1  # Grafana alerts and mail sent outside the test
+            return
+        self.delivered += 1
+        kind = "error" if b"Workflow Error" in headers else "success"
+        self.environment.events.request.fire(
+            request_type="SMTP",
+            name=f"email_delivery[{kind}]",
+            response_time=max(now * 1000 - int(match.group(1), 16), 0),
+            response_length=0,
+            exception=None,
+            context={},
+        )
+
+    def summary(self, counters: Dict[str, Tuple[int, int, int]]) -> Dict[str, Any]:
+        """Accepted versus delivered notifications, from the merged request counters"""
+        accepted = sum(sent - failed for name, (sent, failed, _) in counters.items()
+                       if name in ("workflow_success", "workflow_error",
+                                   "workflow_success (retry)", "workflow_error (retry)"))
+        window = (self.last_delivery - self.first_delivery) if self.delivered > 1 else 0.0
+        return {
+            'accepted': accepted,
+            'delivered': self.delivered,
+            'undelivered': max(accepted - self.delivered, 0),
+            'untracked': self.untracked,
+            'delivery_rate': self.delivered / window if window else 0.0,
+        }
+
+email_sink = EmailSink(EMAIL_SINK_PORT, EMAIL_SINK_BIND) if EMAIL_SINK_PORT else None
+
+def load_webhook_payloads(path: str) -> List[bytes]:
+    """Recorded n8n webhook bodies, one JSON object per line, encoded once"""
+    with open(path, encoding="utf-8") as payload_file:
+        return [json.dumps(json.loads(line), separators=(',', ':')).encode() for line in payload_file if line.strip()]
+
+webhook_replay = itertools.cycle(load_webhook_payloads(WEBHOOK_PAYLOADS_FILE)) if WEBHOOK_PAYLOADS_FILE else None
+webhook_sequence = itertools.count(1)
+WEBHOOK_STATUSES = [json.dumps(status).encode() for status in ("success",) * 8 + ("error", "running")]
+WEBHOOK_TEMPLATE = PayloadTemplate({
+    "workflow": {"id": PayloadTemplate.Slot("workflow_id"), "name": PayloadTemplate.Slot("workflow")},
+    "execution": {
+        "id": PayloadTemplate.Slot("execution"),
+        "status": PayloadTemplate.Slot("status"),
+        "startedAt": PayloadTemplate.Slot("timestamp"),
+        "finishedAt": PayloadTemplate.Slot("timestamp"),
+    },
+    "data": {"recordsProcessed": PayloadTemplate.Slot("records")},
+})
+GRAFANA_ALERT_BODY = json.dumps({
+    "title": "[FIRING:1] HighCPUUsage",
+    "status": "firing",
+    "state": "alerting",
+    "message": "CPU usage is above 90% for the last 5 minutes",
+    "externalURL": "http://localhost:3000/",
+    "commonAnnotations": {"summary": "High CPU usage detected"},
+    "alerts": [{
+        "status": "firing",
+        "labels": {"alertname": "HighCPUUsage", "instance": "loadtest"},
+        "annotations": {"description": "CPU usage is above 90% for the last 5 minutes"},
+        "valueString": "[ var='A' value=93 ]",
+        "startsAt": "2024-12-13T04:32:49Z",
+        "silenceURL": "http://localhost:3000/alerting/silence/new",
+        "dashboardURL": "http://localhost:3000/d/loadtest",
+    }],
+}, separators=(',', ':')).encode()
+
+def webhook_body() -> bytes:
+    """The next recorded webhook body, or a generated one"""
+    if webhook_replay is not None:
+        return next(webhook_replay)
+    workflow = random.randrange(100)
+    return WEBHOOK_TEMPLATE.render(
+        workflow_id=str(workflow + 1),
+        workflow=WORKFLOW_NAMES[workflow],
+        execution=f"exec_{REQUEST_ID_PREFIX}{next(webhook_sequence):x}",
+        status=random.choice(WEBHOOK_STATUSES),
+        timestamp=coarse_clock.isoformat_json(),
+        records=random.randrange(1000),
+    )
+
+class NotificationBacklog:
+    """Ingested notifications awaiting a read, and how long each burst's backlog takes to drain.
+
+    Webhook bursts on this process bracket themselves with ``burst_started``
+    and ``burst_finished``; readers feed every unread count they see to
+    ``observe``. Once the count is back to where it was before the burst,
+    a ``backlog_drain`` event reports the time since the burst ended. A burst
+    that arrives before that reports the drain as failed.
+    """
+
+    def __init__(self, max_ids=10000):
+        self.unread_ids = deque(maxlen=max_ids)
+        self.bursts_in_flight = 0
+        self.last_unread = None
+        self.drain_target = None
+        self.drain_started = None
+
+    def burst_started(self, environment) -> None:
+        if self.drain_started is not None:
+            self._report(environment, RuntimeError("Backlog still draining when the next burst arrived"))
+        self.bursts_in_flight += 1
+        if self.drain_target is None:
+            self.drain_target = self.last_unread  # None until a reader has polled once
+
+    def burst_finished(self) -> None:
+        self.bursts_in_flight -= 1
+        if not self.bursts_in_flight and self.drain_target is not None:
+            self.drain_started = time.monotonic()
+
+    def observe(self, environment, unread: int) -> None:
+        self.last_unread = unread
+        if self.drain_started is not None and unread <= self.drain_target:
+            self._report(environment, None)
+            self.drain_target = None
+
+    def _report(self, environment, exception) -> None:
+        environment.events.request.fire(
+            request_type="DRAIN",
+            name="backlog_drain",
+            response_time=(time.monotonic() - self.drain_started) * 1000,
+            response_length=0,
+            exception=exception,
+            context={},
+        )
+        self.drain_started = None
+
+notification_backlog = NotificationBacklog()
+REGISTER_TEMPLATE = PayloadTemplate({
+    "email": PayloadTemplate.Slot("email"),
+    "password": "password123",
+    "firstName": "Test",
+    "lastName": "User",
+    "roles": ["staff"],
+})
+WORKFLOW_SUCCESS_TEMPLATE = PayloadTemplate({
+    "workflowName": PayloadTemplate.Slot("workflow"),
+    "timestamp": PayloadTemplate.Slot("timestamp"),
+})
+WORKFLOW_ERROR_TEMPLATE = PayloadTemplate({
+    "workflowName": PayloadTemplate.Slot("workflow"),
+    "timestamp": PayloadTemplate.Slot("timestamp"),
+    "errorDetails": PayloadTemplate.Slot("error"),
+})
+
+# Greenlet-local state of an open-model arrival (see OpenModelUser)
+arrival_context = gevent.local.local()
+
+class BaseTaskSet(TaskSet):
+    max_retries = 3  # maximum number of retry attempts
+    auth_role = "admin"  # Token pool the task set's requests authenticate from
+    checked_routes = set()  # Request names whose first response was checked for a role mismatch
+    retry_policy = retry_policy
+
+    def send(self, method, path, name, **kwargs):
+        """Issue a request with centralised response handling, retries and circuit breaking.
+
+        Retried attempts are reported as ``"<name> (retry)"`` so their latency
+        never mixes with first attempts. The circuit breaker is the one of the
+        host the request actually goes to, which differs from the user's host
+        for absolute URLs. Returns the last response, or None if that host's
+        circuit is open.
+        """
+        policy = self.retry_policy
+        host = self.user.host
+        if path.startswith(("http://", "https://")):
+            url = urlparse(path)
+            host = f"{url.scheme}://{url.netloc}"
+        breaker = policy.breaker(host)
+        if not breaker.allow():
+            policy.short_circuited += 1
+            self.user.environment.events.request.fire(
+                request_type=method,
+                name=f"{name} (circuit open)",
                 response_time=0,
-                exception=e
+                response_length=0,
+                exception=CircuitOpenError(f"Circuit open for {host}"),
+                context={},
             )
+            return None
+
+        policy.record_attempt()
+        # Open model: only the arrival's first attempt carries its queueing delay; retries time themselves
+        intended_start = getattr(arrival_context, 'intended_start', None)
+        arrival_context.intended_start = None
+        attempt = 0
+        while True:
+            request_name = name if attempt == 0 else f"{name} (retry)"
+            # The first attempt was admitted above; a retry takes its slot only now, right before sending
+            if attempt and not breaker.allow():
+                return response
+            try:
+                with self.client.request(method, path, name=request_name, catch_response=True, **kwargs) as response:
+                    self.handle_response(response, request_name)
+                    status_code = response.status_code
+                    if intended_start is not None and attempt == 0:
+                        # Open model: report latency from when the request should have been sent
+                        response.request_meta["response_time"] = (time.monotonic() - intended_start) * 1000
+            except RequestException as e:
+                metrics.errors.record(request_name, 0, str(e))
+                breaker.record(False)  # Also releases a half-open probe
+                return None
+
+            retryable = policy.is_retryable(status_code)
+            breaker.record(not policy.is_host_failure(status_code))
+            if not retryable or attempt >= self.max_retries or not breaker.available() or not policy.try_spend():
+                return response
+            attempt += 1
+            policy.wait(attempt)
+
+    def get_auth_headers(self, role=None) -> Dict[str, str]:
+        """Get headers with authentication token.
+
+        Returns a new dict on every call; only the Authorization value is
+        built once per user and token.
+        """
+        token_for = getattr(self.user, 'token_for', None)
+        token = token_for(role or self.auth_role) if token_for else getattr(self.user, 'token', None)
+        if not token:
+            logger.warning("No authentication token available")
+            return {}
+        if self.__dict__.get('_auth_token') is not token:
+            self._authorization = f"Bearer {token}"
+            self._auth_token = token
+        return {
+            "Authorization": self._authorization,
+            "Content-Type": "application/json",
+            "X-Request-ID": next_request_id(),
+        }
+
+    @staticmethod
+    def response_error_detail(response) -> str:
+        """Error message from a requests or FastHttpUser response body"""
+        if not response.status_code and getattr(response, 'error', None) is not None:
+            return str(response.error)  # No response at all: connection refused, timeout, ...
+        try:
+            return response.json().get('message', 'No detail provided')
+        except (ValueError, AttributeError):
+            # Both clients raise a ValueError subclass on invalid JSON; bodies may also be empty or non-objects
+            return f"Raw response: {(response.text or '')[:200]}"
+
+    def check_role(self, response, name: str) -> None:
+        """Flag an endpoint whose first response is a 403: the task set's auth_role can't use it"""
+        if name in self.checked_routes:
+            return
+        self.checked_routes.add(name)
+        if response.status_code == 403:
+            logger.error(f"{name} answered its first request with 403 for the '{self.auth_role}' token pool; "
+                         f"{type(self).__name__}.auth_role does not match the route's @Roles")
+
+    def handle_response(self, response, name: str) -> None:
+        """Centralized response handling"""
+        self.check_role(response, name)
+        try:
+            if response.status_code in [200, 201]:
+                response.success()
+                logger.debug(f"Success: {name} - {response.status_code}")
+            else:
+                # Logged (sampled) by the request listener through metrics.errors
+                response.failure(f"Status {response.status_code} - {self.response_error_detail(response)}")
+        except Exception as e:
+            logger.error(f"Error handling response for {name}: {str(e)}")
+
+class UserServiceTasks(BaseTaskSet):
+    # Class level configuration
+    min_wait = 1000  # minimum wait time in ms
+    max_wait = 3000  # maximum wait time in ms
+    max_retries = 3  # maximum number of retry attempts
+
+    @task(3)
+    def get_user_profile(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("GET", "/users/profile", "get_profile", headers=headers)
+
+    @task(1)
+    def register_user(self):
+        # Unique per run and per process, so registrations measure creation rather than 409s
+        body = REGISTER_TEMPLATE.render(email=f"newuser-{REGISTRATION_PREFIX}-{next(registration_sequence)}@example.com")
+        self.send("POST", "/auth/register", "register", data=body, headers=JSON_HEADERS)
+
+class EmailServiceTasks(BaseTaskSet):
+    # Class level configuration
+    max_retries = 3  # maximum number of retry attempts
+
+    @task(2)
+    def send_workflow_success(self, headers=None):
+        headers = headers or self.get_auth_headers()
+        if not headers:
+            return
+
+        body = WORKFLOW_SUCCESS_TEMPLATE.render(
+            workflow=workflow_name(),
+            timestamp=coarse_clock.isoformat_json(),
+        )
+        self.send("POST", "/email/send-success", "workflow_success", data=body, headers=headers)
+
+    @task(1)
+    def send_workflow_error(self, headers=None):
+        headers = headers or self.get_auth_headers()
+        if not headers:
+            return
+
+        body = WORKFLOW_ERROR_TEMPLATE.render(
+            workflow=workflow_name(),
+            timestamp=coarse_clock.isoformat_json(),
+            error=f'"Test error {random.randrange(1000, 10000)}"'.encode(),
+        )
+        self.send("POST", "/email/send-error", "workflow_error", data=body, headers=headers)
+
+class EmailBurstTasks(EmailServiceTasks):
+    """Bursts of workflow notifications, sent concurrently like a batch of finished n8n workflows.
+
+    Every notification is reported as usual; each burst is also reported as
+    ``email_burst[<size>]``, timed until its last notification was answered.
+    Each notification gets its own headers dict, so no greenlet (or retry)
+    ever sees another's X-Request-ID.
+    """
+
+    @task
+    def send_burst(self):
+        base = self.get_auth_headers()
+        if not base:
+            return
+
+        started = time.perf_counter()
+        group = gevent.pool.Group()
+        for _ in range(EMAIL_BURST_SIZE):
+            send = self.send_workflow_error if random.random() < EMAIL_ERROR_RATIO else self.send_workflow_success
+            group.spawn(send, {**base, "X-Request-ID": next_request_id()})
+        group.join()
+        self.user.environment.events.request.fire(
+            request_type="BURST",
+            name=f"email_burst[{EMAIL_BURST_SIZE}]",
+            response_time=(time.perf_counter() - started) * 1000,
+            response_length=0,
+            exception=None,
+            context={},
+        )
+
+class IntegrationWebhookTasks(BaseTaskSet):
+    """n8n workflows finishing together: bursts of webhooks at LOADTEST_INTEGRATION_FANIN concurrency.
+
+    Ingest rate is the ``webhook`` request rate; each burst is also reported
+    as ``webhook_burst[<fan-in>]``, timed until its last webhook was answered.
+    """
+
+    def post_webhook(self):
+        response = self.send("POST", "/workflows/webhook", "webhook", data=webhook_body(), headers=JSON_HEADERS)
+        if response is not None and response.status_code in (200, 201):
+            try:
+                notification_backlog.unread_ids.append(response.json()["_id"])
+            except (ValueError, KeyError, TypeError):
+                pass  # Nothing to mark read later
+
+    def post_grafana_alert(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("POST", f"{EMAIL_SERVICE_HOST}/email/grafananotif", "grafananotif",
+                  data=GRAFANA_ALERT_BODY, headers=headers)
+
+    @task
+    def webhook_burst(self):
+        environment = self.user.environment
+        started = time.perf_counter()
+        notification_backlog.burst_started(environment)
+        try:
+            group = gevent.pool.Group()
+            for _ in range(INTEGRATION_FANIN):
+                if random.random() < INTEGRATION_GRAFANA_RATIO:
+                    group.spawn(self.post_grafana_alert)
+                else:
+                    group.spawn(self.post_webhook)
+            group.join()
+        finally:
+            notification_backlog.burst_finished()
+        environment.events.request.fire(
+            request_type="BURST",
+            name=f"webhook_burst[{INTEGRATION_FANIN}]",
+            response_time=(time.perf_counter() - started) * 1000,
+            response_length=0,
+            exception=None,
+            context={},
+        )
+
+class NotificationReaderTasks(BaseTaskSet):
+    """Users watching the notification bell: poll the unread count, list and mark read.
+
+    Reads made while a webhook burst is in flight on this process are named
+    ``"<name> (during writes)"``, so latency under write contention is
+    reported separately from the idle baseline.
+    """
+
+    @staticmethod
+    def contended(name: str) -> str:
+        return f"{name} (during writes)" if notification_backlog.bursts_in_flight else name
+
+    @task(5)
+    def poll_unread_count(self):
+        response = self.send("GET", "/workflows/notifications/unread-count", self.contended("unread_count"))
+        if response is not None and response.status_code == 200:
+            try:
+                notification_backlog.observe(self.user.environment, int(response.json()["count"]))
+            except (ValueError, KeyError, TypeError):
+                pass
+
+    @task(3)
+    def mark_read(self):
+        try:
+            notification_id = notification_backlog.unread_ids.popleft()
+        except IndexError:
+            return self.list_notifications()
+
+        self.send("POST", f"/workflows/notifications/{quote(str(notification_id), safe='')}/read",
+                  self.contended("mark_read"))
+
+    @task(2)
+    def list_notifications(self):
+        response = self.send("GET", "/workflows/notifications", self.contended("notifications"),
+                             params={"page": 1, "limit": 20})
+        if response is not None and response.status_code == 200 and not notification_backlog.unread_ids:
+            # Notifications created elsewhere (other workers, n8n itself) are read too
+            try:
+                notification_backlog.unread_ids.extend(
+                    item["_id"] for item in response.json()["notifications"] if not item.get("read"))
+            except (ValueError, KeyError, TypeError):
+                pass
+
+class SkillsServiceTasks(BaseTaskSet):
+    """Read paths of skills-service: taxonomy lookups and skills-matrix analytics"""
+    max_retries = 3  # maximum number of retry attempts
+
+    @task(4)
+    def get_technical_taxonomy(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("GET", "/taxonomy/technical", "taxonomy_technical",
+                  params={"businessUnit": catalog.pick('business_units')}, headers=headers)
+
+    @task(2)
+    def get_technical_taxonomy_doc(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("GET", f"/taxonomy/technical/{quote(catalog.pick('taxonomy_doc_ids'), safe='')}",
+                  "taxonomy_technical_doc", params={"businessUnit": catalog.pick('business_units')}, headers=headers)
+
+    @task(3)
+    def get_user_skills_summary(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("GET", "/skills-matrix/user/summary", "skills_matrix_user_summary",
+                  params={"email": catalog.pick('employee_emails')}, headers=headers)
+
+    @task(2)
+    def get_user_skills(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("GET", "/skills-matrix/user", "skills_matrix_user",
+                  params={"email": catalog.pick('employee_emails')}, headers=headers)
+
+    @task(1)
+    def get_rankings(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("GET", "/skills-matrix/rankings", "skills_matrix_rankings", headers=headers)
+
+    @task(1)
+    def get_distributions(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("GET", "/skills-matrix/distributions", "skills_matrix_distributions", headers=headers)
+
+    @task(1)
+    def get_admin_analysis(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("GET", "/skills-matrix/admin/analysis", "skills_matrix_admin_analysis", headers=headers)
+
+    @task(1)
+    def get_required_skills(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        self.send("GET", "/api/skills-assessments/required-skills", "required_skills",
+                  params={"capability": catalog.pick('capabilities')}, headers=headers)
+
+class LearningServiceTasks(BaseTaskSet):
+    """Read paths of learning-service"""
+    max_retries = 3  # maximum number of retry attempts
+    auth_role = "staff"  # Recommendations are @Roles(STAFF, MANAGER); admin gets 403
+
+    @task
+    def get_recommendations(self):
+        headers = self.get_auth_headers()
+        if not headers:
+            return
+
+        email = quote(catalog.pick('employee_emails'), safe='')
+        self.send("GET", f"/api/learning/recommendations/{email}", "learning_recommendations", headers=headers)
+
+SKILL_NAMES = ["JavaScript", "TypeScript", "Node.js", "React", "MongoDB", "Docker",
+               "Kubernetes", "Test Planning", "Test Automation", "System Design", "SQL", "Python"]
+LEVELS = ["Level1", "Level2", "Level3", "Level4", "Level5", "Level6"]
+
+def technical_taxonomy_doc(doc_number, rng):
+    return {
+        "docId": f"loadtest-doc-{doc_number}",
+        "docRevisionId": f"rev-{rng.getrandbits(48):012x}",
+        "docTitle": f"TSC_Load Test Skill {doc_number}",
+        "title": f"Load Test Skill {doc_number}",
+        "category": "Development and Implementation",
+        "description": f"Synthetic technical skill {doc_number} generated by the load test",
+        "proficiencyDescription": {level: [f"LT-{doc_number}-{i}", f"{level} proficiency"] for i, level in enumerate(LEVELS, 1)},
+        "abilities": {level: [f"{level} ability"] for level in LEVELS},
+        "knowledge": {level: [f"{level} knowledge"] for level in LEVELS},
+        "businessUnit": catalog.pick('business_units'),
+        "rangeOfApplication": ["Load Tests", "Stress Tests"],
+    }
+
+def soft_taxonomy_doc(doc_number, rng):
+    return {
+        "docId": f"loadtest-soft-doc-{doc_number}",
+        "docRevisionId": f"rev-{rng.getrandbits(48):012x}",
+        "docTitle": f"SSC_Load Test Skill {doc_number}",
+        "title": f"Load Test Soft Skill {doc_number}",
+        "category": "Interpersonal Skills",
+        "description": f"Synthetic soft skill {doc_number} generated by the load test",
+        "rating": ["Novice", "Beginner", "Intermediate", "Advanced", "Expert", "Guru"],
+        "proficiencyDescription": {f"level {i}": [f"Level {i} behaviour"] for i in range(1, 7)},
+        "benchmark": {f"level {i}": [f"Professional {i}"] for i in range(1, 7)},
+    }
+
+def assessment_doc(doc_number, rng):
+    email = catalog.values['employee_emails'][doc_number % len(catalog.values['employee_emails'])]
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "emailAddress": email,
+        "nameOfResource": email.split("@")[0],
+        "careerLevelOfResource": "Professional II",
+        "nameOfRespondent": "Load Test",
+        "capability": catalog.pick('capabilities'),
+        "skills": {skill: rng.randint(1, 6) for skill in rng.sample(SKILL_NAMES, 8)},
+    }
+
+# target -> (path, document factory, fields of the request body besides "data")
+BULK_WRITE_TARGETS = {
+    "technical": ("/taxonomy/technical/bulk-upsert", technical_taxonomy_doc, {}),
+    "soft": ("/taxonomy/soft/bulk-upsert", soft_taxonomy_doc, {}),
+    "assessments": ("/api/skills-assessments/bulk-update-assessments", assessment_doc, {"assessmentType": "self"}),
+}
+
+def iter_bulk_payload(target, batch_size, first_doc, rng, chunk_docs=200):
+    """Stream the JSON body of one bulk request, encoding ``chunk_docs`` documents at a time.
+
+    Only one chunk is ever held in memory, so a 50k-document batch costs the
+    same memory as a 200-document one; requests sends it chunk-encoded.
+    """
+    _, make_doc, fields = BULK_WRITE_TARGETS[target]
+    head = json.dumps(fields, separators=(',', ':'))[:-1]
+    yield (head + (',"data":[' if fields else '"data":[')).encode()
+    for start in range(0, batch_size, chunk_docs):
+        docs = (make_doc((first_doc + i) % BULK_ID_SPACE + 1, rng) for i in range(start, min(start + chunk_docs, batch_size)))
+        yield (("," if start else "") + ",".join(json.dumps(doc, separators=(',', ':')) for doc in docs)).encode()
+    yield b"]}"
+
+class BulkWriteTasks(BaseTaskSet):
+    """Bulk upserts as issued by the sync jobs, swept over LOADTEST_BULK_BATCH_SIZES"""
+    max_retries = 0  # a failed batch is a measurement, not something to hide with a retry
 
-class EmailServiceTasks(BaseTaskSet):
-    # Class level configuration
-    max_retries = 3  # maximum number of retry attempts
+    def on_start(self):
+        self.rng = random.Random(f"{CATALOG_SEED}-{id(self)}")
+        self.started = time.monotonic()
+        self.sequence = itertools.count()
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.retry_count = 0
+    def next_batch_size(self):
+        if BULK_STEP_SECONDS > 0:
+            step = int((time.monotonic() - self.started) / BULK_STEP_SECONDS)
+            return BULK_BATCH_SIZES[min(step, len(BULK_BATCH_SIZES) - 1)]
+        return BULK_BATCH_SIZES[next(self.sequence) % len(BULK_BATCH_SIZES)]
 
-    @task(2)
-    def send_workflow_success(self):
+    @task
+    def bulk_write(self):
         headers = self.get_auth_headers()
         if not headers:
             return
-            
-        data = {
-            "workflowName": f"workflow-{random.randint(1, 100)}",
-            "timestamp": datetime.now().isoformat()
+
+        target = BULK_TARGETS[self.rng.randrange(len(BULK_TARGETS))]
+        batch_size = self.next_batch_size()
+        path = BULK_WRITE_TARGETS[target][0]
+        first_doc = self.rng.randrange(BULK_ID_SPACE)
+        self.send("POST", path, f"bulk_{target}[{batch_size}]",
+                  data=iter_bulk_payload(target, batch_size, first_doc, self.rng), headers=headers)
+
+class DataSeeder:
+    """Creates the data a steady-state run reads, before any virtual user starts.
+
+    Each stage splits its items into batches and runs them in waves of
+    ``concurrency`` greenlets over one pooled session. After every wave the
+    number of items known to be done is written to the checkpoint file, so a
+    rerun skips finished stages and resumes the interrupted one from its last
+    completed wave. Creation is idempotent (409 on existing users, upserts
+    elsewhere), so redoing part of a wave is harmless. Requests go through
+    the seeder's own session and stay out of Locust's statistics.
+    """
+
+    def __init__(self, users=1000, employees=1000, taxonomy_docs=500, assessments=1000, concurrency=20,
+                 batch_size=500, checkpoint_file="", max_attempts=3):
+        self.counts = {'users': users, 'employees': employees, 'taxonomy': taxonomy_docs, 'assessments': assessments}
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.checkpoint_file = checkpoint_file
+        self.max_attempts = max_attempts
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.admin_token = None
+        # Identifies the data set, so a checkpoint from another target or pattern isn't reused
+        self.fingerprint = {
+            'user_service': USER_SERVICE_HOST,
+            'skills_service': SKILLS_SERVICE_HOST,
+            'account_pattern': ACCOUNT_EMAIL_PATTERN,
+            'catalog_seed': CATALOG_SEED,
         }
-        
+        self.progress = self._load_checkpoint()
+
+    def accounts(self) -> List[Dict[str, str]]:
+        """Seeded users carry the staff role they were registered with"""
+        return [{"email": ACCOUNT_EMAIL_PATTERN.format(n=n), "password": ACCOUNT_PASSWORD, "role": "staff"}
+                for n in range(1, self.counts['users'] + 1)]
+
+    def catalog_values(self) -> Dict[str, List[str]]:
+        """Catalog lists covering exactly what was seeded"""
+        values = {}
+        if self.counts['employees']:
+            values['employee_emails'] = [f"employee{n}@example.com" for n in range(1, self.counts['employees'] + 1)]
+        if self.counts['taxonomy']:
+            values['taxonomy_doc_ids'] = [f"loadtest-doc-{n}" for n in range(1, self.counts['taxonomy'] + 1)]
+        return values
+
+    def run(self):
+        """Run every stage, then return what the task sets should use"""
+        stages = (
+            ('users', 10, self._register_users),  # One request per account, so keep batches small
+            ('employees', self.batch_size, self._sync_employees),
+            ('taxonomy', self.batch_size, self._upsert_taxonomy),
+            ('assessments', self.batch_size, self._upsert_assessments),
+        )
+        for stage, batch_size, create in stages:
+            total = self.counts[stage]
+            done = min(self.progress.get(stage, 0), total)
+            if done >= total:
+                if total:
+                    logger.info(f"Seeding {stage}: {total:,} already done (checkpoint)")
+                continue
+            if stage != 'users' and not self._login_admin():
+                raise RuntimeError(f"Seeding {stage} needs an admin login ({ADMIN_EMAIL})")
+            started = time.monotonic()
+            resumed_at = done
+            pool = gevent.pool.Pool(self.concurrency)
+            while done < total:
+                wave = [(first, min(batch_size, total - first))
+                        for first in range(done, min(done + batch_size * self.concurrency, total), batch_size)]
+                failed = [batch for batch, ok in zip(wave, pool.map(lambda batch: self._attempt(create, *batch), wave)) if not ok]
+                if failed:
+                    raise RuntimeError(f"Seeding {stage} failed for items {failed[0][0] + 1}-{failed[0][0] + failed[0][1]}; "
+                                       f"rerun to resume from item {done + 1}")
+                done = wave[-1][0] + wave[-1][1]
+                self.progress[stage] = done
+                self._save_checkpoint()
+            elapsed = time.monotonic() - started
+            logger.info(f"Seeded {stage}: {done - resumed_at:,} in {elapsed:.1f}s "
+                        f"({(done - resumed_at) / max(elapsed, 1e-9):,.0f}/s)")
+        return {'accounts': self.accounts() if self.counts['users'] else [], 'catalog': self.catalog_values()}
+
+    def _attempt(self, create, first, count):
+        for attempt in range(self.max_attempts):
+            if attempt:
+                retry_policy.wait(attempt)
+            try:
+                status_code = create(first, count)
+            except RequestException as e:
+                logger.warning(f"Seed batch {first + 1}-{first + count} failed: {str(e)}")
+                continue
+            if 200 <= status_code < 300:
+                return True
+            logger.warning(f"Seed batch {first + 1}-{first + count} failed: status {status_code}")
+            if not retry_policy.is_retryable(status_code):
+                return False
+        return False
+
+    def _login_admin(self):
+        if self.admin_token:
+            return True
+        response = self.session.post(f"{USER_SERVICE_HOST}/auth/login",
+                                     json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}, timeout=30)
+        if response.status_code in [200, 201]:
+            self.admin_token = response.json().get("access_token")
+        return bool(self.admin_token)
+
+    def _admin_headers(self):
+        return {"Authorization": f"Bearer {self.admin_token}", "Content-Type": "application/json"}
+
+    def _register_users(self, first, count):
+        for n in range(first + 1, first + count + 1):
+            response = self.session.post(f"{USER_SERVICE_HOST}/auth/register", json={
+                "email": ACCOUNT_EMAIL_PATTERN.format(n=n),
+                "password": ACCOUNT_PASSWORD,
+                "firstName": "Load",
+                "lastName": f"Test {n}",
+                "roles": ["staff"],
+            }, timeout=30)
+            if response.status_code not in [201, 409]:  # 409: registered by an earlier seed
+                return response.status_code
+        return 201
+
+    def _sync_employees(self, first, count):
+        business_units = catalog.values['business_units']
+        employees = {
+            str(n): {
+                "employeeId": n,
+                "email": f"employee{n}@example.com",
+                "firstName": "Employee",
+                "lastName": str(n),
+                "businessUnit": business_units[n % len(business_units)],
+                "employmentStatus": "Active",
+                "grade": "Professional II",
+                # Twenty reports per manager, managers being earlier employees
+                "managerName": f"Employee {max(1, n // 20)}",
+            }
+            for n in range(first + 1, first + count + 1)
+        }
+        return self.session.post(f"{USER_SERVICE_HOST}/employees/sync", json=employees,
+                                 headers=self._admin_headers(), timeout=120).status_code
+
+    def _upsert_taxonomy(self, first, count):
+        rng = random.Random(f"{CATALOG_SEED}-seed-{first}")
+        return self.session.post(f"{SKILLS_SERVICE_HOST}{BULK_WRITE_TARGETS['technical'][0]}",
+                                 data=iter_bulk_payload('technical', count, first, rng),
+                                 headers=self._admin_headers(), timeout=120).status_code
+
+    def _upsert_assessments(self, first, count):
+        rng = random.Random(f"{CATALOG_SEED}-seed-{first}")
+        return self.session.post(f"{SKILLS_SERVICE_HOST}{BULK_WRITE_TARGETS['assessments'][0]}",
+                                 data=iter_bulk_payload('assessments', count, first, rng),
+                                 headers=self._admin_headers(), timeout=120).status_code
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return {}
         try:
-            with self.client.post(
-                "/email/workflow/success",
-                json=data,
-                headers=headers,
-                catch_response=True,
-                name="workflow_success"
-            ) as response:
-                self.handle_response(response, "workflow_success")
-        except RequestException as e:
-            logger.error(f"Workflow success request failed: {str(e)}")
-            events.request_failure.fire(
-                request_type="POST",
-                name="workflow_success",
-                response_time=0,
-                exception=e
-            )
+            with open(self.checkpoint_file, encoding="utf-8") as handle:
+                checkpoint = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable seed checkpoint {self.checkpoint_file}: {str(e)}")
+            return {}
+        if checkpoint.get('fingerprint') != self.fingerprint:
+            logger.info("Seed checkpoint is for a different target, seeding from scratch")
+            return {}
+        return checkpoint.get('progress', {})
 
-    @task(1)
-    def send_workflow_error(self):
-        headers = self.get_auth_headers()
-        if not headers:
+    def _save_checkpoint(self):
+        if not self.checkpoint_file:
             return
-            
-        data = {
-            "workflowName": f"workflow-{random.randint(1, 100)}",
-            "timestamp": datetime.now().isoformat(),
-            "errorDetails": f"Test error {random.randint(1000, 9999)}"
-        }
-        
+        # Write then rename, so an interrupted seed never leaves a truncated checkpoint
+        temporary = f"{self.checkpoint_file}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump({'fingerprint': self.fingerprint, 'progress': self.progress, 'updated': time.time()}, handle)
+        os.replace(temporary, self.checkpoint_file)
+
+def publish_seed(seeded):
+    """Point the staff token pool and catalog at seeded data (on every process that runs users)
+
+    Seeded accounts only replace the staff pool; the admin pool keeps the admin
+    credentials so ADMIN-only routes still authenticate.
+    """
+    if seeded['accounts'] and not ACCOUNTS_FILE:
+        token_pools.set_accounts(seeded['accounts'])
+    for kind, items in seeded['catalog'].items():
+        catalog.set(kind, items)
+
+seed_result = {}  # What the master or local runner seeded, if seeding is on
+
+def run_seed():
+    return DataSeeder(
+        users=SEED_USERS, employees=SEED_EMPLOYEES, taxonomy_docs=SEED_TAXONOMY_DOCS,
+        assessments=SEED_ASSESSMENTS, concurrency=SEED_CONCURRENCY, batch_size=SEED_BATCH_SIZE,
+        checkpoint_file=SEED_CHECKPOINT_FILE,
+    ).run()
+
+class LoginScenarioTasks(BaseTaskSet):
+    """Deliberate /auth/login load, one login per task run across the pooled accounts"""
+
+    @task
+    def login(self) -> None:
         try:
             with self.client.post(
-                "/email/workflow/error",
-                json=data,
-                headers=headers,
+                "/auth/login",
+                json=token_pools.next_account(),
                 catch_response=True,
-                name="workflow_error"
+                name="login"
             ) as response:
-                self.handle_response(response, "workflow_error")
+                if response.status_code == 200:
+                    try:
+                        if response.json().get("access_token"):
+                            response.success()
+                        else:
+                            response.failure("No access token in response")
+                    except json.JSONDecodeError as e:
+                        response.failure(f"Invalid JSON response: {str(e)}")
+                else:
+                    response.failure(f"Login failed with status {response.status_code}")
         except RequestException as e:
-            logger.error(f"Workflow error request failed: {str(e)}")
-            events.request_failure.fire(
-                request_type="POST",
-                name="workflow_error",
-                response_time=0,
-                exception=e
-            )
+            logger.error(f"Login request failed: {str(e)}")
+
+class PooledAuthMixin:
+    """Takes the user's tokens from the role-keyed token pools instead of logging in.
+
+    The user's task set declares the role it needs (``auth_role``). An account
+    is held per role, and swapped for another live one once its token is
+    lost to a failed refresh.
+    """
+    credentials = None
+
+    @property
+    def auth_role(self):
+        return getattr(self.tasks[0], 'auth_role', 'admin') if self.tasks else 'admin'
 
-class UserServiceUser(HttpUser):
+    def credential_for(self, role) -> Optional[PooledToken]:
+        if self.credentials is None:
+            self.credentials = {}
+        credential = self.credentials.get(role)
+        if credential is None or not credential.token or credential.expires_at <= time.time():
+            credential = self.credentials[role] = token_pools.acquire(role)
+        return credential
+
+    def token_for(self, role=None):
+        credential = self.credential_for(role or self.auth_role)
+        return credential.token if credential else None
+
+    @property
+    def token(self):
+        return self.token_for()
+
+    def on_start(self):
+        if not self.credential_for(self.auth_role):
+            logger.error(f"No pooled {self.auth_role} token available; requests will be skipped")
+
+class PooledAuthUser(PooledAuthMixin, FastHttpUser if HTTP_CLIENT == "fast" else HttpUser):
+    """Base for the service users, on whichever HTTP client LOADTEST_HTTP_CLIENT selects"""
+    abstract = True
+    concurrency = FAST_HTTP_CONCURRENCY  # Keep-alive connections per user (FastHttpUser only)
+
+class UserServiceUser(PooledAuthUser):
     tasks = [UserServiceTasks]
-    host = "http://localhost:3001"
+    host = USER_SERVICE_HOST
     wait_time = between(1, 3)
-    token = None
 
     def on_stop(self):
         """Cleanup after test completion"""
         logger.info("User service test completed")
 
-class EmailServiceUser(HttpUser):
+class EmailServiceUser(PooledAuthUser):
     tasks = [EmailServiceTasks]
-    host = "http://localhost:3005"
+    host = EMAIL_SERVICE_HOST
     wait_time = between(1, 3)
-    token = None
-
-    def on_start(self):
-        """Login through user service to get token with retry mechanism"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                auth_url = "http://localhost:3001/auth/login"
-                credentials = {
-                    "email": "admin@example.com",
-                    "password": "AdminPassword123!"
-                }
-                
-                with self.client.post(
-                    auth_url,
-                    json=credentials,
-                    catch_response=True,
-                    name="email_service_login"
-                ) as response:
-                    if response.status_code == 200:
-                        try:
-                            data = response.json()
-                            self.token = data.get("access_token")
-                            if self.token:
-                                logger.info("Email service user successfully authenticated")
-                                return
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Failed to parse login response: {str(e)}")
-                    
-                    if attempt < max_retries - 1:
-                        wait_time = min(2 ** attempt, 10)
-                        time.sleep(wait_time)
-                        
-            except RequestException as e:
-                logger.error(f"Failed to connect to auth service (attempt {attempt + 1}): {str(e)}")
 
     def on_stop(self):
         """Cleanup after test completion"""
         logger.info("Email service test completed")
 
+class EmailBurstUser(PooledAuthUser):
+    """Workflow notification bursts, weighted with LOADTEST_EMAIL_BURST_WEIGHT"""
+    abstract = EMAIL_BURST_WEIGHT <= 0
+    weight = max(EMAIL_BURST_WEIGHT, 1)
+    tasks = [EmailBurstTasks]
+    host = EMAIL_SERVICE_HOST
+    wait_time = constant(EMAIL_BURST_INTERVAL)
+
+class IntegrationWebhookUser(PooledAuthUser):
+    """Webhook fan-in bursts, weighted with LOADTEST_INTEGRATION_WEBHOOK_WEIGHT. Pooled auth
+    is only used by the Grafana alerts; the webhook route is unauthenticated."""
+    abstract = INTEGRATION_WEBHOOK_WEIGHT <= 0
+    weight = max(INTEGRATION_WEBHOOK_WEIGHT, 1)
+    tasks = [IntegrationWebhookTasks]
+    host = INTEGRATION_SERVICE_HOST
+    wait_time = constant(INTEGRATION_BURST_INTERVAL)
+    concurrency = max(INTEGRATION_FANIN, FAST_HTTP_CONCURRENCY)
+
+    def on_start(self):
+        super().on_start()
+        if isinstance(self.client, Session):
+            # One keep-alive connection per concurrent webhook instead of discarding the overflow
+            adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+            self.client.mount("http://", adapter)
+            self.client.mount("https://", adapter)
+
+class NotificationReaderUser(FastHttpUser if HTTP_CLIENT == "fast" else HttpUser):
+    """Notification polling, weighted with LOADTEST_INTEGRATION_READER_WEIGHT"""
+    abstract = INTEGRATION_READER_WEIGHT <= 0
+    weight = max(INTEGRATION_READER_WEIGHT, 1)
+    tasks = [NotificationReaderTasks]
+    host = INTEGRATION_SERVICE_HOST
+    wait_time = between(1, 3)
+
+class SkillsServiceUser(PooledAuthUser):
+    """Skills-service read load, weighted with LOADTEST_SKILLS_WEIGHT"""
+    abstract = SKILLS_SCENARIO_WEIGHT <= 0
+    weight = max(SKILLS_SCENARIO_WEIGHT, 1)
+    tasks = [SkillsServiceTasks]
+    host = SKILLS_SERVICE_HOST
+    wait_time = between(1, 3)
+
+class LearningServiceUser(PooledAuthUser):
+    """Learning-service read load, weighted with LOADTEST_LEARNING_WEIGHT"""
+    abstract = LEARNING_SCENARIO_WEIGHT <= 0
+    weight = max(LEARNING_SCENARIO_WEIGHT, 1)
+    tasks = [LearningServiceTasks]
+    host = LEARNING_SERVICE_HOST
+    wait_time = between(1, 3)
+
+class BulkWriteUser(PooledAuthMixin, HttpUser):
+    """Bulk-write load, weighted with LOADTEST_BULK_WEIGHT. Always on the requests client,
+    which can send the generated payload chunk-encoded instead of buffering it."""
+    abstract = BULK_SCENARIO_WEIGHT <= 0
+    weight = max(BULK_SCENARIO_WEIGHT, 1)
+    tasks = [BulkWriteTasks]
+    host = SKILLS_SERVICE_HOST
+    wait_time = between(1, 3)
+
+class AuthLoginUser(FastHttpUser if HTTP_CLIENT == "fast" else HttpUser):
+    """Login throughput scenario, enabled with LOADTEST_LOGIN_WEIGHT > 0"""
+    abstract = LOGIN_SCENARIO_WEIGHT <= 0
+    weight = max(LOGIN_SCENARIO_WEIGHT, 1)
+    tasks = [LoginScenarioTasks]
+    host = USER_SERVICE_HOST
+    wait_time = between(1, 3)
+
+
+class ArrivalProfile:
+    """Target arrival rate over time for the open load model"""
+
+    def __init__(self, profile, rate, rate_end, step_rate, step_seconds, spike_rate, spike_at, spike_seconds, duration):
+        if profile not in ("steady", "step", "ramp", "spike"):
+            raise ValueError(f"Unknown open model profile: {profile}")
+        self.profile = profile
+        self.rate = rate
+        self.rate_end = rate_end
+        self.step_rate = step_rate
+        self.step_seconds = step_seconds
+        self.spike_rate = spike_rate
+        self.spike_at = spike_at
+        self.spike_seconds = spike_seconds
+        self.duration = duration
+
+    def rate_at(self, elapsed):
+        """Arrivals per second the whole cluster should generate ``elapsed`` seconds in"""
+        if elapsed >= self.duration:
+            return 0.0
+        if self.profile == "step":
+            return min(self.rate_end, self.rate + self.step_rate * int(elapsed / self.step_seconds))
+        if self.profile == "ramp":
+            return self.rate + (self.rate_end - self.rate) * elapsed / self.duration
+        if self.profile == "spike" and self.spike_at <= elapsed < self.spike_at + self.spike_seconds:
+            return self.spike_rate
+        return self.rate
+
+arrival_profile = ArrivalProfile(
+    OPEN_PROFILE, OPEN_RATE, OPEN_RATE_END, OPEN_STEP_RATE, OPEN_STEP_SECONDS,
+    OPEN_SPIKE_RATE, OPEN_SPIKE_AT, OPEN_SPIKE_SECONDS, OPEN_DURATION,
+)
+open_model_clock = {'started': None}
+
+class OpenModelUser(User):
+    """Dispatcher that issues requests on an arrival schedule instead of a user loop.
+
+    Each dispatcher generates its share of the profile's arrival rate and runs
+    every arrival in its own greenlet, so a slow service builds up in-flight
+    requests instead of quietly lowering the offered load. Arrivals pick a
+    service by the closed-model user weights and a task by that service's
+    @task weights, so the request mix is unchanged. An arrival's first request
+    reports latency from the intended send time, which includes any queueing
+    delay; its retries are timed from their own send.
+    """
+    abstract = LOAD_MODEL != "open"
+    wait_time = constant(0)
+
+    def on_start(self):
+        self.rng = random.Random()
+        self.in_flight = gevent.pool.Pool(OPEN_MAX_IN_FLIGHT)
+        self.next_arrival = None
+        self.dropped = 0
+        self.lanes = []
+        for user_class in (UserServiceUser, EmailServiceUser, SkillsServiceUser, LearningServiceUser):
+            if user_class.abstract:
+                continue
+            # FastHttpUser sizes its connection pool in __init__, so the lane needs the larger
+            # concurrency on its class; otherwise arrivals queue on the default 10 connections
+            lane_class = type(f"Open{user_class.__name__}", (user_class,), {
+                'abstract': True,
+                'concurrency': OPEN_MAX_IN_FLIGHT,
+            })
+            service_user = lane_class(self.environment)
+            if isinstance(service_user.client, Session):
+                # requests keeps 10 connections per host by default; every in-flight arrival needs one
+                adapter = HTTPAdapter(pool_maxsize=OPEN_MAX_IN_FLIGHT)
+                service_user.client.mount("http://", adapter)
+                service_user.client.mount("https://", adapter)
+            service_user.on_start()
+            self.lanes.append((service_user, user_class.tasks[0](service_user)))
+        self.lane_weights = list(itertools.accumulate(lane[0].weight for lane in self.lanes))
+
+    def on_stop(self):
+        # Queued arrivals would otherwise keep sending and reporting after the test stopped
+        self.in_flight.kill(block=False)
+        for service_user, _ in self.lanes:
+            service_user.on_stop()
+            if isinstance(service_user.client, Session):
+                service_user.client.close()
+
+    @task
+    def dispatch(self):
+        now = time.monotonic()
+        started = open_model_clock['started'] or now
+        rate = arrival_profile.rate_at(now - started) / max(OPEN_DISPATCHERS, 1)
+        if rate <= 0:
+            self.next_arrival = None
+            gevent.sleep(0.1)
+            return
+        if self.next_arrival is None:
+            self.next_arrival = now
+
+        while self.next_arrival <= now:
+            if self.in_flight.full():
+                self.dropped += 1
+                self.environment.events.request.fire(
+                    request_type="OPEN",
+                    name="arrival dropped (max in-flight)",
+                    response_time=0,
+                    response_length=0,
+                    exception=RuntimeError(f"{OPEN_MAX_IN_FLIGHT} requests already in flight"),
+                    context={},
+                )
+            else:
+                self.in_flight.spawn(self._arrive, self.next_arrival)
+            self.next_arrival += self.rng.expovariate(rate) if OPEN_POISSON_ARRIVALS else 1.0 / rate
+
+        gevent.sleep(max(0.0, self.next_arrival - time.monotonic()))
+
+    def _arrive(self, intended_start):
+        index = bisect.bisect_left(self.lane_weights, self.rng.random() * self.lane_weights[-1])
+        _, task_set = self.lanes[index]
+        arrival_context.intended_start = intended_start
+        try:
+            self.rng.choice(task_set.tasks)(task_set)
+        except Exception as e:
+            logger.error(f"Open model arrival failed: {str(e)}")
+
+class OpenModelShape(LoadTestShape):
+    """Runs OpenModelUser dispatchers for the duration of the arrival profile (LOADTEST_LOAD_MODEL=open)"""
+    abstract = LOAD_MODEL != "open"
+
+    def tick(self):
+        if self.get_run_time() >= arrival_profile.duration:
+            return None
+        return (OPEN_DISPATCHERS, OPEN_DISPATCHERS, [OpenModelUser])
+
+
+class CapacitySearch:
+    """Finds the largest user count whose measured p99 and error rate stay within the SLO.
+
+    Driven once a second by CapacitySearchShape on the master (or local runner).
+    Every step is measured from the change in the merged TestMetrics histograms
+    and request counters once its warm-up has passed, so in-flight ramp-up
+    requests don't count. A step ends when throughput over consecutive settle
+    windows stops moving by more than the tolerance, or when the maximum hold
+    time runs out.
+    """
+
+    SETTLE_WINDOW = 10.0  # Seconds of throughput compared between settle checks
+
+    def __init__(self, test_metrics, strategy="step", start_users=10, step_users=10, max_users=1000,
+                 spawn_rate=10.0, warmup=10.0, min_hold=30.0, max_hold=120.0, settle_tolerance=0.05,
+                 slo_p99_ms=500.0, slo_error_rate=0.01):
+        if strategy not in ("step", "bisect"):
+            raise ValueError(f"Unknown capacity search strategy: {strategy}")
+        self.metrics = test_metrics
+        self.strategy = strategy
+        self.start_users = max(1, start_users)
+        self.step_users = max(1, step_users)
+        self.max_users = max(self.start_users, max_users)
+        self.spawn_rate = spawn_rate
+        self.warmup = warmup
+        self.min_hold = min_hold
+        self.max_hold = max(min_hold, max_hold)
+        self.settle_tolerance = settle_tolerance
+        self.slo_p99_ms = slo_p99_ms
+        self.slo_error_rate = slo_error_rate
+        self.steps: List[Dict] = []
+        self.finished = False
+        self._users = self.start_users
+        self._passing = 0  # Bisection bounds: highest passing and lowest failing user count
+        self._failing = None
+        self._step_started = None
+        self._measure_started = None
+        self._baseline = None
+        self._settle_marks = []  # (run_time, total requests) every SETTLE_WINDOW seconds
+
+    def tick(self, run_time):
+        """Return the user count for this second, or None once the search is over"""
+        if self.finished:
+            return None
+        if self._step_started is None:
+            self._step_started = run_time
+            logger.info(f"Capacity search: holding {self._users} users")
+
+        ramp = self._users / self.spawn_rate if self.spawn_rate > 0 else 0.0
+        if self._measure_started is None:
+            if run_time - self._step_started >= ramp + self.warmup:
+                self._measure_started = run_time
+                self._baseline = self._capture()
+                self._settle_marks = [(run_time, self.metrics.total_requests)]
+            return self._users
+
+        measured = run_time - self._measure_started
+        if run_time - self._settle_marks[-1][0] >= self.SETTLE_WINDOW:
+            self._settle_marks.append((run_time, self.metrics.total_requests))
+        if measured < self.min_hold or (measured < self.max_hold and not self._settled()):
+            return self._users
+
+        step = self._evaluate(measured)
+        self.steps.append(step)
+        logger.info(
+            f"Capacity search: {step['users']} users -> {step['rps']:.1f} RPS, p99 {step['p99']:.0f}ms, "
+            f"errors {step['error_rate'] * 100:.2f}% ({'within' if step['passed'] else 'over'} SLO)"
+        )
+        next_users = self._next_users(step['passed'])
+        if next_users is None:
+            self.finished = True
+            return None
+        self._users = next_users
+        self._step_started = None
+        self._measure_started = None
+        return self._users
+
+    def _capture(self):
+        return {
+            'counters': self.metrics.request_counters.cumulative(),
+            'histograms': {name: histogram.copy() for name, histogram in self.metrics.endpoint_response_times.items()},
+        }
+
+    def _settled(self):
+        if len(self._settle_marks) < 3:
+            return False
+        (t0, n0), (t1, n1), (t2, n2) = self._settle_marks[-3:]
+        previous, latest = (n1 - n0) / (t1 - t0), (n2 - n1) / (t2 - t1)
+        return abs(latest - previous) <= self.settle_tolerance * max(previous, 1e-9)
+
+    def _evaluate(self, measured):
+        counters = self.metrics.request_counters.cumulative()
+        overall = LatencyHistogram()
+        endpoints = {}
+        total_requests = total_errors = 0
+        for name, histogram in list(self.metrics.endpoint_response_times.items()):
+            window = histogram.since(self._baseline['histograms'].get(name))
+            previous = self._baseline['counters'].get(name, (0, 0, 0))
+            current = counters.get(name, (0, 0, 0))
+            requests_sent, errors = current[0] - previous[0], current[1] - previous[1]
+            if not requests_sent:
+                continue
+            overall.merge(window)
+            total_requests += requests_sent
+            total_errors += errors
+            p99 = window.percentile(0.99) if window.count else 0.0
+            error_rate = errors / requests_sent
+            endpoints[name] = {
+                'rps': requests_sent / measured,
+                'p50': window.percentile(0.50) if window.count else 0.0,
+                'p99': p99,
+                'error_rate': error_rate,
+                'passed': p99 <= self.slo_p99_ms and error_rate <= self.slo_error_rate,
+            }
+        p99 = overall.percentile(0.99) if overall.count else 0.0
+        error_rate = total_errors / total_requests if total_requests else 0.0
+        return {
+            'users': self._users,
+            'seconds': measured,
+            'rps': total_requests / measured,
+            'p99': p99,
+            'error_rate': error_rate,
+            # A step with no traffic at all can't demonstrate capacity
+            'passed': bool(total_requests) and p99 <= self.slo_p99_ms and error_rate <= self.slo_error_rate,
+            'endpoints': endpoints,
+        }
+
+    def _next_users(self, passed):
+        users = self._users
+        if self.strategy == "step":
+            if not passed or users >= self.max_users:
+                return None
+            return min(users + self.step_users, self.max_users)
+
+        if passed:
+            self._passing = max(self._passing, users)
+        else:
+            self._failing = users if self._failing is None else min(self._failing, users)
+        if self._failing is None:
+            return None if users >= self.max_users else min(users * 2, self.max_users)
+        if self._failing - self._passing <= self.step_users:
+            return None
+        return (self._passing + self._failing) // 2
+
+    def result(self):
+        """Max sustainable throughput overall and per endpoint, from the steps within the SLO"""
+        passing = [step for step in self.steps if step['passed']]
+        best = max(passing, key=lambda step: step['rps'], default=None)
+        endpoints = {}
+        for step in self.steps:
+            for name, endpoint in step['endpoints'].items():
+                if endpoint['passed'] and endpoint['rps'] > endpoints.get(name, {}).get('max_rps', -1):
+                    endpoints[name] = {'max_rps': endpoint['rps'], 'users': step['users'],
+                                       'p50': endpoint['p50'], 'p99': endpoint['p99'], 'error_rate': endpoint['error_rate']}
+        return {
+            'strategy': self.strategy,
+            'slo': {'p99_ms': self.slo_p99_ms, 'error_rate': self.slo_error_rate},
+            'max_users': best['users'] if best else None,
+            'max_rps': best['rps'] if best else 0.0,
+            'limited_by_max_users': bool(best) and best['users'] >= self.max_users,
+            'endpoints': endpoints,
+            'steps': self.steps,
+        }
+
+    def write_report(self, path):
+        """Print the search result and save it as JSON for capacity planning"""
+        result = self.result()
+        print(tabulate([
+            [step['users'], f"{step['rps']:.1f}", f"{step['p99']:.0f}ms", f"{step['error_rate'] * 100:.2f}%",
+             f"{Fore.GREEN}pass{Style.RESET_ALL}" if step['passed'] else f"{Fore.RED}fail{Style.RESET_ALL}"]
+            for step in self.steps
+        ], headers=["Users", "RPS", "p99", "Errors", "SLO"], tablefmt="grid"))
+        if result['endpoints']:
+            print(tabulate([
+                [name, f"{endpoint['max_rps']:.1f}", endpoint['users'], f"{endpoint['p99']:.0f}ms"]
+                for name, endpoint in sorted(result['endpoints'].items())
+            ], headers=["Endpoint", "Max RPS within SLO", "At Users", "p99"], tablefmt="grid"))
+        if result['max_users'] is None:
+            print(f"{Fore.RED}No step met the SLO (p99 <= {self.slo_p99_ms:g}ms, errors <= {self.slo_error_rate * 100:g}%){Style.RESET_ALL}")
+        else:
+            limit = " (reached LOADTEST_CAPACITY_MAX_USERS, capacity may be higher)" if result['limited_by_max_users'] else ""
+            print(f"{Fore.CYAN}Max sustainable throughput: {result['max_rps']:.1f} RPS at {result['max_users']} users{limit}{Style.RESET_ALL}")
+        if path:
+            with open(path, "w", encoding="utf-8") as report_file:
+                json.dump(result, report_file, indent=2)
+            print(f"Capacity report written to {path}")
+
+capacity_search = CapacitySearch(
+    metrics, strategy=CAPACITY_STRATEGY, start_users=CAPACITY_START_USERS, step_users=CAPACITY_STEP_USERS,
+    max_users=CAPACITY_MAX_USERS, spawn_rate=CAPACITY_SPAWN_RATE, warmup=CAPACITY_WARMUP_SECONDS,
+    min_hold=CAPACITY_MIN_HOLD_SECONDS, max_hold=CAPACITY_MAX_HOLD_SECONDS,
+    settle_tolerance=CAPACITY_SETTLE_TOLERANCE, slo_p99_ms=CAPACITY_SLO_P99_MS,
+    slo_error_rate=CAPACITY_SLO_ERROR_RATE,
+) if LOAD_MODEL == "capacity" else None
+
+class CapacitySearchShape(LoadTestShape):
+    """Grows the closed-model user mix until the SLO breaks (LOADTEST_LOAD_MODEL=capacity)"""
+    abstract = LOAD_MODEL != "capacity"
+
+    def tick(self):
+        users = capacity_search.tick(self.get_run_time())
+        if users is None:
+            return None
+        return (users, CAPACITY_SPAWN_RATE)
+
+
+# Path segments folded into one request name per route; the services log :id and :uuid already
+PATH_PARAMETERS = (
+    (re.compile(r"/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(?=/|$)", re.I), "/:uuid"),
+    (re.compile(r"/[0-9a-f]{24}(?=/|$)", re.I), "/:objectId"),
+    (re.compile(r"/\d+(?=/|$)"), "/:id"),
+    (re.compile(r"/[^/@]+@[^/]+(?=/|$)"), "/:email"),
+)
+PATH_PLACEHOLDER = re.compile(r"/:(id|uuid)(?=/|$)")
+
+def parse_log_timestamp(value) -> Optional[float]:
+    """Epoch seconds from an ISO 8601 string or an epoch in s, ms, us or ns (Loki)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            try:
+                return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+            except ValueError:
+                return None
+    for scale in (1e18, 1e15, 1e12):
+        if value > scale:
+            return value / (scale / 1e9)
+    return float(value)
+
+def parse_replay_entry(record) -> Optional[Tuple[float, str, str, str, Optional[bytes]]]:
+    """(timestamp, service, method, path, body) of a log record, or None if it isn't a request"""
+    labels = {}
+    if isinstance(record.get("line"), str):
+        # logcli export: the service's own log line, with the stream labels alongside
+        labels = record.get("labels") or {}
+        line = record["line"]
+        try:
+            entry = json.loads(line) if line.startswith("{") else {"message": line}
+        except ValueError:
+            entry = {"message": line}
+        timestamp = record.get("timestamp") or entry.get("timestamp")
+    else:
+        entry = record
+        timestamp = record.get("timestamp") or record.get("time") or record.get("ts")
+
+    method, path = entry.get("method"), entry.get("path") or entry.get("url")
+    if not (method and path):
+        match = INCOMING_REQUEST.match(str(entry.get("message", "")))
+        if not match:
+            return None
+        method, path = match.groups()
+    if path.startswith(("http://", "https://")):
+        parsed = urlparse(path)
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+    seconds = parse_log_timestamp(timestamp)
+    if seconds is None:
+        return None
+    service = entry.get("service") or labels.get("app") or labels.get("service") or ""
+    body = entry.get("body")
+    if body is not None and not isinstance(body, str):
+        body = json.dumps(body, separators=(',', ':'))
+    return seconds, service, method.upper(), path, body.encode() if body is not None else None
+
+def iter_replay_log(path, shard=0, shards=1, max_gap=0.0, stats=None):
+    """Stream ``(offset, host, method, path, name, body)`` for this shard of a replay log.
+
+    The file is read lazily, one line at a time, so memory stays flat however
+    long the log is. Offsets are seconds since the first entry, with gaps
+    longer than ``max_gap`` shortened to it. Every shard computes offsets over
+    the whole log, so shards stay on one timeline, and keeps every
+    ``shards``-th replayable entry. Skipped lines are counted in ``stats``.
+    """
+    stats = stats if stats is not None else {}
+    opener = gzip.open if path.endswith(".gz") else open
+    offset = 0.0
+    previous = None
+    replayable = 0
+    with opener(path, "rt", encoding="utf-8") as log:
+        for line in log:
+            try:
+                entry = parse_replay_entry(json.loads(line))
+            except (ValueError, AttributeError, TypeError):
+                entry = None
+            if entry is None:
+                stats['not_requests'] = stats.get('not_requests', 0) + 1
+                continue
+            seconds, service, method, request_path, body = entry
+            host = REPLAY_SERVICES.get(service)
+            if host is None or (method not in REPLAY_METHODS and body is None):
+                reason = 'unmapped' if host is None else 'no_body'
+                stats[reason] = stats.get(reason, 0) + 1
+                continue
+            if previous is not None:
+                gap = seconds - previous
+                if gap < 0:
+                    stats['out_of_order'] = stats.get('out_of_order', 0) + 1
+                    gap = 0.0  # Sent right away rather than rewinding the clock
+                offset += min(gap, max_gap) if max_gap > 0 else gap
+            previous = max(seconds, previous) if previous is not None else seconds
+            replayable += 1
+            if (replayable - 1) % shards != shard:
+                continue
+            name_path = request_path.split("?", 1)[0]
+            for pattern, placeholder in PATH_PARAMETERS:
+                name_path = pattern.sub(placeholder, name_path)
+            yield offset, host, method, request_path, f"{service} {name_path}", body
+
+def fill_path_placeholders(path: str) -> str:
+    """Concrete values for the :id and :uuid placeholders of normalized logged paths"""
+    if "/:" not in path:
+        return path
+    return PATH_PLACEHOLDER.sub(
+        lambda match: f"/{uuid.uuid4()}" if match.group(1) == "uuid" else f"/{random.randint(1, CATALOG_EMPLOYEES)}",
+        path,
+    )
+
+if LOAD_MODEL == "replay" and not REPLAY_FILE:
+    raise ValueError("LOADTEST_LOAD_MODEL=replay needs LOADTEST_REPLAY_FILE")
+
+replay_state = {'shard': 0, 'shards': 1, 'start': None, 'done': 0, 'skipped': {}}
+
+def assign_replay_shard(data):
+    replay_state.update(shard=data['shard'], shards=data['shards'], start=data['start'])
+
+class ReplayUser(PooledAuthUser):
+    """Dispatcher that reissues a recorded traffic log on its original timeline (LOADTEST_LOAD_MODEL=replay).
+
+    One runs per process, on its shard of the log. Each request runs in its
+    own greenlet, so a slow service doesn't hold back the timeline; past
+    LOADTEST_REPLAY_MAX_IN_FLIGHT the request is reported as dropped instead.
+    Latency is reported from the intended send time, as in the open model.
+    Only routes outside LOADTEST_REPLAY_PUBLIC_ROUTES carry the pooled token.
+    """
+    abstract = LOAD_MODEL != "replay"
+    wait_time = constant(0)
+    host = USER_SERVICE_HOST  # Requests use absolute URLs for every service
+    concurrency = REPLAY_MAX_IN_FLIGHT
+
+    def on_start(self):
+        super().on_start()
+        self.in_flight = gevent.pool.Pool(REPLAY_MAX_IN_FLIGHT)
+        if isinstance(self.client, Session):
+            adapter = HTTPAdapter(pool_connections=len(REPLAY_SERVICES), pool_maxsize=min(REPLAY_MAX_IN_FLIGHT, 100))
+            self.client.mount("http://", adapter)
+            self.client.mount("https://", adapter)
+
+    @task
+    def replay(self):
+        start = replay_state['start'] or time.time()
+        clock = time.monotonic() + (start - time.time())  # Monotonic time of the log's first entry
+        entries = iter_replay_log(REPLAY_FILE, replay_state['shard'], replay_state['shards'],
+                                  max_gap=REPLAY_MAX_GAP, stats=replay_state['skipped'])
+        for offset, host, method, path, name, body in entries:
+            due = clock + offset / REPLAY_SPEED
+            delay = due - time.monotonic()
+            if delay > 0:
+                gevent.sleep(delay)
+            if self.in_flight.full():
+                self.environment.events.request.fire(
+                    request_type="REPLAY",
+                    name="replay dropped (max in-flight)",
+                    response_time=0,
+                    response_length=0,
+                    exception=RuntimeError(f"{REPLAY_MAX_IN_FLIGHT} requests already in flight"),
+                    context={},
+                )
+            else:
+                self.in_flight.spawn(self._send, due, method, host, fill_path_placeholders(path), name, body)
+        self.in_flight.join()
+        logger.info(f"Replay of shard {replay_state['shard']} finished; skipped lines: {replay_state['skipped']}")
+        self.environment.runner.send_message(REPLAY_DONE_MESSAGE, replay_state['shard'])
+        while True:
+            gevent.sleep(60)  # Idle until ReplayShape ends the run
+
+    def replay_headers(self, path) -> Dict[str, str]:
+        """Headers for one replayed request, built fresh; public routes get no Authorization"""
+        headers = {"Content-Type": "application/json"}
+        if not REPLAY_PUBLIC_ROUTES.match(path):
+            token = self.token
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    def _send(self, due, method, host, path, name, body):
+        try:
+            with self.client.request(method, host + path, name=name, data=body, headers=self.replay_headers(path),
+                                     catch_response=True) as response:
+                response.request_meta["response_time"] = (time.monotonic() - due) * 1000
+        except RequestException as e:
+            metrics.errors.record(name, 0, str(e))
+
+class ReplayShape(LoadTestShape):
+    """One ReplayUser per worker (or locally) until every shard of the log is replayed"""
+    abstract = LOAD_MODEL != "replay"
+
+    def tick(self):
+        shards = replay_state['shards']
+        if replay_state['done'] >= shards:
+            return None
+        return (shards, shards, [ReplayUser])
+
+class GeneratorProfiler:
+    """Where the load generator spends its own time.
+
+    A native (not monkey-patched) thread samples the main thread's Python
+    stack with ``sys._current_frames`` and counts each distinct stack. Under
+    gevent every greenlet runs on the main thread, so the samples show
+    listeners, rendering, encoding and the hub's own scheduling together.
+    Stacks are written in the folded format (``root;...;leaf count``).
+
+    This module's request listeners and the task methods are wrapped with
+    timers, and ``uninstrument`` puts the originals back. Tasks get both wall
+    time and on-CPU time: a greenlet switch tracer charges the time between
+    switches to the greenlet that was running, so waiting on the network isn't
+    counted as generator work.
+    """
+
+    def __init__(self, hz=97.0, delay=10.0, seconds=30.0, directory="."):
+        self.interval = 1.0 / hz
+        self.delay = delay
+        self.seconds = seconds
+        self.directory = directory
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.timings: Dict[str, List[float]] = {}  # label -> [calls, wall s, cpu s, max wall s]
+        self._main_thread = None
+        self._running = False
+        self._sleep = monkey.get_original('time', 'sleep')
+        self._switched_at = time.perf_counter()
+        self._previous_tracer = None
+        self._written = False
+        self._listeners = []  # (hook, original, timed)
+        self._task_lists = {}  # TaskSet class -> its original tasks
+
+    def start(self):
+        self._main_thread = monkey.get_original('_thread', 'get_ident')()
+        self._running = True
+        self._previous_tracer = greenlet.settrace(self._trace_switch)
+        monkey.get_original('_thread', 'start_new_thread')(self._sample_loop, ())
+        logger.info(f"Profiling: sampling {1 / self.interval:.0f} Hz for {self.seconds:g}s after {self.delay:g}s")
+
+    def stop(self):
+        self._running = False
+        greenlet.settrace(self._previous_tracer)
+
+    def _trace_switch(self, event, args):
+        if event in ('switch', 'throw'):
+            now = time.perf_counter()
+            origin = args[0]
+            try:
+                origin.loadtest_cpu = getattr(origin, 'loadtest_cpu', 0.0) + (now - self._switched_at)
+            except AttributeError:
+                pass  # Some greenlet types don't take attributes; they just go unaccounted
+            self._switched_at = now
+        if self._previous_tracer:
+            self._previous_tracer(event, args)
+
+    def cpu_time(self):
+        """On-CPU seconds of the current greenlet, including the slice in progress"""
+        current = greenlet.getcurrent()
+        return getattr(current, 'loadtest_cpu', 0.0) + (time.perf_counter() - self._switched_at)
+
+    @staticmethod
+    def _frame_label(code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample_loop(self):
+        self._sleep(self.delay)
+        ends = time.monotonic() + self.seconds
+        while self._running and time.monotonic() < ends:
+            started = time.perf_counter()
+            frame = sys._current_frames().get(self._main_thread)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+            spent = time.perf_counter() - started
+            self.sampling_seconds += spent
+            self._sleep(max(0.0, self.interval - spent))
+        self.write_profile()
+
+    def write_profile(self):
+        """Write the folded stacks once, when the window ends or the run stops inside it"""
+        if not self.stacks or self._written:
+            return None
+        self._written = True
+        path = os.path.join(self.directory, f"profile-{socket.gethostname()}-{os.getpid()}.folded")
+        with open(path, "w", encoding="utf-8") as profile_file:
+            for stack, count in sorted(self.stacks.items()):
+                profile_file.write(f"{stack} {count}\n")
+        logger.info(f"Profile written to {path} ({self.samples:,} samples, "
+                    f"{self.sampling_seconds / max(self.samples, 1) * 1e6:.0f}us per sample)")
+        return path
+
+    def _record(self, label, wall, cpu):
+        timing = self.timings.get(label)
+        if timing is None:
+            timing = self.timings[label] = [0, 0.0, 0.0, 0.0]
+        timing[0] += 1
+        timing[1] += wall
+        timing[2] += cpu
+        if wall > timing[3]:
+            timing[3] = wall
+
+    def time_listener(self, handler):
+        label = f"listener {getattr(handler, '__name__', repr(handler))}"
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                self._record(label, elapsed, elapsed)  # Listeners never yield
+        return timed
+
+    def time_task(self, owner, function):
+        label = f"task {owner.__name__}.{function.__name__}"
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            cpu_started = self.cpu_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._record(label, time.perf_counter() - started, self.cpu_time() - cpu_started)
+        timed.__name__ = function.__name__
+        return timed
+
+    def instrument(self, environment, listeners=()):
+        """Wrap ``listeners`` on the request hook and the task methods of every user class"""
+        hook = environment.events.request
+        for listener in listeners:
+            timed = self.time_listener(listener)
+            hook.remove_listener(listener)
+            hook.add_listener(timed)
+            self._listeners.append((hook, listener, timed))
+        for user_class in environment.user_classes:
+            for task_set in user_class.tasks:
+                if not (isinstance(task_set, type) and issubclass(task_set, TaskSet)) or task_set in self._task_lists:
+                    continue
+                self._task_lists[task_set] = task_set.tasks
+                # Wrap each function once so duplicated (weighted) entries keep their weights
+                timed = {}
+                task_set.tasks = [timed.setdefault(function, self.time_task(task_set, function))
+                                  if callable(function) and not isinstance(function, type) else function
+                                  for function in task_set.tasks]
+
+    def uninstrument(self):
+        """Put back the original listeners and task lists"""
+        for hook, listener, timed in self._listeners:
+            hook.remove_listener(timed)
+            hook.add_listener(listener)
+        self._listeners = []
+        for task_set, tasks in self._task_lists.items():
+            task_set.tasks = tasks
+        self._task_lists = {}
+
+    def print_report(self):
+        if not self.timings:
+            return
+        rows = []
+        for label, (calls, wall, cpu, max_wall) in sorted(self.timings.items(), key=lambda item: -item[1][2]):
+            rows.append([label, f"{calls:,}", f"{wall / calls * 1e6:,.0f}us", f"{cpu / calls * 1e6:,.0f}us",
+                         f"{max_wall * 1e3:,.1f}ms", f"{cpu:,.2f}s"])
+        print(tabulate(rows, headers=["Hook", "Calls", "Mean Wall", "Mean CPU", "Max Wall", "Total CPU"], tablefmt="grid"))
+
+profiler = GeneratorProfiler(
+    hz=PROFILE_HZ, delay=PROFILE_DELAY, seconds=PROFILE_SECONDS, directory=PROFILE_DIR,
+) if PROFILE_ENABLED else None
+
 
 @events.init.add_listener
 def on_locust_init(environment, **kwargs):
     logger.info("\nTest Configuration:")
     logger.info(f"User Service URL: {UserServiceUser.host}")
     logger.info(f"Email Service URL: {EmailServiceUser.host}")
-    metrics.start()
+    logger.info(f"Skills Service URL: {SkillsServiceUser.host}")
+    logger.info(f"Learning Service URL: {LearningServiceUser.host}")
+    logger.info(f"Integration Service URL: {INTEGRATION_SERVICE_HOST}")
+    logger.info(f"HTTP client: {'FastHttpUser' if HTTP_CLIENT == 'fast' else 'HttpUser'}")
+    if LOAD_MODEL == "open":
+        logger.info(f"Open load model: {OPEN_PROFILE} profile, {OPEN_RATE:g} arrivals/s, {OPEN_DISPATCHERS} dispatchers")
+    elif LOAD_MODEL == "replay":
+        logger.info(f"Replay of {REPLAY_FILE} at {REPLAY_SPEED:g}x, methods {', '.join(sorted(REPLAY_METHODS))}")
+    elif LOAD_MODEL == "capacity":
+        logger.info(f"Capacity search: {CAPACITY_STRATEGY}, SLO p99 <= {CAPACITY_SLO_P99_MS:g}ms, "
+                    f"errors <= {CAPACITY_SLO_ERROR_RATE * 100:g}%")
+    if isinstance(environment.runner, WorkerRunner):
+        environment.runner.register_message(SEED_MESSAGE, lambda environment, msg, **kwargs: publish_seed(msg.data))
+        environment.runner.register_message(REPLAY_MESSAGE, lambda environment, msg, **kwargs: assign_replay_shard(msg.data))
+    else:
+        environment.runner.register_message(
+            REPLAY_DONE_MESSAGE, lambda environment, msg, **kwargs: replay_state.update(done=replay_state['done'] + 1))
+        if SEED_ENABLED:
+            seed_before_start(environment)
+        if email_sink:
+            email_sink.start(environment)
+    if profiler:
+        profiler.instrument(environment, listeners=[on_request])
+        profiler.start()
+    # Workers report to the master instead of drawing their own dashboard
+    metrics.start(render=not isinstance(environment.runner, WorkerRunner))
+
+def seed_before_start(environment):
+    """Seed from init, before the runner can start, and exit with code 1 if seeding fails.
+
+    Seeding runs once per process start, not per test: the web UI's later
+    runs reuse the seeded data.
+    """
+    try:
+        seed_result.update(run_seed())
+    except (RuntimeError, RequestException, ValueError) as e:
+        logger.error(f"Seeding failed: {str(e)}")
+        environment.process_exit_code = 1
+        environment.runner.quit()  # Also tells any connected workers to quit
+        sys.exit(1)
+    publish_seed(seed_result)
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    # Workers connect after init, so the master hands them the seed here, before spawning
+    if seed_result and isinstance(environment.runner, MasterRunner):
+        environment.runner.send_message(SEED_MESSAGE, seed_result)
+    if LOAD_MODEL == "replay" and not isinstance(environment.runner, WorkerRunner):
+        # Shards go out before spawning, with one start time so every worker shares the timeline
+        start = time.time() + REPLAY_START_DELAY
+        if isinstance(environment.runner, MasterRunner):
+            workers = [*environment.runner.clients.ready, *environment.runner.clients.spawning,
+                       *environment.runner.clients.running]
+            for index, worker in enumerate(workers):
+                environment.runner.send_message(
+                    REPLAY_MESSAGE, {'shard': index, 'shards': len(workers), 'start': start}, client_id=worker.id)
+            replay_state.update(shards=max(len(workers), 1), done=0)
+        else:
+            assign_replay_shard({'shard': 0, 'shards': 1, 'start': start})
+            replay_state['done'] = 0
+    open_model_clock['started'] = time.monotonic()
+    metrics.start_time = time.time()
 
 @events.request.add_listener
 def on_request(request_type, name, response_time, response_length, exception, **kwargs):
     try:
-        metrics.total_requests += 1
-        if exception:
-            metrics.failed_requests += 1
+        metrics.request_counters.increment(name, exception is not None, response_length or 0)
         if response_time is not None:
-            metrics.response_times.append(response_time)
-        
-        # Update TPS
-        metrics.system_metrics.update_tps(metrics.total_requests)
-
-        # Update live metrics every 5 requests
-        if metrics.total_requests % 5 == 0:
-            metrics.print_live_metrics()
+            metrics.record_response_time(name, response_time)
+        if exception is not None:
+            response = kwargs.get('response')
+            metrics.errors.record(name, getattr(response, 'status_code', None) or 0, str(exception))
     except Exception as e:
         logging.error(f"Error in request event handler: {str(e)}")
         
         
+@events.report_to_master.add_listener
+def on_report_to_master(client_id, data, **kwargs):
+    try:
+        data[METRICS_REPORT_KEY] = metrics.drain_report()
+    except Exception as e:
+        logging.error(f"Error building worker metrics report: {str(e)}")
+
+@events.worker_report.add_listener
+def on_worker_report(client_id, data, **kwargs):
+    try:
+        if METRICS_REPORT_KEY in data:
+            metrics.merge_report(client_id, data[METRICS_REPORT_KEY])
+    except Exception as e:
+        logging.error(f"Error merging metrics from worker {client_id}: {str(e)}")
+
 @events.quitting.add_listener
 def on_locust_quit(environment, **kwargs):
+    token_pools.stop()
     metrics.stop()
+    if profiler:
+        profiler.stop()
+        profiler.uninstrument()
+        profiler.write_profile()
+        profiler.print_report()
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    # After the final dashboard, which clears the screen
+    if email_sink:
+        email_sink.stop()
+        delivery = email_sink.summary(metrics.request_counters.cumulative())
+        logger.info(f"Email delivery: {delivery['delivered']} of {delivery['accepted']} accepted notifications "
+                    f"delivered ({delivery['undelivered']} outstanding), {delivery['delivery_rate']:.1f}/s")
+    if SUMMARY_FILE or BASELINE_FILE:
+        summary = metrics.summary(environment)
+        if SUMMARY_FILE:
+            with open(SUMMARY_FILE, "w", encoding="utf-8") as summary_file:
+                json.dump(summary, summary_file)
+            logger.info(f"Run summary written to {SUMMARY_FILE}")
+        if BASELINE_FILE:
+            rows, regressed = compare_summaries(
+                summary, load_summary(BASELINE_FILE), tolerance=REGRESSION_TOLERANCE, abs_ms=REGRESSION_ABS_MS,
+                percentiles=REGRESSION_PERCENTILES, min_samples=REGRESSION_MIN_SAMPLES,
+            )
+            print_comparison(rows, regressed)
+            if regressed:
+                environment.process_exit_code = 1
+    if capacity_search and capacity_search.steps:
+        capacity_search.write_report(CAPACITY_REPORT_FILE)
 
 def setup_test_data():
     """Create initial test user if needed"""
@@ -589,5 +4263,440 @@ def setup_test_data():
     except Exception as e:
         logger.error(f"Error setting up test data: {str(e)}")
 
+    if SEED_ENABLED:
+        try:
+            run_seed()
+        except (RuntimeError, RequestException, ValueError) as e:
+            logger.error(f"Seeding failed: {str(e)}")
+
+def benchmark_request_listener(iterations=200_000):
+    """Measure the per-request cost of the on_request listener and of a dashboard frame"""
+    endpoint_names = ["get_profile", "register", "workflow_success", "workflow_error"]
+    response_times = [random.lognormvariate(3, 1) for _ in range(1024)]
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        on_request("GET", endpoint_names[i & 3], response_times[i & 1023], 512, None)
+    listener_ns = (time.perf_counter() - started) / iterations * 1e9
+
+    frames = 20
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        started = time.perf_counter()
+        for _ in range(frames):
+            metrics.print_live_metrics(metrics.snapshot())
+        frame_ms = (time.perf_counter() - started) / frames * 1e3
+    finally:
+        sys.stdout = stdout
+
+    # The previous listener rendered a frame inline every 5 requests
+    inline_render_ns = listener_ns + frame_ms * 1e6 / 5
+    print(tabulate([
+        ["on_request listener", f"{listener_ns:,.0f} ns/request"],
+        ["Dashboard frame", f"{frame_ms:,.2f} ms/frame"],
+        ["Inline render every 5 requests (previous)", f"{inline_render_ns:,.0f} ns/request"],
+        ["Max listener throughput (one core)", f"{1e9 / listener_ns:,.0f} requests/s"],
+    ], headers=["Measurement", "Result"], tablefmt="grid"))
+
+def benchmark_request_templates(iterations=100_000):
+    """Per-request CPU of building headers and bodies, before and after request templates"""
+    from requests import Request
+
+    token = "x" * 180  # About the size of a real JWT
+    session = Session()
+
+    def legacy_headers():
+        return {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "X-Request-ID": f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{random.randint(1000, 9999)}"
+        }
+
+    def legacy_body():
+        return {
+            "workflowName": f"workflow-{random.randint(1, 100)}",
+            "timestamp": datetime.now().isoformat(),
+            "errorDetails": f"Test error {random.randint(1000, 9999)}"
+        }
+
+    authorization = f"Bearer {token}"
+
+    def template_headers():
+        return {"Authorization": authorization, "Content-Type": "application/json", "X-Request-ID": next_request_id()}
+
+    def template_body():
+        return WORKFLOW_ERROR_TEMPLATE.render(
+            workflow=WORKFLOW_NAMES[random.randrange(100)],
+            timestamp=coarse_clock.isoformat_json(),
+            error=f'"Test error {random.randrange(1000, 10000)}"'.encode(),
+        )
+
+    def measure(build):
+        started = time.process_time()
+        for _ in range(iterations):
+            build()
+        return (time.process_time() - started) / iterations * 1e9
+
+    url = f"{EMAIL_SERVICE_HOST}/email/send-error"
+    results = [
+        ("Headers", measure(legacy_headers), measure(template_headers)),
+        ("Body", measure(lambda: json.dumps(legacy_body())), measure(template_body)),
+        # What requests does before sending: merge headers, encode the body
+        ("Prepared request", measure(lambda: session.prepare_request(Request("POST", url, headers=legacy_headers(), json=legacy_body()))),
+         measure(lambda: session.prepare_request(Request("POST", url, headers=template_headers(), data=template_body())))),
+    ]
+    print(tabulate([
+        [name, f"{before:,.0f} ns", f"{after:,.0f} ns", f"{before - after:,.0f} ns", f"{before / after:.1f}x"]
+        for name, before, after in results
+    ], headers=["Per request", "Previous", "Templates", "Saved", "Speed-up"], tablefmt="grid"))
+    before, after = results[-1][1], results[-1][2]
+    print(f"Request preparation alone caps one core at {1e9 / before:,.0f} req/s before, {1e9 / after:,.0f} req/s after")
+
+def benchmark_http_clients(users=50, duration=15.0, warmup=3.0, taskset="user"):
+    """Drive the real task sets flat out on each HTTP client and report RPS per CPU core.
+
+    Users run with no wait time, so the process saturates one core; requests
+    per CPU-second of this process is then the sustainable RPS of one worker.
+    """
+    task_sets = {"user": (UserServiceTasks, USER_SERVICE_HOST), "email": (EmailServiceTasks, EMAIL_SERVICE_HOST)}
+    task_set, host = task_sets[taskset]
+    process = psutil.Process()
+    rows = []
+    for label, base in (("HttpUser", HttpUser), ("FastHttpUser", FastHttpUser)):
+        user_class = type(f"Benchmark{label}", (PooledAuthMixin, base), {
+            "tasks": [task_set],
+            "host": host,
+            "wait_time": constant(0),
+            "concurrency": FAST_HTTP_CONCURRENCY,
+        })
+        environment = Environment(user_classes=[user_class], events=events)
+        runner = environment.create_local_runner()
+        runner.start(users, spawn_rate=users)
+        gevent.sleep(warmup)
+        environment.stats.reset_all()
+        cpu_before = sum(process.cpu_times()[:2])
+        started = time.monotonic()
+        gevent.sleep(duration)
+        elapsed = time.monotonic() - started
+        cpu_seconds = sum(process.cpu_times()[:2]) - cpu_before
+        total = environment.stats.total
+        runner.quit()
+        rows.append([
+            label,
+            f"{total.num_requests / elapsed:,.0f}",
+            f"{cpu_seconds / elapsed * 100:.0f}%",
+            f"{total.num_requests / max(cpu_seconds, 1e-9):,.0f}",
+            f"{total.get_response_time_percentile(0.5):.0f}ms",
+            f"{total.get_response_time_percentile(0.99):.0f}ms",
+            f"{total.fail_ratio * 100:.1f}%",
+        ])
+    print(tabulate(rows, headers=["Client", "RPS", "CPU", "RPS per core", "p50", "p99", "Failures"], tablefmt="grid"))
+
+def launch_local_cluster(workers=0, pin=False, locust_args=(), log_dir=""):
+    """Run this locustfile as a master plus one worker per core; returns the master's exit code.
+
+    Locust drives one core per process, so this is how a single command
+    uses the whole box. The master spreads users across the workers and,
+    through the metrics reports, merges their TestMetrics and SystemMetrics
+    into one dashboard and summary. With ``pin``, worker n is bound to the
+    n-th available core. Worker output goes to ``log_dir`` (one file per
+    worker) or is discarded.
+    """
+    import subprocess
+
+    process = psutil.Process()
+    can_pin = hasattr(process, "cpu_affinity")
+    cores = sorted(process.cpu_affinity()) if can_pin else list(range(os.cpu_count() or 1))
+    workers = workers or len(cores)
+    if pin and not can_pin:
+        logger.warning("CPU pinning is not supported on this platform; workers will float")
+        pin = False
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    command = [sys.executable, "-m", "locust", "-f", os.path.abspath(__file__)]
+    logger.info(f"Launching a master and {workers} workers{' pinned to cores' if pin else ''} on port {port}")
+
+    master = subprocess.Popen(command + [
+        "--master", "--master-bind-host", "127.0.0.1", "--master-bind-port", str(port),
+        "--expect-workers", str(workers), *locust_args,
+    ])
+    worker_processes = []
+    try:
+        for index in range(workers):
+            output = subprocess.DEVNULL
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+                output = open(os.path.join(log_dir, f"loadtest-worker-{index}.log"), "w", encoding="utf-8")
+            worker = subprocess.Popen(command + ["--worker", "--master-host", "127.0.0.1", "--master-port", str(port)],
+                                      stdout=output, stderr=subprocess.STDOUT)
+            if output is not subprocess.DEVNULL:
+                output.close()  # The worker holds its own handle
+            if pin:
+                psutil.Process(worker.pid).cpu_affinity([cores[index % len(cores)]])
+            worker_processes.append(worker)
+        try:
+            return master.wait()
+        except KeyboardInterrupt:
+            # The terminal sent SIGINT to the whole group; let the master write its summary
+            return master.wait()
+    finally:
+        if master.poll() is None:
+            master.terminate()
+            master.wait()
+        for worker in worker_processes:
+            if worker.poll() is None:
+                worker.terminate()
+        for worker in worker_processes:
+            try:
+                worker.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+
+def compare_summaries(current, baseline, tolerance=0.10, abs_ms=5.0, percentiles=("p95", "p99"),
+                      min_samples=100, z=1.96, endpoint_filter=None):
+    """Diff a run summary against a baseline summary.
+
+    A latency percentile regresses only when it is both slower than the
+    baseline by more than ``tolerance`` (relative) plus ``abs_ms`` and the
+    confidence intervals of the two runs don't overlap, so ordinary run-to-run
+    noise doesn't fail the gate. Error rates use a one-sided two-proportion
+    z-test, and throughput drops are checked against the Poisson noise of
+    the request counts. Endpoints with fewer than ``min_samples`` requests in
+    either run are reported but never gate.
+    Returns ``(rows, regressed)``.
+    """
+    rows = []
+    regressed = False
+    pattern = re.compile(endpoint_filter) if endpoint_filter else None
+    pairs = [("(all)", current['totals'], baseline['totals'])]
+    names = sorted(set(current['endpoints']) | set(baseline['endpoints']))
+    pairs.extend((name, current['endpoints'].get(name), baseline['endpoints'].get(name)) for name in names
+                 if not pattern or pattern.search(name))
+
+    for name, now, before in pairs:
+        if now is None or before is None:
+            rows.append([name, "-", "-", "-", "-", "new endpoint" if before is None else "missing from run"])
+            continue
+        if min(now['requests'], before['requests']) < min_samples:
+            rows.append([name, "requests", f"{before['requests']:,}", f"{now['requests']:,}", "-", f"under {min_samples} samples"])
+            continue
+
+        now_histogram = LatencyHistogram().merge_sparse(now['histogram'])
+        before_histogram = LatencyHistogram().merge_sparse(before['histogram'])
+        for label in percentiles:
+            quantile = float(f"0.{label[1:]}")  # p95 -> 0.95, p999 -> 0.999
+            now_value, before_value = now['latency'][label], before['latency'][label]
+            now_low, _ = now_histogram.percentile_interval(quantile, z)
+            _, before_high = before_histogram.percentile_interval(quantile, z)
+            failed = now_value > before_value * (1 + tolerance) + abs_ms and now_low > before_high
+            regressed |= failed
+            rows.append([name, label, f"{before_value:.1f}ms", f"{now_value:.1f}ms",
+                         f"{(now_value - before_value) / before_value * 100 if before_value else 0.0:+.1f}%",
+                         "REGRESSION" if failed else "ok"])
+
+        # One-sided two-proportion z-test on the error rates
+        pooled = (now['failures'] + before['failures']) / (now['requests'] + before['requests'])
+        stderr = (pooled * (1 - pooled) * (1 / now['requests'] + 1 / before['requests'])) ** 0.5
+        error_z = (now['error_rate'] - before['error_rate']) / stderr if stderr else 0.0
+        failed = now['error_rate'] > before['error_rate'] * (1 + tolerance) and error_z > z
+        regressed |= failed
+        rows.append([name, "errors", f"{before['error_rate'] * 100:.2f}%", f"{now['error_rate'] * 100:.2f}%",
+                     f"z={error_z:+.1f}", "REGRESSION" if failed else "ok"])
+
+        # Request counts are roughly Poisson, so each rate has variance count / duration**2
+        rate_stderr = (now['rps'] / max(current['duration'], 1e-9) + before['rps'] / max(baseline['duration'], 1e-9)) ** 0.5
+        rate_z = (before['rps'] - now['rps']) / rate_stderr if rate_stderr else 0.0
+        failed = now['rps'] < before['rps'] * (1 - tolerance) and rate_z > z
+        regressed |= failed
+        rows.append([name, "rps", f"{before['rps']:.1f}", f"{now['rps']:.1f}",
+                     f"{(now['rps'] - before['rps']) / before['rps'] * 100 if before['rps'] else 0.0:+.1f}%",
+                     "REGRESSION" if failed else "ok"])
+    return rows, regressed
+
+def print_comparison(rows, regressed):
+    colored = [row[:-1] + [f"{Fore.RED}{row[-1]}{Style.RESET_ALL}" if row[-1] == "REGRESSION" else row[-1]] for row in rows]
+    print(tabulate(colored, headers=["Endpoint", "Metric", "Baseline", "Current", "Change", "Result"], tablefmt="grid"))
+    if regressed:
+        print(f"{Fore.RED}Performance regression against baseline{Style.RESET_ALL}")
+    else:
+        print(f"{Fore.GREEN}No regression against baseline{Style.RESET_ALL}")
+
+def load_summary(path):
+    with open(path, encoding="utf-8") as summary_file:
+        return json.load(summary_file)
+
+def report_timeseries(paths, csv_path=None):
+    """Replay exported time series into a run report, streaming so file size doesn't matter"""
+    samples = 0
+    first_ts = last_ts = None
+    peaks = {}  # metric -> (value, ts)
+    lows = {}
+    sums = {}
+    endpoints: Dict[str, Dict] = {}
+    servers: Dict[str, Dict] = {}
+    spikes = []  # (client p99, ts, server samples) of the slowest seconds
+    csv_file = open(csv_path, "w", encoding="utf-8") if csv_path else None
+    if csv_file:
+        csv_file.write("ts,elapsed,cpu_total,memory_percent,memory_used_gb,swap_percent,network_in,network_out,disk_io_read,disk_io_write,tps,errors_per_sec\n")
+
+    try:
+        for record in read_timeseries(paths):
+            ts = record['ts']
+            first_ts = ts if first_ts is None else first_ts
+            last_ts = ts
+            samples += 1
+
+            for key in ('cpu_total', 'memory_percent', 'memory_used_gb', 'swap_percent', 'network_in',
+                        'network_out', 'disk_io_read', 'disk_io_write', 'tps', 'errors_per_sec'):
+                value = record.get(key)
+                if value is None:
+                    continue
+                sums[key] = sums.get(key, 0.0) + value
+                if key not in peaks or value > peaks[key][0]:
+                    peaks[key] = (value, ts)
+                if key not in lows or value < lows[key][0]:
+                    lows[key] = (value, ts)
+
+            for name, stats in record.get('endpoints', {}).items():
+                endpoint = endpoints.setdefault(name, {'requests': 0, 'errors': 0, 'worst_p95': (0.0, ts), 'worst_p99': (0.0, ts)})
+                endpoint['requests'] += stats['count']
+                endpoint['errors'] += stats['eps'] * record['interval']
+                if stats['p95'] > endpoint['worst_p95'][0]:
+                    endpoint['worst_p95'] = (stats['p95'], ts)
+                if stats['p99'] > endpoint['worst_p99'][0]:
+                    endpoint['worst_p99'] = (stats['p99'], ts)
+
+            for service, sample in record.get('server', {}).items():
+                server = servers.setdefault(service, {'scrapes': 0, 'last_scrape': None, 'errors': 0, 'peaks': {}})
+                if sample['ts'] == server['last_scrape']:
+                    continue  # The same scrape is attached to every sample until the next one
+                server['scrapes'] += 1
+                server['last_scrape'] = sample['ts']
+                if 'error' in sample:
+                    server['errors'] += 1
+                    continue
+                for key in ('event_loop_lag_ms', 'heap_used_mb', 'cpu_percent', 'rps', 'p99_ms'):
+                    value = sample.get(key)
+                    if value is not None and value > server['peaks'].get(key, (float('-inf'), ts))[0]:
+                        server['peaks'][key] = (value, sample['ts'])
+
+            client_p99 = max((stats['p99'] for stats in record.get('endpoints', {}).values()), default=None)
+            if client_p99 is not None and record.get('server'):
+                entry = (client_p99, ts, record['server'])
+                if len(spikes) < 5:
+                    spikes.append(entry)
+                elif client_p99 > min(spikes, key=lambda spike: spike[0])[0]:
+                    spikes.remove(min(spikes, key=lambda spike: spike[0]))
+                    spikes.append(entry)
+
+            if csv_file:
+                row = [f"{ts:.3f}", f"{ts - first_ts:.1f}"]
+                row.extend("" if record.get(key) is None else f"{record[key]:.3f}" for key in
+                           ('cpu_total', 'memory_percent', 'memory_used_gb', 'swap_percent', 'network_in',
+                            'network_out', 'disk_io_read', 'disk_io_write', 'tps', 'errors_per_sec'))
+                csv_file.write(",".join(row) + "\n")
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    if not samples:
+        print("No time series records found")
+        return
+
+    def at(ts):
+        return f"{ts - first_ts:+.0f}s"
+
+    print(f"Samples: {samples:,}  Duration: {last_ts - first_ts:.0f}s  "
+          f"Start: {datetime.fromtimestamp(first_ts).strftime('%Y-%m-%d %H:%M:%S')}")
+    print(tabulate([
+        [key, f"{sums[key] / samples:,.2f}", f"{lows[key][0]:,.2f} ({at(lows[key][1])})", f"{peaks[key][0]:,.2f} ({at(peaks[key][1])})"]
+        for key in sums
+    ], headers=["Metric", "Average", "Min (at)", "Max (at)"], tablefmt="grid"))
+    if endpoints:
+        print(tabulate([
+            [name, f"{endpoint['requests']:,}", f"{endpoint['errors']:,.0f}",
+             f"{endpoint['worst_p95'][0]:.1f}ms ({at(endpoint['worst_p95'][1])})",
+             f"{endpoint['worst_p99'][0]:.1f}ms ({at(endpoint['worst_p99'][1])})"]
+            for name, endpoint in sorted(endpoints.items())
+        ], headers=["Endpoint", "Requests", "Errors", "Worst 1s p95 (at)", "Worst 1s p99 (at)"], tablefmt="grid"))
+    if servers:
+        def peak(server, key, unit):
+            value = server['peaks'].get(key)
+            return "-" if value is None else f"{value[0]:,.1f}{unit} ({at(value[1])})"
+
+        print(tabulate([
+            [service, f"{server['scrapes']:,}", f"{server['errors']:,}",
+             peak(server, 'event_loop_lag_ms', 'ms'), peak(server, 'heap_used_mb', ' MB'),
+             peak(server, 'cpu_percent', '%'), peak(server, 'rps', ''), peak(server, 'p99_ms', 'ms')]
+            for service, server in sorted(servers.items())
+        ], headers=["Service", "Scrapes", "Failed", "Max Event Loop Lag", "Max Heap", "Max CPU", "Max RPS", "Max Server p99"], tablefmt="grid"))
+    if spikes:
+        # Client latency spikes next to what each service reported at the time: a spike the
+        # servers didn't see points at the client or the network.
+        def server_view(sample):
+            if 'error' in sample:
+                return "unreachable"
+            lag, p99 = sample.get('event_loop_lag_ms'), sample.get('p99_ms')
+            return (f"lag {'-' if lag is None else f'{lag:.0f}ms'}, "
+                    f"p99 {'-' if p99 is None else f'{p99:.0f}ms'}")
+
+        services = sorted(servers)
+        print(tabulate([
+            [at(ts), f"{client_p99:.1f}ms"] + [server_view(server[service]) if service in server else "-" for service in services]
+            for client_p99, ts, server in sorted(spikes, reverse=True)
+        ], headers=["Client Spike", "Client p99"] + services, tablefmt="grid"))
+
 if __name__ == "__main__":
-    setup_test_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Skills Base load test utilities")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("setup", help="Create the initial test user and, with LOADTEST_SEED=true, seed data (default)")
+    bench_listener_parser = subparsers.add_parser("bench-listener", help="Microbenchmark the request listener")
+    bench_listener_parser.add_argument("--iterations", type=int, default=200_000)
+    bench_templates_parser = subparsers.add_parser("bench-templates", help="Microbenchmark request header and body templates")
+    bench_templates_parser.add_argument("--iterations", type=int, default=100_000)
+    bench_clients_parser = subparsers.add_parser("bench-clients", help="Compare HttpUser and FastHttpUser throughput per core")
+    bench_clients_parser.add_argument("--users", type=int, default=50)
+    bench_clients_parser.add_argument("--duration", type=float, default=15.0)
+    bench_clients_parser.add_argument("--taskset", choices=["user", "email"], default="user")
+    launch_parser = subparsers.add_parser("launch", help="Run a master and one worker per core on this machine")
+    launch_parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: one per available core)")
+    launch_parser.add_argument("--pin", action="store_true", help="Pin each worker to its own core")
+    launch_parser.add_argument("--worker-logs", default="", help="Directory for per-worker log files (default: discard)")
+    launch_parser.add_argument("locust_args", nargs=argparse.REMAINDER, help="Arguments for the master, after --")
+    report_parser = subparsers.add_parser("report", help="Summarise exported metrics time series")
+    report_parser.add_argument("paths", nargs="+", help="Time series files or directories")
+    report_parser.add_argument("--csv", help="Also flatten the system metrics into this CSV file")
+    compare_parser = subparsers.add_parser("compare", help="Diff a run summary against a baseline; exits 1 on regression")
+    compare_parser.add_argument("current", help="Summary of the run under test")
+    compare_parser.add_argument("baseline", help="Summary of the baseline run")
+    compare_parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    compare_parser.add_argument("--abs-ms", type=float, default=REGRESSION_ABS_MS)
+    compare_parser.add_argument("--percentiles", default=",".join(REGRESSION_PERCENTILES))
+    compare_parser.add_argument("--min-samples", type=int, default=REGRESSION_MIN_SAMPLES)
+    compare_parser.add_argument("--endpoints", help="Only compare endpoints matching this regex")
+    args = parser.parse_args()
+
+    if args.command == "bench-listener":
+        benchmark_request_listener(args.iterations)
+    elif args.command == "bench-templates":
+        benchmark_request_templates(args.iterations)
+    elif args.command == "bench-clients":
+        benchmark_http_clients(args.users, args.duration, taskset=args.taskset)
+    elif args.command == "launch":
+        locust_args = args.locust_args[1:] if args.locust_args[:1] == ["--"] else args.locust_args
+        sys.exit(launch_local_cluster(args.workers, args.pin, locust_args, args.worker_logs))
+    elif args.command == "report":
+        report_timeseries(args.paths, args.csv)
+    elif args.command == "compare":
+        rows, regressed = compare_summaries(
+            load_summary(args.current), load_summary(args.baseline), tolerance=args.tolerance,
+            abs_ms=args.abs_ms, percentiles=[p.strip() for p in args.percentiles.split(",") if p.strip()],
+            min_samples=args.min_samples, endpoint_filter=args.endpoints,
+        )
+        print_comparison(rows, regressed)
+        sys.exit(1 if regressed else 0)
+    else:
+        setup_test_data()
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""Tests for iter_bulk_payload, the streamed body of the bulk write scenario"""
+import json
+import random
+
+import pytest
+
+from locustfile import BULK_ID_SPACE, BULK_WRITE_TARGETS, iter_bulk_payload
+
+
+def body_of(target, batch_size, first_doc=0, chunk_docs=200, seed=1):
+    chunks = list(iter_bulk_payload(target, batch_size, first_doc, random.Random(seed), chunk_docs=chunk_docs))
+    return chunks, json.loads(b"".join(chunks))
+
+
+@pytest.mark.parametrize("target", sorted(BULK_WRITE_TARGETS))
+def test_body_is_one_json_document(target):
+    _, body = body_of(target, 450)
+    assert len(body["data"]) == 450
+    assert {key: value for key, value in body.items() if key != "data"} == BULK_WRITE_TARGETS[target][2]
+
+
+def test_documents_are_encoded_a_chunk_at_a_time():
+    chunks, body = body_of("technical", 450, chunk_docs=200)
+    # Head, three chunks of documents (200, 200, 50) and the closing brackets
+    assert len(chunks) == 5
+    assert [chunk.count(b'"docId"') for chunk in chunks] == [0, 200, 200, 50, 0]
+    assert len({doc["docId"] for doc in body["data"]}) == 450
+
+
+def test_document_ids_wrap_around_the_id_space():
+    _, body = body_of("soft", 3, first_doc=BULK_ID_SPACE - 2)
+    assert [doc["docId"] for doc in body["data"]] == [
+        f"loadtest-soft-doc-{BULK_ID_SPACE - 1}", f"loadtest-soft-doc-{BULK_ID_SPACE}", "loadtest-soft-doc-1",
+    ]
+
+
+def test_empty_batch():
+    assert body_of("assessments", 0)[1] == {"assessmentType": "self", "data": []}
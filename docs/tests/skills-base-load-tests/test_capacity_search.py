@@ -0,0 +1,107 @@
+"""Tests for CapacitySearch: step and bisection strategies over a simulated service"""
+import pytest
+
+import locustfile
+from locustfile import CapacitySearch
+
+
+def search(strategy="step", **options):
+    options = {'start_users': 10, 'step_users': 10, 'max_users': 1000, 'spawn_rate': 1000.0, 'warmup': 2.0,
+               'min_hold': 10.0, 'max_hold': 60.0, 'slo_p99_ms': 500.0, 'slo_error_rate': 0.01, **options}
+    return CapacitySearch(locustfile.TestMetrics(), strategy=strategy, **options)
+
+
+def run(capacity, capacity_users, seconds=20000):
+    """Drive the search once a second against a service that slows down past ``capacity_users``"""
+    metrics = capacity.metrics
+    users = capacity.tick(0)
+    for run_time in range(1, seconds):
+        metrics.request_counters.add("get_profile", users * 2, 0, 0)
+        for _ in range(5):
+            metrics.record_response_time("get_profile", 100.0 if users <= capacity_users else 900.0)
+        users = capacity.tick(run_time)
+        if users is None:
+            return capacity.result()
+    raise AssertionError("capacity search never finished")
+
+
+class TestStrategies:
+    def test_step_stops_at_the_first_failing_step(self):
+        result = run(search("step"), capacity_users=55)
+        assert [step['users'] for step in result['steps']] == [10, 20, 30, 40, 50, 60]
+        assert [step['passed'] for step in result['steps']] == [True] * 5 + [False]
+        assert result['max_users'] == 50
+        assert result['max_rps'] == pytest.approx(100.0)
+        assert result['endpoints']['get_profile']['users'] == 50
+
+    def test_bisect_doubles_then_narrows_to_the_step_size(self):
+        result = run(search("bisect", step_users=5), capacity_users=57)
+        assert [step['users'] for step in result['steps']] == [10, 20, 40, 80, 60, 50, 55]
+        assert result['max_users'] == 55
+        assert not result['limited_by_max_users']
+
+    def test_search_never_goes_past_max_users(self):
+        result = run(search("bisect", max_users=70), capacity_users=1000)
+        assert [step['users'] for step in result['steps']] == [10, 20, 40, 70]
+        assert result['limited_by_max_users']
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            search("random")
+
+
+class TestNextUsers:
+    def test_bisection_bounds(self):
+        capacity = search("bisect", step_users=25)
+        capacity._users = 400
+        assert capacity._next_users(False) == 200
+        capacity._users = 200
+        assert capacity._next_users(True) == 300
+        capacity._users = 300
+        assert capacity._next_users(False) == 250
+        capacity._users = 250
+        assert capacity._next_users(True) == 275
+        capacity._users = 275
+        assert capacity._next_users(True) is None  # 275 passes and 300 fails: one step apart
+
+    def test_step_stops_at_max_users(self):
+        capacity = search("step", max_users=25)
+        capacity._users = 20
+        assert capacity._next_users(True) == 25
+        capacity._users = 25
+        assert capacity._next_users(True) is None
+
+
+class TestSettled:
+    def test_needs_two_windows(self):
+        capacity = search()
+        capacity._settle_marks = [(0.0, 0), (10.0, 1000)]
+        assert not capacity._settled()
+
+    def test_steady_throughput_is_settled(self):
+        capacity = search(settle_tolerance=0.05)
+        capacity._settle_marks = [(0.0, 0), (10.0, 1000), (20.0, 2030)]
+        assert capacity._settled()
+
+    def test_climbing_throughput_is_not(self):
+        capacity = search(settle_tolerance=0.05)
+        capacity._settle_marks = [(0.0, 0), (10.0, 1000), (20.0, 2200)]
+        assert not capacity._settled()
+
+    def test_a_step_holds_until_settled_or_max_hold(self):
+        capacity = search(min_hold=10.0, max_hold=40.0)
+        metrics = capacity.metrics
+        rate = 10
+        for run_time in range(0, 100):
+            if capacity.tick(run_time) != 10:
+                break
+            rate += 5  # Throughput keeps climbing, so the step never settles
+            metrics.request_counters.add("get_profile", rate, 0, 0)
+            metrics.record_response_time("get_profile", 100.0)
+        assert capacity.steps[0]['seconds'] == pytest.approx(40.0)
+
+
+def test_a_step_without_traffic_does_not_pass():
+    capacity = search()
+    capacity._baseline = capacity._capture()
+    assert not capacity._evaluate(30.0)['passed']
@@ -0,0 +1,95 @@
+"""Tests for compare_summaries, the baseline regression gate"""
+import json
+import random
+
+from locustfile import LatencyHistogram, compare_summaries, load_summary
+
+
+def histogram_of(values):
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    return histogram
+
+
+def run_summary(latencies, failures=0, duration=60.0):
+    """A summary shaped like TestMetrics.summary(), with one endpoint"""
+    histogram = histogram_of(latencies)
+    percentiles = histogram.percentiles()
+    stats = {
+        'requests': histogram.count,
+        'failures': failures,
+        'error_rate': failures / histogram.count,
+        'rps': histogram.count / duration,
+        'latency': {'p50': percentiles[0.50], 'p95': percentiles[0.95], 'p99': percentiles[0.99]},
+        'histogram': histogram.to_sparse(),
+    }
+    return {'duration': duration, 'totals': stats, 'endpoints': {'get_profile': dict(stats)}}
+
+
+class TestCompareSummaries:
+    def test_identical_runs_do_not_regress(self):
+        latencies = [random.Random(1).uniform(50, 150) for _ in range(1000)]
+        rows, regressed = compare_summaries(run_summary(latencies), run_summary(latencies))
+        assert not regressed
+        assert {row[-1] for row in rows} == {"ok"}
+
+    def test_slower_run_regresses(self):
+        rng = random.Random(2)
+        baseline = run_summary([rng.uniform(50, 150) for _ in range(1000)])
+        current = run_summary([rng.uniform(150, 300) for _ in range(1000)])
+        rows, regressed = compare_summaries(current, baseline)
+        assert regressed
+        assert ["get_profile", "p95"] in [row[:2] for row in rows if row[-1] == "REGRESSION"]
+
+    def test_small_relative_changes_stay_within_tolerance(self):
+        rng = random.Random(3)
+        latencies = [rng.uniform(50, 150) for _ in range(1000)]
+        _, regressed = compare_summaries(run_summary([value * 1.05 for value in latencies]), run_summary(latencies))
+        assert not regressed
+
+    def test_higher_error_rate_regresses(self):
+        latencies = [100.0] * 1000
+        rows, regressed = compare_summaries(run_summary(latencies, failures=100), run_summary(latencies, failures=5))
+        assert regressed
+        assert ["(all)", "errors"] in [row[:2] for row in rows if row[-1] == "REGRESSION"]
+
+    def test_endpoints_under_min_samples_never_gate(self):
+        rng = random.Random(4)
+        baseline = run_summary([rng.uniform(10, 20) for _ in range(50)])
+        current = run_summary([rng.uniform(500, 900) for _ in range(50)])
+        rows, regressed = compare_summaries(current, baseline)
+        assert not regressed
+        assert rows[0][-1] == "under 100 samples"
+
+    def test_new_and_missing_endpoints_are_reported(self):
+        latencies = [100.0] * 200
+        current, baseline = run_summary(latencies), run_summary(latencies)
+        current['endpoints']['register'] = current['endpoints'].pop('get_profile')
+        rows, _ = compare_summaries(current, baseline)
+        assert [row[0] for row in rows if row[-1] == "missing from run"] == ["get_profile"]
+        assert [row[0] for row in rows if row[-1] == "new endpoint"] == ["register"]
+
+    def test_endpoint_filter(self):
+        latencies = [100.0] * 200
+        rows, _ = compare_summaries(run_summary(latencies), run_summary(latencies), endpoint_filter="^register$")
+        assert {row[0] for row in rows} == {"(all)"}
+
+    def test_throughput_drop_regresses(self):
+        latencies = [100.0] * 6000
+        rows, regressed = compare_summaries(run_summary(latencies, duration=120.0), run_summary(latencies, duration=60.0))
+        assert regressed
+        assert ["(all)", "rps"] in [row[:2] for row in rows if row[-1] == "REGRESSION"]
+
+    def test_throughput_within_poisson_noise_does_not_regress(self):
+        latencies = [100.0] * 200
+        _, regressed = compare_summaries(run_summary(latencies[:170]), run_summary(latencies))
+        assert not regressed
+
+    def test_summaries_round_trip_through_json(self, tmp_path):
+        latencies = [random.Random(5).uniform(50, 150) for _ in range(500)]
+        path = tmp_path / "baseline.json"
+        path.write_text(json.dumps(run_summary(latencies)), encoding="utf-8")
+        rows, regressed = compare_summaries(run_summary(latencies), load_summary(str(path)))
+        assert not regressed
+        assert {row[-1] for row in rows} == {"ok"}
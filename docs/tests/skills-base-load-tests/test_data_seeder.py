@@ -0,0 +1,73 @@
+"""Tests for DataSeeder waves, checkpointing and resume"""
+import json
+
+import pytest
+
+from locustfile import DataSeeder
+
+
+def seeder(checkpoint, fail_at=None, **counts):
+    """A seeder whose stages only record the batches they were asked to create"""
+    options = {'users': 0, 'employees': 0, 'taxonomy_docs': 0, 'assessments': 0, **counts}
+    instance = DataSeeder(concurrency=2, batch_size=10, checkpoint_file=str(checkpoint), max_attempts=1, **options)
+    instance.calls = []
+
+    def create(first, count):
+        instance.calls.append((first, count))
+        return 400 if first == fail_at else 201
+
+    instance._register_users = instance._sync_employees = create
+    instance._upsert_taxonomy = instance._upsert_assessments = create
+    instance._login_admin = lambda: True
+    return instance
+
+
+def test_batches_cover_every_item_in_waves(tmp_path):
+    instance = seeder(tmp_path / "seed.json", employees=45)
+    instance.run()
+    assert sorted(instance.calls) == [(0, 10), (10, 10), (20, 10), (30, 10), (40, 5)]
+    assert instance.progress == {'employees': 45}
+
+
+def test_failure_checkpoints_the_completed_waves_and_resumes_after_them(tmp_path):
+    checkpoint = tmp_path / "seed.json"
+    with pytest.raises(RuntimeError, match="resume from item 21"):
+        seeder(checkpoint, fail_at=30, employees=60).run()
+    assert json.loads(checkpoint.read_text())['progress'] == {'employees': 20}
+
+    resumed = seeder(checkpoint, employees=60)
+    resumed.run()
+    assert min(resumed.calls)[0] == 20
+    assert resumed.progress == {'employees': 60}
+
+
+def test_finished_stages_are_skipped(tmp_path):
+    checkpoint = tmp_path / "seed.json"
+    seeder(checkpoint, users=5, employees=20).run()
+    rerun = seeder(checkpoint, users=5, employees=20)
+    result = rerun.run()
+    assert rerun.calls == []
+    assert result['accounts'][0]['role'] == "staff"
+    assert len(result['catalog']['employee_emails']) == 20
+
+
+def test_checkpoint_for_another_target_is_ignored(tmp_path):
+    checkpoint = tmp_path / "seed.json"
+    checkpoint.write_text(json.dumps({'fingerprint': {'user_service': "http://elsewhere"}, 'progress': {'employees': 20}}))
+    instance = seeder(checkpoint, employees=20)
+    assert instance.progress == {}
+    instance.run()
+    assert len(instance.calls) == 2
+
+
+def test_unreadable_checkpoint_is_ignored(tmp_path):
+    checkpoint = tmp_path / "seed.json"
+    checkpoint.write_text("{truncated")
+    assert seeder(checkpoint, employees=20).progress == {}
+
+
+def test_stages_other_than_users_need_an_admin_login(tmp_path):
+    instance = seeder(tmp_path / "seed.json", employees=20)
+    instance._login_admin = lambda: False
+    with pytest.raises(RuntimeError, match="admin login"):
+        instance.run()
@@ -0,0 +1,72 @@
+"""Tests for ErrorTaxonomy: message fingerprints, group limits and sampled logging"""
+import logging
+
+import pytest
+
+from locustfile import ErrorTaxonomy
+
+
+class TestFingerprint:
+    @pytest.mark.parametrize("message, fingerprint", [
+        ("User 4711 not found", "User <n> not found"),
+        ("Employee 3f2a1c9e-8b7d-4e6f-a5b4-c3d2e1f0a9b8 missing", "Employee <uuid> missing"),
+        ("Duplicate key: jane.doe+lt@example.com", "Duplicate key: <email>"),
+        ("Cast to ObjectId failed for 65a1f0c2e4b0a1b2c3d4e5f6", "Cast to ObjectId failed for <hex>"),
+        ("Read timed out. (read timeout=2.5)", "Read timed out. (read timeout=<n>)"),
+        ("  Too   many\n requests  ", "Too many requests"),
+    ])
+    def test_variable_parts_are_masked(self, message, fingerprint):
+        assert ErrorTaxonomy().fingerprint(message) == fingerprint
+
+    def test_long_messages_are_truncated(self):
+        assert len(ErrorTaxonomy().fingerprint("x" * 1000)) == 160
+
+
+class TestGroups:
+    def test_one_failure_mode_is_one_group(self):
+        errors = ErrorTaxonomy()
+        for user in range(50):
+            errors.record("get_profile", 404, f"User {user} not found", log=False)
+        errors.record("get_profile", 500, "User 1 not found", log=False)
+        errors.record("register", 404, "User 1 not found", log=False)
+        rows = errors.rows()
+        assert [(row['endpoint'], row['status'], row['count']) for row in rows] == [
+            ("get_profile", 404, 50), ("get_profile", 500, 1), ("register", 404, 1),
+        ]
+        assert rows[0]['sample'] == "User 0 not found"
+
+    def test_groups_past_the_limit_fold_into_other_messages(self):
+        errors = ErrorTaxonomy(max_groups=2)
+        for message in ("timeout", "reset", "refused", "refused", "unreachable"):
+            errors.record("get_profile", 0, message, log=False)
+        counts = {row['fingerprint']: row['count'] for row in errors.rows()}
+        assert counts == {"timeout": 1, "reset": 1, "(other messages)": 3}
+
+    def test_drain_returns_only_counts_since_the_last_drain(self):
+        errors = ErrorTaxonomy()
+        errors.record("get_profile", 500, "boom", count=3, log=False)
+        assert errors.drain() == [["get_profile", 500, "boom", 3, "boom"]]
+        assert errors.drain() == []
+        assert errors.rows()[0]['count'] == 3
+
+
+class TestSampledLogging:
+    def test_repeats_are_rate_limited_and_counted(self, caplog):
+        errors = ErrorTaxonomy(log_rate=0.0, log_burst=2)
+        with caplog.at_level(logging.ERROR):
+            for user in range(10):
+                errors.record("get_profile", 404, f"User {user} not found")
+            errors.record("register", 500, "boom")
+        lines = [record.getMessage() for record in caplog.records]
+        # The first failure, two more from the bucket, then the next new group carries the dropped count
+        assert len(lines) == 4
+        assert lines[0].startswith("New failure: get_profile - status 404")
+        assert lines[-1].startswith("New failure: register - status 500 - boom")
+        assert lines[-1].endswith("(7 similar failures not logged)")
+
+    def test_every_new_group_is_logged(self, caplog):
+        errors = ErrorTaxonomy(log_rate=0.0, log_burst=0)
+        with caplog.at_level(logging.ERROR):
+            for status in (500, 502, 503):
+                errors.record("get_profile", status, "upstream error")
+        assert len(caplog.records) == 3
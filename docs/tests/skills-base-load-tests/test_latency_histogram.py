@@ -0,0 +1,71 @@
+"""Tests for LatencyHistogram. Run the suite with ``python -m pytest`` from this directory"""
+import json
+import random
+
+import pytest
+
+from locustfile import LatencyHistogram
+
+
+def histogram_of(values):
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    return histogram
+
+
+class TestLatencyHistogram:
+    def test_percentiles_stay_within_the_bucket_error(self):
+        rng = random.Random(7)
+        values = sorted(rng.uniform(0.5, 5000) for _ in range(20000))
+        histogram = histogram_of(values)
+        max_error = 1 / 2 ** (histogram.sub_bucket_bits - 1)
+        for quantile, value in histogram.percentiles().items():
+            exact = values[max(1, int(quantile * len(values) + 0.5)) - 1]
+            assert value == pytest.approx(exact, rel=max_error, abs=0.001)
+
+    def test_percentiles_are_clamped_to_the_recorded_range(self):
+        histogram = histogram_of([42.0] * 10)
+        assert histogram.percentile(0.5) == 42.0
+        assert histogram.percentile(0.999) == 42.0
+
+    def test_empty_histogram_reports_zero(self):
+        assert LatencyHistogram().percentiles((0.5, 0.99)) == {0.5: 0.0, 0.99: 0.0}
+
+    def test_merge_matches_recording_everything_in_one(self):
+        first, second = histogram_of([1, 2, 3]), histogram_of([100, 200])
+        merged = first.copy().merge(second)
+        combined = histogram_of([1, 2, 3, 100, 200])
+        assert list(merged.counts) == list(combined.counts)
+        assert (merged.count, merged.min, merged.max) == (5, 1, 200)
+
+    def test_sparse_round_trip(self):
+        histogram = histogram_of([0.2, 15, 15, 2500])
+        decoded = LatencyHistogram().merge_sparse(json.loads(json.dumps(histogram.to_sparse())))
+        assert list(decoded.counts) == list(histogram.counts)
+        assert decoded.percentiles() == histogram.percentiles()
+
+    def test_merge_rejects_other_layouts(self):
+        with pytest.raises(ValueError):
+            LatencyHistogram().merge(LatencyHistogram(sub_bucket_bits=6))
+
+    def test_since_keeps_only_new_samples(self):
+        histogram = histogram_of([10, 10])
+        previous = histogram.copy()
+        histogram.record(900)
+        interval = histogram.since(previous)
+        assert interval.count == 1
+        assert interval.percentile(0.5) == pytest.approx(900, rel=0.01)
+
+    def test_percentile_interval_narrows_with_more_samples(self):
+        rng = random.Random(8)
+        small = histogram_of([rng.uniform(50, 150) for _ in range(100)])
+        large = histogram_of([rng.uniform(50, 150) for _ in range(10000)])
+        small_low, small_high = small.percentile_interval(0.95)
+        large_low, large_high = large.percentile_interval(0.95)
+        assert small_low <= small.percentile(0.95) <= small_high
+        assert large_low <= large.percentile(0.95) <= large_high
+        assert large_high - large_low < small_high - small_low
+
+    def test_percentile_interval_of_an_empty_histogram(self):
+        assert LatencyHistogram().percentile_interval(0.99) == (0.0, 0.0)
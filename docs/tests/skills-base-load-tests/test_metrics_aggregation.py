@@ -0,0 +1,77 @@
+"""Tests for the worker report round trip: TestMetrics.drain_report on workers, merge_report on the master"""
+import json
+
+import pytest
+
+import locustfile
+
+
+def worker_metrics(latencies, failures=0, name="get_profile"):
+    metrics = locustfile.TestMetrics()
+    record(metrics, latencies, failures, name)
+    return metrics
+
+
+def record(metrics, latencies, failures=0, name="get_profile"):
+    for n, latency in enumerate(latencies):
+        failed = n < failures
+        metrics.request_counters.increment(name, failed=failed, response_length=100)
+        metrics.record_response_time(name, latency)
+        if failed:
+            metrics.errors.record(name, 500, f"Internal error for user {n}", log=False)
+
+
+def sent(report):
+    """A report as it arrives on the master, after serialization"""
+    return json.loads(json.dumps(report))
+
+
+class TestRoundTrip:
+    def test_master_sees_the_union_of_its_workers(self):
+        first, second = worker_metrics([10.0] * 30, failures=3), worker_metrics([200.0] * 10)
+        master = locustfile.TestMetrics()
+        master.merge_report("worker-a", sent(first.drain_report()))
+        master.merge_report("worker-b", sent(second.drain_report()))
+        assert (master.total_requests, master.failed_requests) == (40, 3)
+        assert master.response_times.count == 40
+        assert master.endpoint_response_times["get_profile"].percentile(0.5) == pytest.approx(10.0, rel=0.01)
+        assert master.request_counters.cumulative()["get_profile"] == [40, 3, 4000]
+        assert [row['count'] for row in master.errors.rows()] == [3]
+
+    def test_draining_resets_histograms_but_not_counters(self):
+        worker = worker_metrics([10.0] * 5)
+        worker.drain_report()
+        assert worker.response_times.count == 0
+        assert worker.endpoint_response_times["get_profile"].count == 0
+        assert worker.total_requests == 5
+        assert worker.drain_report()['endpoints'] == {}
+
+    def test_repeated_reports_are_not_double_counted(self):
+        worker = worker_metrics([10.0] * 5, failures=1)
+        master = locustfile.TestMetrics()
+        master.merge_report("worker-a", sent(worker.drain_report()))
+        record(worker, [50.0] * 7, failures=2, name="register")
+        master.merge_report("worker-a", sent(worker.drain_report()))
+        master.merge_report("worker-a", sent(worker.drain_report()))  # Nothing new since the last report
+        assert (master.total_requests, master.failed_requests) == (12, 3)
+        assert master.response_times.count == 12
+        assert sorted(master.endpoint_response_times) == ["get_profile", "register"]
+        assert sum(row['count'] for row in master.errors.rows()) == 3
+
+    def test_per_worker_breakdown(self):
+        master = locustfile.TestMetrics()
+        master.merge_report("worker-a", sent(worker_metrics([10.0] * 4, failures=1).drain_report()))
+        master.merge_report("worker-b", sent(worker_metrics([20.0] * 6).drain_report()))
+        workers = master.worker_metrics
+        assert (workers["worker-a"]['total_requests'], workers["worker-a"]['failed_requests']) == (4, 1)
+        assert workers["worker-b"]['response_times'].count == 6
+        assert workers["worker-b"]['response_times'].percentile(0.5) == pytest.approx(20.0, rel=0.01)
+
+    def test_summary_totals_match_the_workers(self):
+        master = locustfile.TestMetrics()
+        master.start_time = locustfile.time.time() - 10
+        master.merge_report("worker-a", sent(worker_metrics([10.0] * 20, failures=2).drain_report()))
+        summary = master.summary()
+        assert summary['totals']['requests'] == 20
+        assert summary['totals']['failures'] == 2
+        assert summary['endpoints']['get_profile']['latency']['count'] == 20
@@ -0,0 +1,60 @@
+"""Tests for the pre-encoded request bodies: PayloadTemplate, CoarseClock and request IDs"""
+import json
+from datetime import datetime
+
+import pytest
+
+from locustfile import WORKFLOW_NAMES, CoarseClock, PayloadTemplate, next_request_id, webhook_body
+
+
+class TestPayloadTemplate:
+    def test_render_matches_json_dumps(self):
+        template = PayloadTemplate({
+            "workflowName": PayloadTemplate.Slot("workflow"),
+            "meta": {"tags": ["a", PayloadTemplate.Slot("tag")], "count": 3},
+            "constant": "x",
+        })
+        body = template.render(workflow='quote "me"', tag=7)
+        assert json.loads(body) == {"workflowName": 'quote "me"', "meta": {"tags": ["a", 7], "count": 3}, "constant": "x"}
+
+    def test_bytes_pass_through_unencoded(self):
+        template = PayloadTemplate({"timestamp": PayloadTemplate.Slot("timestamp")})
+        assert template.render(timestamp=b'"2026-01-01T00:00:00"') == b'{"timestamp":"2026-01-01T00:00:00"}'
+
+    def test_template_without_slots(self):
+        assert PayloadTemplate({"a": 1}).render() == b'{"a":1}'
+
+    def test_missing_slot_value_raises(self):
+        with pytest.raises(KeyError):
+            PayloadTemplate({"email": PayloadTemplate.Slot("email")}).render()
+
+    def test_a_slot_can_appear_more_than_once(self):
+        template = PayloadTemplate({"startedAt": PayloadTemplate.Slot("ts"), "finishedAt": PayloadTemplate.Slot("ts")})
+        assert json.loads(template.render(ts="now")) == {"startedAt": "now", "finishedAt": "now"}
+
+    def test_keys_that_look_like_slots_are_left_alone(self):
+        template = PayloadTemplate({"slot0": "slot0", "value": PayloadTemplate.Slot("value")})
+        assert json.loads(template.render(value=1)) == {"slot0": "slot0", "value": 1}
+
+
+def test_generated_webhook_bodies_are_valid_json():
+    body = json.loads(webhook_body())
+    assert json.dumps(body["workflow"]["name"]).encode() in WORKFLOW_NAMES
+    assert body["execution"]["startedAt"] == body["execution"]["finishedAt"]
+    assert body["execution"]["status"] in ("success", "error", "running")
+
+
+def test_coarse_clock_reformats_once_per_second(monkeypatch):
+    clock = CoarseClock()
+    monkeypatch.setattr("locustfile.time.time", lambda: 1760000000.25)
+    first = clock.isoformat_json()
+    monkeypatch.setattr("locustfile.time.time", lambda: 1760000000.75)
+    assert clock.isoformat_json() is first
+    monkeypatch.setattr("locustfile.time.time", lambda: 1760000001.0)
+    assert json.loads(clock.isoformat_json()) == datetime.fromtimestamp(1760000001).isoformat()
+
+
+def test_request_ids_are_unique_and_share_the_run_prefix():
+    ids = [next_request_id() for _ in range(1000)]
+    assert len(set(ids)) == 1000
+    assert len({request_id.rsplit("-", 1)[0] for request_id in ids}) == 1
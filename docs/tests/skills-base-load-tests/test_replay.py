@@ -0,0 +1,114 @@
+"""Tests for the replay model: log parsing, sharding and per-request headers"""
+import gzip
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from locustfile import REPLAY_SERVICES, ReplayUser, iter_replay_log, parse_log_timestamp, parse_replay_entry
+
+
+class TestParseLogTimestamp:
+    @pytest.mark.parametrize("value", [1700000000, 1700000000.0, "1700000000", 1700000000000,
+                                       1700000000000000, 1700000000000000000, "2023-11-14T22:13:20Z"])
+    def test_units_and_formats(self, value):
+        assert parse_log_timestamp(value) == pytest.approx(1700000000.0)
+
+    @pytest.mark.parametrize("value", [None, "yesterday"])
+    def test_unparseable(self, value):
+        assert parse_log_timestamp(value) is None
+
+
+class TestParseReplayEntry:
+    def test_structured_record(self):
+        record = {"timestamp": "2023-11-14T22:13:20Z", "service": "user-service", "method": "post",
+                  "path": "/auth/login", "body": {"email": "a@example.com"}}
+        assert parse_replay_entry(record) == (
+            pytest.approx(1700000000.0), "user-service", "POST", "/auth/login", b'{"email":"a@example.com"}')
+
+    def test_logcli_record_with_message(self):
+        record = {"timestamp": "1700000000000000000", "labels": {"app": "email-service"},
+                  "line": json.dumps({"message": "Incoming GET /email/health", "level": "info"})}
+        assert parse_replay_entry(record) == (pytest.approx(1700000000.0), "email-service", "GET", "/email/health", None)
+
+    def test_plain_text_line(self):
+        record = {"timestamp": 1700000000, "labels": {"service": "skills-service"}, "line": "Incoming DELETE /skills/3"}
+        assert parse_replay_entry(record)[1:] == ("skills-service", "DELETE", "/skills/3", None)
+
+    def test_absolute_url_keeps_path_and_query(self):
+        record = {"ts": 1700000000, "method": "GET", "url": "http://localhost:3001/users?page=2"}
+        assert parse_replay_entry(record)[3] == "/users?page=2"
+
+    @pytest.mark.parametrize("record", [
+        {"timestamp": 1700000000, "message": "Connected to MongoDB"},
+        {"timestamp": "not a time", "method": "GET", "path": "/users"},
+        {"timestamp": 1700000000, "line": "{not json"},
+    ])
+    def test_non_requests_are_skipped(self, record):
+        assert parse_replay_entry(record) is None
+
+
+def write_log(path, entries):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as log:
+        for entry in entries:
+            log.write(json.dumps(entry) + "\n")
+    return str(path)
+
+
+def request(ts, path="/users/profile", service="user-service", method="GET", **extra):
+    return {"timestamp": ts, "service": service, "method": method, "path": path, **extra}
+
+
+class TestIterReplayLog:
+    def test_shards_partition_the_log_on_one_timeline(self, tmp_path):
+        log = write_log(tmp_path / "log.jsonl", [request(1000 + n, f"/users/{n}") for n in range(10)])
+        full = list(iter_replay_log(log))
+        shards = [list(iter_replay_log(log, shard, 3)) for shard in range(3)]
+        assert sorted(entry for shard in shards for entry in shard) == sorted(full)
+        assert [entry[3] for entry in shards[1]] == ["/users/1", "/users/4", "/users/7"]
+        assert [entry[0] for entry in shards[1]] == [1.0, 4.0, 7.0]
+
+    def test_entries_are_named_by_service_and_normalized_path(self, tmp_path):
+        log = write_log(tmp_path / "log.jsonl", [request(1000, "/users/1234?page=2")])
+        offset, host, method, path, name, body = next(iter_replay_log(log))
+        assert (offset, host, method, path, body) == (0.0, REPLAY_SERVICES["user-service"], "GET", "/users/1234?page=2", None)
+        assert name.startswith("user-service /users/")
+        assert "1234" not in name
+
+    def test_long_gaps_are_capped(self, tmp_path):
+        log = write_log(tmp_path / "log.jsonl", [request(1000), request(1001), request(1600)])
+        assert [entry[0] for entry in iter_replay_log(log, max_gap=5)] == [0.0, 1.0, 6.0]
+
+    def test_skipped_lines_are_counted(self, tmp_path):
+        log = write_log(tmp_path / "log.jsonl", [
+            request(1000),
+            request(1001, service="unknown-service"),
+            request(1002, method="POST"),  # Writes are only replayed with their body
+            request(1003, method="POST", body={"a": 1}),
+            {"timestamp": 1004, "message": "Connected to MongoDB"},
+            request(999),
+        ])
+        stats = {}
+        entries = list(iter_replay_log(log, stats=stats))
+        assert [entry[2] for entry in entries] == ["GET", "POST", "GET"]
+        assert entries[-1][0] == 3.0  # Out of order: sent right away, the clock doesn't rewind
+        assert stats == {'unmapped': 1, 'no_body': 1, 'not_requests': 1, 'out_of_order': 1}
+
+    def test_gzip_logs(self, tmp_path):
+        log = write_log(tmp_path / "log.jsonl.gz", [request(1000), request(1002)])
+        assert [entry[0] for entry in iter_replay_log(log)] == [0.0, 2.0]
+
+
+class TestReplayHeaders:
+    @pytest.mark.parametrize("path", ["/auth/login", "/workflows/webhook", "/metrics", "/"])
+    def test_public_routes_carry_no_token(self, path):
+        assert ReplayUser.replay_headers(SimpleNamespace(token="jwt"), path) == {"Content-Type": "application/json"}
+
+    def test_protected_routes_carry_the_token(self):
+        headers = ReplayUser.replay_headers(SimpleNamespace(token="jwt"), "/users/profile")
+        assert headers["Authorization"] == "Bearer jwt"
+
+    def test_every_request_gets_its_own_dict(self):
+        user = SimpleNamespace(token="jwt")
+        assert ReplayUser.replay_headers(user, "/users/1") is not ReplayUser.replay_headers(user, "/users/1")
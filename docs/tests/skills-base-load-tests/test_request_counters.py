@@ -0,0 +1,88 @@
+"""Tests for RequestCounterRing: per-second buckets, rates and spread worker deltas"""
+import pytest
+
+from locustfile import RequestCounterRing
+
+
+def ring_at(started=100.0, seconds=60):
+    ring = RequestCounterRing(seconds)
+    ring._bucket_started = started
+    return ring
+
+
+class TestRollAndRates:
+    def test_roll_retires_the_live_bucket_into_totals(self):
+        ring = ring_at()
+        ring.increment("get_profile", response_length=10)
+        ring.increment("get_profile", failed=True, response_length=5)
+        elapsed, retired = ring.roll(now=101.0)
+        assert elapsed == 1.0
+        assert retired == {"get_profile": [2, 1, 15]}
+        assert ring.totals == {"get_profile": [2, 1, 15]}
+        assert ring.roll(now=102.0) == (1.0, {})
+
+    def test_cumulative_and_total_include_the_live_bucket(self):
+        ring = ring_at()
+        ring.increment("a")
+        ring.roll(now=101.0)
+        ring.increment("a", failed=True)
+        ring.increment("b")
+        assert ring.cumulative() == {"a": [2, 1, 0], "b": [1, 0, 0]}
+        assert ring.total() == 3
+        assert ring.total(RequestCounterRing.ERRORS) == 1
+
+    def test_rates_use_the_measured_bucket_lengths(self):
+        ring = ring_at()
+        for _ in range(10):
+            ring.increment("a")
+        ring.roll(now=102.0)  # A late tick: 10 requests over 2 seconds
+        for _ in range(4):
+            ring.increment("a")
+        ring.roll(now=103.0)
+        assert ring.rates(window=1)["a"][0] == pytest.approx(4.0)
+        assert ring.rates(window=5)["a"][0] == pytest.approx(14 / 3)
+
+    def test_rates_of_an_empty_ring(self):
+        assert RequestCounterRing().rates() == {}
+
+    def test_ring_keeps_only_the_last_seconds(self):
+        ring = ring_at(seconds=3)
+        for second in range(1, 6):
+            ring.increment("a")
+            ring.roll(now=100.0 + second)
+        assert len(ring.buckets) == 3
+        assert ring.totals["a"][0] == 5
+
+
+class TestSpread:
+    def test_spread_counts_are_released_evenly_as_the_ring_rolls(self):
+        ring = ring_at()
+        ring.add("a", 30, 3, 300, spread=3.0, now=100.0)
+        released = [ring.roll(now=100.0 + second)[1].get("a", [0, 0, 0])[0] for second in (1, 2, 3, 4)]
+        assert released == [10, 10, 10, 0]
+        assert ring.totals["a"] == [30, 3, 300]
+        assert not ring._spreading
+
+    def test_totals_include_counts_not_yet_released(self):
+        ring = ring_at()
+        ring.add("a", 9, 0, 0, spread=3.0, now=100.0)
+        ring.roll(now=101.0)
+        assert ring.totals["a"][0] == 3
+        assert ring.cumulative()["a"][0] == 9
+        assert ring.total() == 9
+
+    def test_unspread_add_lands_in_the_live_bucket(self):
+        ring = ring_at()
+        ring.add("a", 5, 1, 50)
+        assert ring.roll(now=101.0)[1] == {"a": [5, 1, 50]}
+
+    def test_master_rate_stays_flat_between_worker_reports(self):
+        ring = ring_at()
+        rates = []
+        for second in range(1, 13):
+            now = 100.0 + second
+            if second % 3 == 1:
+                ring.add("a", 300, 0, 0, spread=3.0, now=now - 1)  # 100 requests/s, reported every 3s
+            ring.roll(now=now)
+            rates.append(ring.rates(window=1).get("a", [0.0])[0])
+        assert rates[3:] == [pytest.approx(100.0)] * 9
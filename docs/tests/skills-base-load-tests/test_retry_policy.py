@@ -0,0 +1,167 @@
+"""Tests for CircuitBreaker transitions, the RetryPolicy budget and BaseTaskSet.send"""
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+from locustfile import BaseTaskSet, CircuitBreaker, RetryPolicy
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, cooldown=60)
+        for _ in range(2):
+            breaker.record(False)
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == "open"
+        assert not breaker.allow()
+        assert breaker.times_opened == 1
+
+    def test_success_resets_the_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record(False)
+        breaker.record(True)
+        breaker.record(False)
+        assert breaker.state == "closed"
+
+    def test_half_open_admits_a_single_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0)
+        breaker.record(False)
+        assert breaker.available()
+        assert breaker.available()  # Peeking never takes the probe
+        assert breaker.allow()
+        assert breaker.state == "half-open"
+        assert not breaker.available()
+        assert not breaker.allow()
+
+    def test_probe_success_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0)
+        breaker.record(False)
+        breaker.allow()
+        breaker.record(True)
+        assert breaker.state == "closed"
+        assert breaker.allow() and breaker.allow()
+
+    def test_probe_failure_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=5, cooldown=60)
+        for _ in range(5):
+            breaker.record(False)
+        breaker.opened_at -= 60
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == "open"
+        assert breaker.times_opened == 2
+        assert not breaker.available()
+
+
+class TestRetryPolicy:
+    def test_budget_is_earned_by_first_attempts(self):
+        policy = RetryPolicy(budget_ratio=0.5, min_budget=1)
+        assert policy.try_spend()
+        assert not policy.try_spend()
+        policy.record_attempt()
+        policy.record_attempt()
+        assert policy.try_spend()
+        assert (policy.retries, policy.budget_exhausted) == (2, 1)
+
+    def test_budget_is_capped(self):
+        policy = RetryPolicy(budget_ratio=1.0, min_budget=10)
+        for _ in range(1000):
+            policy.record_attempt()
+        assert policy.retry_tokens == policy.max_budget
+
+    @pytest.mark.parametrize("status_code, retryable, host_failure", [
+        (0, True, True), (200, False, False), (404, False, False), (429, True, True),
+        (500, False, True), (502, True, True), (503, True, True),
+    ])
+    def test_retryability_and_host_failure_are_separate(self, status_code, retryable, host_failure):
+        policy = RetryPolicy()
+        assert policy.is_retryable(status_code) is retryable
+        assert policy.is_host_failure(status_code) is host_failure
+
+    def test_backoff_is_capped(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=2.0)
+        assert all(0 <= policy.backoff(10) <= 2.0 for _ in range(100))
+
+    def test_one_breaker_per_host(self):
+        policy = RetryPolicy()
+        assert policy.breaker("http://a") is policy.breaker("http://a")
+        assert policy.breaker("http://a") is not policy.breaker("http://b")
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.request_meta = {}
+        self.text = ""
+
+    def success(self):
+        pass
+
+    def failure(self, message):
+        pass
+
+    def json(self):
+        return {}
+
+
+class FakeClient:
+    def __init__(self, *status_codes):
+        self.status_codes = list(status_codes)
+        self.urls = []
+
+    @contextlib.contextmanager
+    def request(self, method, url, name=None, catch_response=False, **kwargs):
+        self.urls.append(url)
+        yield FakeResponse(self.status_codes.pop(0))
+
+
+def task_set(client, policy, host="http://integration"):
+    events = SimpleNamespace(request=SimpleNamespace(fire=lambda **kwargs: None))
+    user = SimpleNamespace(host=host, client=client, environment=SimpleNamespace(events=events),
+                           min_wait=None, max_wait=None, wait_function=None)
+    tasks = type("SendTasks", (BaseTaskSet,), {"retry_policy": policy, "max_retries": 2, "tasks": []})(user)
+    return tasks
+
+
+def quick_policy(**kwargs):
+    policy = RetryPolicy(base_delay=0, **kwargs)
+    policy.wait = lambda attempt: None
+    return policy
+
+
+class TestSend:
+    def test_breaker_is_keyed_by_the_target_host(self):
+        policy = quick_policy(breaker_threshold=1)
+        tasks = task_set(FakeClient(500), policy)
+        tasks.send("POST", "http://email:3002/email/grafananotif", "grafananotif")
+        assert policy.breaker("http://email:3002").state == "open"
+        assert policy.breaker("http://integration").state == "closed"
+
+    def test_retries_until_success(self):
+        policy = quick_policy()
+        client = FakeClient(503, 503, 200)
+        response = task_set(client, policy).send("GET", "/users", "users")
+        assert response.status_code == 200
+        assert len(client.urls) == 3
+
+    def test_open_circuit_short_circuits(self):
+        policy = quick_policy(breaker_threshold=1, breaker_cooldown=60)
+        policy.breaker("http://integration").record(False)
+        client = FakeClient()
+        assert task_set(client, policy).send("GET", "/users", "users") is None
+        assert client.urls == []
+        assert policy.short_circuited == 1
+
+    def test_half_open_probe_is_taken_by_a_real_send(self):
+        policy = quick_policy(breaker_threshold=1, breaker_cooldown=60)
+        breaker = policy.breaker("http://integration")
+        breaker.record(False)
+        breaker.opened_at -= 60  # Cooldown over: the next send is the probe
+        client = FakeClient(503)
+        response = task_set(client, policy).send("GET", "/users", "users")
+        # The probe failed, the circuit reopened and the retry was never sent
+        assert response.status_code == 503
+        assert len(client.urls) == 1
+        assert breaker.state == "open"
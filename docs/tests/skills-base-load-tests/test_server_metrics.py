@@ -0,0 +1,120 @@
+"""Tests for ServerMetricsScraper: exposition parsing, bucket quantiles and scrape deltas"""
+from contextlib import contextmanager
+
+import pytest
+
+from locustfile import ServerMetricsScraper
+
+
+def exposition(cpu_seconds, requests, buckets, lag=0.004):
+    """A /metrics page from one service, split across two route label sets"""
+    lines = [
+        '# HELP nodejs_eventloop_lag_seconds Lag of event loop in seconds.',
+        '# TYPE nodejs_eventloop_lag_seconds gauge',
+        f'nodejs_eventloop_lag_seconds {lag} 1760000000000',
+        'nodejs_heap_size_used_bytes 52428800',
+        f'process_cpu_seconds_total {cpu_seconds}',
+        'nodejs_gc_duration_seconds_sum{kind="major"} 0.5',
+    ]
+    for route in ("/a", "/b"):
+        lines.append(f'http_request_duration_seconds_count{{route="{route}"}} {requests / 2}')
+        lines.append(f'http_request_duration_seconds_sum{{route="{route}"}} {requests / 2 * 0.05}')
+        for bound, count in buckets.items():
+            lines.append(f'http_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {count / 2}')
+    return lines
+
+
+class FakeSession:
+    def __init__(self):
+        self.pages = []
+
+    @contextmanager
+    def get(self, url, stream, timeout):
+        lines = self.pages.pop(0)
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def iter_lines(self, decode_unicode):
+                return iter(lines)
+
+        yield Response()
+
+
+class TestBucketQuantile:
+    def test_interpolates_within_a_bucket(self):
+        buckets = {0.1: 50.0, 0.5: 90.0, 1.0: 100.0, float('inf'): 100.0}
+        assert ServerMetricsScraper.bucket_quantile(0.5, buckets) == pytest.approx(0.1)
+        assert ServerMetricsScraper.bucket_quantile(0.7, buckets) == pytest.approx(0.3)
+        assert ServerMetricsScraper.bucket_quantile(0.25, buckets) == pytest.approx(0.05)
+
+    def test_rank_in_the_inf_bucket_returns_the_highest_finite_bound(self):
+        buckets = {0.1: 10.0, 1.0: 50.0, float('inf'): 100.0}
+        assert ServerMetricsScraper.bucket_quantile(0.99, buckets) == 1.0
+
+    @pytest.mark.parametrize("buckets", [{}, {0.1: 0.0, float('inf'): 0.0}])
+    def test_empty_window(self, buckets):
+        assert ServerMetricsScraper.bucket_quantile(0.5, buckets) is None
+
+    def test_parsed_exposition_sums_label_sets(self):
+        parsed = ServerMetricsScraper.parse([
+            '# TYPE http_request_duration_seconds histogram',
+            'http_request_duration_seconds_bucket{route="/a",le="0.1"} 3',
+            'http_request_duration_seconds_bucket{route="/b",le="0.1"} 1',
+            'http_request_duration_seconds_bucket{route="/a",le="+Inf"} 4',
+            'http_request_duration_seconds_bucket{route="/b",le="+Inf"} 4',
+        ])
+        assert parsed['buckets'] == {0.1: 4.0, float('inf'): 8.0}
+        assert ServerMetricsScraper.bucket_quantile(0.5, parsed['buckets']) == pytest.approx(0.1)
+
+
+class TestParse:
+    def test_keeps_only_known_families(self):
+        parsed = ServerMetricsScraper.parse(exposition(1.5, 100, {"0.1": 80, "+Inf": 100}))
+        assert parsed['gauges'] == {'event_loop_lag': 0.004, 'heap_used': 52428800.0}
+        assert parsed['counters'] == {'cpu_seconds': 1.5, 'http_duration_count': 100.0, 'http_duration_sum': 5.0}
+        assert parsed['buckets'] == {0.1: 80.0, float('inf'): 100.0}
+
+    def test_malformed_values_are_skipped(self):
+        parsed = ServerMetricsScraper.parse(['process_cpu_seconds_total NaNa', 'process_cpu_seconds_total', ''])
+        assert parsed['counters'] == {}
+
+
+class TestScrape:
+    def test_first_scrape_has_gauges_only(self):
+        scraper = ServerMetricsScraper({})
+        scraper.session = FakeSession()
+        scraper.session.pages.append(exposition(1.0, 100, {"0.1": 80, "+Inf": 100}))
+        sample = scraper.scrape("user-service", "http://localhost:3001/")
+        assert sample['event_loop_lag_ms'] == pytest.approx(4.0)
+        assert sample['heap_used_mb'] == 50.0
+        assert (sample['rps'], sample['cpu_percent'], sample['p99_ms']) == (None, None, None)
+
+    def test_rates_and_window_percentiles_come_from_the_difference(self):
+        scraper = ServerMetricsScraper({})
+        scraper.session = FakeSession()
+        scraper.session.pages += [
+            exposition(1.0, 100, {"0.1": 100, "0.5": 100, "+Inf": 100}),
+            exposition(6.0, 1100, {"0.1": 600, "0.5": 1100, "+Inf": 1100}),
+        ]
+        scraper.scrape("user-service", "http://localhost:3001")
+        scraper._previous["user-service"]['at'] -= 10.0
+        sample = scraper.scrape("user-service", "http://localhost:3001")
+        assert sample['rps'] == pytest.approx(100.0, rel=0.01)
+        assert sample['cpu_percent'] == pytest.approx(50.0, rel=0.01)
+        assert sample['mean_ms'] == pytest.approx(50.0)
+        # Of the 1000 requests in the window, 500 took under 100ms and the rest 100-500ms
+        assert sample['p50_ms'] == pytest.approx(100.0)
+        assert sample['p99_ms'] == pytest.approx(100 + 400 * 490 / 500)
+
+    def test_counter_reset_is_not_a_negative_rate(self):
+        scraper = ServerMetricsScraper({})
+        scraper.session = FakeSession()
+        scraper.session.pages += [exposition(9.0, 5000, {"+Inf": 5000}), exposition(0.5, 10, {"+Inf": 10})]
+        scraper.scrape("user-service", "http://localhost:3001")
+        scraper._previous["user-service"]['at'] -= 10.0
+        sample = scraper.scrape("user-service", "http://localhost:3001")
+        assert sample['rps'] == 0.0
+        assert sample['cpu_percent'] == 0.0
+        assert sample['p99_ms'] is None
@@ -0,0 +1,49 @@
+"""Tests for TimeSeriesWriter rotation and read_timeseries"""
+import os
+import random
+
+import pytest
+
+from locustfile import TimeSeriesWriter, read_timeseries
+
+
+def write_batches(writer, batches, per_batch=200):
+    rng = random.Random(5)
+    for batch in range(batches):
+        for n in range(per_batch):
+            writer.write({'batch': batch, 'n': n, 'tps': rng.random(), 'label': "steady" * 10})
+        writer._flush()
+    writer.stop()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_records_round_trip(tmp_path, compress):
+    writer = TimeSeriesWriter(str(tmp_path), compress=compress)
+    write_batches(writer, 3)
+    records = list(read_timeseries([str(tmp_path)]))
+    assert writer.records_written == len(records) == 600
+    assert [(record['batch'], record['n']) for record in records[:2]] == [(0, 0), (0, 1)]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_rotation_counts_bytes_on_disk(tmp_path, compress):
+    max_file_bytes = 16 * 1024
+    writer = TimeSeriesWriter(str(tmp_path), max_file_bytes=max_file_bytes, compress=compress)
+    write_batches(writer, 20)
+    files = sorted(os.listdir(tmp_path))
+    sizes = [os.path.getsize(tmp_path / name) for name in files]
+    # A file is only rotated once it is full on disk, so every closed file but the last reached the limit
+    assert all(size >= max_file_bytes for size in sizes[:-1])
+    assert all(name.endswith(".jsonl.gz" if compress else ".jsonl") for name in files)
+    assert len(list(read_timeseries([str(tmp_path)]))) == 4000
+
+
+def test_gzip_files_hold_far_more_records_than_plain_ones(tmp_path):
+    sizes = {}
+    for compress in (False, True):
+        directory = tmp_path / str(compress)
+        directory.mkdir()
+        writer = TimeSeriesWriter(str(directory), max_file_bytes=16 * 1024, compress=compress)
+        write_batches(writer, 20)
+        sizes[compress] = len(os.listdir(directory))
+    assert sizes[True] * 3 < sizes[False]
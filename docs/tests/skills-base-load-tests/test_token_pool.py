@@ -0,0 +1,119 @@
+"""Tests for TokenPool login, refresh and expiry handling"""
+import base64
+import json
+import time
+
+import pytest
+from requests.exceptions import ConnectionError
+
+from locustfile import TokenPool, TokenPools
+
+
+def jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body or {}
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    """Answers each POST with the next queued response (or raises it)"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def pool_with(*responses, accounts=1, max_attempts=1):
+    pool = TokenPool("http://users/auth/login",
+                     [{"email": f"user{n}@example.com", "password": "pw"} for n in range(accounts)],
+                     max_attempts=max_attempts)
+    pool.session = FakeSession(*responses)
+    return pool
+
+
+def test_token_expiry_reads_the_jwt_exp():
+    assert TokenPool.token_expiry(jwt(1700000000)) == 1700000000.0
+
+
+def test_token_expiry_falls_back_to_the_default_ttl():
+    assert TokenPool.token_expiry("not-a-jwt", default_ttl=60) == pytest.approx(time.time() + 60, abs=1)
+
+
+def test_login_stores_the_token_and_its_expiry():
+    exp = time.time() + 900
+    pool = pool_with(FakeResponse(200, {"access_token": jwt(exp)}))
+    slot = pool.slots[0]
+    pool._login(slot)
+    assert slot.token == jwt(exp)
+    assert slot.expires_at == pytest.approx(exp)
+    assert pool.logins == 1
+
+
+def test_failed_refresh_keeps_a_token_that_is_still_valid():
+    pool = pool_with(ConnectionError("user-service down"))
+    slot = pool.slots[0]
+    slot.token, slot.issued_at, slot.expires_at = "still-valid", time.time() - 840, time.time() + 60
+    pool._login(slot)
+    assert slot.token == "still-valid"
+    assert pool.login_failures == 1
+
+
+def test_failed_refresh_drops_an_expired_token():
+    pool = pool_with(FakeResponse(503))
+    slot = pool.slots[0]
+    slot.token, slot.expires_at = "expired", time.time() - 1
+    pool._login(slot)
+    assert slot.token is None
+    assert slot.expires_at == 0.0
+
+
+def test_non_retryable_status_stops_retrying():
+    pool = pool_with(FakeResponse(401), max_attempts=3)
+    pool._login(pool.slots[0])
+    assert len(pool.session.posts) == 1
+
+
+def test_acquire_skips_dead_and_expired_accounts():
+    pool = pool_with(accounts=3)
+    pool._ready = True
+    live, expired, dead = pool.slots
+    live.token, live.expires_at = "live", time.time() + 900
+    expired.token, expired.expires_at = "expired", time.time() - 1
+    assert {pool.acquire().email for _ in range(4)} == {live.email}
+
+
+def test_acquire_without_live_accounts():
+    pool = pool_with(accounts=2)
+    pool._ready = True
+    assert pool.acquire() is None
+
+
+def test_refresh_margin_is_at_most_half_the_lifetime():
+    pool = pool_with()
+    slot = pool.slots[0]
+    slot.issued_at, slot.expires_at = 1000.0, 1060.0
+    assert pool._margin(slot) == 30.0
+    slot.expires_at = 1000.0 + 3600
+    assert pool._margin(slot) == pool.refresh_margin
+
+
+def test_set_accounts_only_replaces_the_roles_given():
+    pools = TokenPools("http://users", [{"email": "admin@example.com", "password": "pw", "role": "admin"}])
+    pools.set_accounts([{"email": "seeded@example.com", "password": "pw", "role": "staff"}])
+    assert [slot.email for slot in pools.pools["admin"].slots] == ["admin@example.com"]
+    assert [slot.email for slot in pools.pools["staff"].slots] == ["seeded@example.com"]